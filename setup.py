@@ -60,6 +60,7 @@ setup(
     data_files=["README.md", "CHANGELOG.md", "LICENSE", "requirements.txt"],
     license="Apache 2.0",
     install_requires=INSTALL_REQUIRES,
+    extras_require={"async": ["aiohttp>=3.6"]},
     dependency_links=DEPENDENCY_LINKS,
     classifiers=[
         "Development Status :: 5 - Production/Stable",
@@ -1,14 +1,22 @@
-"""repo-manager: Manage your GitHub repository with source control."""
+"""repo-manager: Manage your GitHub repository with source control.
+
+The API clients take most of the startup time,
+so they are only imported by commands that contact GitHub.
+"""
 import argparse
 import logging
-from typing import Sequence
+from typing import TYPE_CHECKING, Sequence
+
+from ._environment import load_from_environment
 
-from ._groups import apply_config, parse_config
-from ._util import load_context, load_inputs
+if TYPE_CHECKING:  # pragma: no cover
+    from ._util import Inputs, RepoContext
 
 __all__ = ("__version__",)
 __version__ = "1.1.0"
 _LOGGER = logging.getLogger(__name__)
+# Everything that needs the API clients is imported where it is used.
+# pylint: disable=import-outside-toplevel
 
 
 def _arguments() -> argparse.ArgumentParser:
@@ -18,6 +26,28 @@ def _arguments() -> argparse.ArgumentParser:
     args.add_argument(
         "-v", dest="verbosity", action="count", help="Enables logging and sets detail level.",
     )
+    args.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        metavar="GROUP",
+        help="Apply only this config group. Can be repeated.",
+    )
+    args.add_argument(
+        "--skip",
+        action="append",
+        default=[],
+        metavar="GROUP",
+        help="Do not apply this config group. Can be repeated.",
+    )
+    args.add_argument(
+        "--validate", action="store_true", help="Check the config file without contacting GitHub.",
+    )
+    args.add_argument(
+        "--verify-idempotent",
+        action="store_true",
+        help="Apply the config twice and fail if the second pass sends any writes.",
+    )
 
     return args
 
@@ -36,13 +66,110 @@ def _setup_logger(verbosity: int, debug: bool):
     logger.addHandler(handler)
 
 
+async def _apply_async(input_values: "Inputs", context: "RepoContext"):
+    """Apply the config using the asyncio engine."""
+    from ._groups import apply_config_async, parse_config
+    from ._verify import no_writes
+
+    async with input_values.aiogithub:
+        prepped_config = parse_config(input_values, context)
+        await apply_config_async(prepped_config, max_workers=input_values.max_workers)
+
+        if input_values.verify_idempotent:
+            with no_writes(f"'{context.owner}/{context.repo}'"):
+                prepped_config = parse_config(input_values, context, use_state_store=False)
+                await apply_config_async(prepped_config, max_workers=input_values.max_workers)
+
+
+def _apply_fleet(input_values: "Inputs"):
+    """Apply the config to every repository in the fleet manifest."""
+    import asyncio
+
+    from ._fleet import load_manifest, resolve_targets, run_fleet, run_fleet_async, write_report
+    from ._groups import load_config
+
+    # Finding the repositories takes API calls, so check the config first.
+    load_config(input_values)
+    contexts = resolve_targets(input_values, load_manifest(input_values.fleet_manifest))
+    _LOGGER.info("Applying config to %d repositories", len(contexts))
+
+    if input_values.aiogithub is None:
+        results = run_fleet(input_values, contexts)
+    else:
+
+        async def _run():
+            async with input_values.aiogithub:
+                return await run_fleet_async(input_values, contexts)
+
+        results = asyncio.run(_run())
+
+    write_report(results, input_values.fleet_report)
+
+
+def _run(input_values: "Inputs"):
+    """Apply the config to the fleet or to the single configured repository."""
+    if input_values.fleet_manifest is not None:
+        _apply_fleet(input_values)
+        return
+
+    from ._groups import apply_config, parse_config
+    from ._util import load_context
+    from ._verify import no_writes
+
+    context = load_context()
+    if input_values.aiogithub is not None:
+        import asyncio
+
+        asyncio.run(_apply_async(input_values, context))
+        return
+
+    prepped_config = parse_config(input_values, context)
+    apply_config(prepped_config, max_workers=input_values.max_workers)
+
+    if input_values.verify_idempotent:
+        # Parse again so that nothing read during the first pass is reused,
+        # and leave out the state store, which would skip every group just recorded.
+        with no_writes(f"'{context.owner}/{context.repo}'"):
+            prepped_config = parse_config(input_values, context, use_state_store=False)
+            apply_config(prepped_config, max_workers=input_values.max_workers)
+
+
+def _check_config(verbosity: int):
+    """Check the config file named by the inputs. No clients are built."""
+    from ._validate import validate_config_file
+
+    debug = load_from_environment("INPUT_DEBUG", kind="Debug Flag", default="false") == "true"
+    _setup_logger(verbosity, debug)
+
+    config_file = load_from_environment(
+        "INPUT_CONFIG-FILE", kind="Config Filename", default=".github/settings.yml"
+    )
+    config = validate_config_file(config_file)
+    _LOGGER.info("Config file '%s' is valid. Groups: %s", config_file, ", ".join(config) or "none")
+
+
 def cli(raw_args: Sequence[str] = None):
     """CLI entry point."""
 
     parser = _arguments()
     parsed = parser.parse_args(args=raw_args)
 
+    if parsed.validate:
+        _check_config(parsed.verbosity)
+        return
+
+    from ._select import split_groups
+    from ._tracing import span, start_tracing
+    from ._util import load_inputs
+
     input_values = load_inputs()
+    # Groups named on the command line replace any set in the environment.
+    if parsed.only:
+        input_values.only = split_groups(",".join(parsed.only))
+    if parsed.skip:
+        input_values.skip = split_groups(",".join(parsed.skip))
+    if parsed.verify_idempotent:
+        input_values.verify_idempotent = True
 
     _setup_logger(parsed.verbosity, input_values.debug)
     if parsed.verbosity:
@@ -50,6 +177,12 @@ def cli(raw_args: Sequence[str] = None):
     if input_values.debug:
         _LOGGER.debug("Debug logging enabled via environment variable.")
 
-    context = load_context()
-    prepped_config = parse_config(input_values, context)
-    apply_config(prepped_config)
+    # Verification starts its own tracing if needed, without keeping the spans.
+    tracer = start_tracing() if input_values.trace_file is not None else None
+    try:
+        with span("run", "run"):
+            _run(input_values)
+    finally:
+        input_values.transport.log_stats()
+        if tracer is not None:
+            tracer.export(input_values.trace_file)
@@ -0,0 +1,201 @@
+"""Asyncio HTTP client for handlers that can keep many requests in flight.
+
+Requires the optional ``aiohttp`` dependency: ``pip install github-repo-manager[async]``
+"""
+import asyncio
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from ._ratelimit import RateLimiter
+from ._shared_reads import current_reads
+from ._tracing import current_span, route_template, span
+from ._verify import is_write
+from .exceptions import RepoAdminError, UserConfigError
+
+if TYPE_CHECKING:  # pragma: no cover
+    import aiohttp
+
+__all__ = ("AsyncGitHub", "AsyncRepo", "MAX_IN_FLIGHT")
+_LOGGER = logging.getLogger(__name__)
+MAX_IN_FLIGHT = 16
+_API_URL = "https://api.github.com"
+_NEXT_LINK = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+def _import_aiohttp():
+    """Import ``aiohttp`` on first use. It is slow to import and only the asyncio engine needs it."""
+    try:
+        import aiohttp  # pylint: disable=import-outside-toplevel,redefined-outer-name
+    except ImportError:  # pragma: no cover
+        raise UserConfigError(
+            "The asyncio engine requires aiohttp. Install github-repo-manager[async] to use it."
+        )
+    return aiohttp
+
+
+def _next_link(link_header: Optional[str]) -> Optional[str]:
+    """Find the next page URL in an RFC 5988 ``Link`` header, if there is one."""
+    if not link_header:
+        return None
+
+    match = _NEXT_LINK.search(link_header)
+    if match is None:
+        return None
+
+    return match.group(1)
+
+
+class AsyncGitHub:
+    """Minimal asyncio GitHub REST client.
+
+    All requests share one ``aiohttp`` session
+    and at most ``max_in_flight`` requests are outstanding at once.
+    Requests are paced and retried by ``rate_limiter``,
+    which can be shared with the threaded clients.
+    Use as an async context manager to open and close the session.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        api_url: str = _API_URL,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        """Set up the client. No connections are opened until the session starts."""
+        self._aiohttp = _import_aiohttp()
+        self._token = token
+        self._api_url = api_url.rstrip("/")
+        self._limit = max_in_flight
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    async def __aenter__(self) -> "AsyncGitHub":
+        """Open the shared session."""
+        self._semaphore = asyncio.Semaphore(self._limit)
+        self._session = self._aiohttp.ClientSession(
+            headers={
+                "Authorization": f"token {self._token}",
+                "Accept": "application/vnd.github.v3+json",
+                "User-Agent": "repo-manager",
+            },
+            connector=self._aiohttp.TCPConnector(limit=self._limit),
+        )
+        return self
+
+    async def __aexit__(self, *args):
+        """Close the shared session."""
+        await self._session.close()
+        self._session = None
+
+    def _url(self, path: str) -> str:
+        if path.startswith("http"):
+            return path
+        return f"{self._api_url}/{path.lstrip('/')}"
+
+    async def _send(
+        self, method: str, url: str, body: Any = None, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Any, Optional[str]]:
+        if self._session is None:
+            raise RepoAdminError("AsyncGitHub must be used as an async context manager")
+
+        route = route_template(url)
+        with span(
+            f"{method} {route}", "http", method=method, route=route, path=urlsplit(url).path
+        ) as request_span:
+            status, data, link, size = await self._send_with_retries(method, url, body, headers)
+            request_span.set(status=status, response_bytes=size)
+        reads = current_reads()
+        if reads is not None and is_write(method, route):
+            reads.write()
+        return status, data, link
+
+    async def _send_with_retries(
+        self, method: str, url: str, body: Any, headers: Optional[Dict[str, str]]
+    ) -> Tuple[int, Any, Optional[str], int]:
+        attempt = 0
+        while True:
+            delay = self.rate_limiter.delay_before(method, url)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            async with self._semaphore:
+                _LOGGER.debug("%s %s", method, url)
+                async with self._session.request(
+                    method, url, json=body, headers=headers
+                ) as response:
+                    raw = await response.read()
+                    retry = self.rate_limiter.retry_delay(
+                        response.status,
+                        {key.lower(): value for key, value in response.headers.items()},
+                        raw,
+                        attempt,
+                    )
+                    if retry is None:
+                        if response.content_type == "application/json":
+                            data = await response.json()
+                        else:
+                            data = await response.text()
+                        return response.status, data, response.headers.get("Link"), len(raw)
+
+            # The limiter is now paused, so the next pass waits before resending.
+            attempt += 1
+            current_span().set(retries=attempt)
+
+    async def request(
+        self, method: str, path: str, body: Any = None, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, Any]:
+        """Make a single request.
+
+        :returns: response status and decoded body
+        """
+        status, data, _link = await self._send(method, self._url(path), body, headers)
+        return status, data
+
+    async def get_all(
+        self, path: str, headers: Optional[Dict[str, str]] = None, **params
+    ) -> List[Any]:
+        """Collect every page of a list endpoint."""
+        query = "&".join(f"{key}={quote(str(value))}" for key, value in params.items())
+        url: Optional[str] = self._url(path) + (f"?{query}" if query else "")
+        results: List[Any] = []
+
+        while url is not None:
+            status, data, link = await self._send("GET", url, headers=headers)
+            if status != 200:
+                raise RepoAdminError(f"Encountered unknown error: STATUS {status} :: {data}")
+            results.extend(data)
+            url = _next_link(link)
+
+        return results
+
+
+class AsyncRepo:
+    """:class:`AsyncGitHub` requests scoped to a single repository."""
+
+    def __init__(self, client: AsyncGitHub, owner: str, repo: str):
+        """Bind the client to a repository."""
+        self.client = client
+        self.owner = owner
+        self.repo = repo
+        self._prefix = f"repos/{owner}/{repo}"
+
+    def path(self, *parts: Any) -> str:
+        """Build a repository-relative API path, escaping each part."""
+        return "/".join([self._prefix] + [quote(str(part), safe="") for part in parts])
+
+    async def request(
+        self, method: str, *parts: Any, body: Any = None, expect=(200, 201, 204)
+    ) -> Any:
+        """Make a request against a repository resource and check the response status."""
+        status, data = await self.client.request(method, self.path(*parts), body=body)
+        if status not in expect:
+            raise RepoAdminError(f"Encountered unknown error: STATUS {status} :: {data}")
+        return data
+
+    async def get_all(self, *parts: Any, **params) -> List[Any]:
+        """Collect every page of a repository list endpoint."""
+        return await self.client.get_all(self.path(*parts), per_page=100, **params)
@@ -0,0 +1,35 @@
+"""Match branch names against the names in a ``branches`` config.
+
+A name wrapped in slashes, such as ``/^release-[0-9]+$/``, is a regular expression,
+which matches a branch if it matches anywhere in the branch name.
+Git branch names cannot start with a slash, so this can never be an exact name.
+A name with any of ``*``, ``?``, or ``[`` is a glob pattern, matched case-sensitively against the whole name.
+``*`` also matches ``/``, so ``release/*`` matches ``release/1.0/hotfix``.
+Any other name is exact.
+"""
+import fnmatch
+import re
+from typing import Callable
+
+__all__ = ("is_pattern", "compile_pattern")
+_GLOB_CHARACTERS = "*?["
+
+
+def _is_regex(name: str) -> bool:
+    return len(name) > 2 and name.startswith("/") and name.endswith("/")
+
+
+def is_pattern(name: str) -> bool:
+    """Determine whether a configured branch name is a glob pattern or regular expression."""
+    return _is_regex(name) or any(char in name for char in _GLOB_CHARACTERS)
+
+
+def compile_pattern(name: str) -> Callable[[str], bool]:
+    """Build a function that checks whether a branch name matches a configured pattern.
+
+    :raises re.error: if the pattern is not a valid regular expression
+    """
+    if _is_regex(name):
+        return re.compile(name[1:-1]).search  # type: ignore
+
+    return re.compile(fnmatch.translate(name)).match  # type: ignore
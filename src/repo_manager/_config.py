@@ -0,0 +1,159 @@
+"""Load YAML files quickly.
+
+PyYAML's libyaml loader is used when PyYAML was built with it.
+It is many times faster than the pure Python loader on large config files.
+
+Parsed config files can also be cached by a digest of their content.
+The cache keeps each config in memory for the life of the process,
+so a fleet run parses a shared settings file once,
+and can also keep it on disk so that later runs do not parse it at all.
+"""
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import IO, Any, Callable, Dict, Optional, Set, Union
+
+import yaml
+
+__all__ = ("load_yaml", "ConfigCache", "LIBYAML")
+_LOGGER = logging.getLogger(__name__)
+LIBYAML = hasattr(yaml, "CSafeLoader")
+_SafeLoader = yaml.CSafeLoader if LIBYAML else yaml.SafeLoader
+# Change this whenever the cached form of a config changes.
+_FORMAT_VERSION = b"2"
+# Values that JSON cannot hold are stored as a mapping with only this key.
+_TAG = "$yaml"
+
+
+def load_yaml(stream: Union[str, bytes, IO]) -> Any:
+    """Parse a YAML document with the same rules as :func:`yaml.safe_load`."""
+    return yaml.load(stream, Loader=_SafeLoader)  # nosec
+
+
+def _encode(value: Any) -> Any:
+    """Convert a parsed YAML value to one that JSON can hold, tagging the types it cannot."""
+    if isinstance(value, datetime.datetime):
+        return {_TAG: ["datetime", value.isoformat()]}
+    if isinstance(value, datetime.date):
+        return {_TAG: ["date", value.isoformat()]}
+    if isinstance(value, bytes):
+        return {_TAG: ["binary", base64.b64encode(value).decode("ascii")]}
+    if isinstance(value, set):
+        return {_TAG: ["set", [_encode(item) for item in value]]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if _TAG in value or not all(isinstance(key, str) for key in value):
+            return {_TAG: ["map", [[_encode(key), _encode(item)] for key, item in value.items()]]}
+        return {key: _encode(item) for key, item in value.items()}
+    return value
+
+
+def _decode_tagged(value: Dict[str, Any]) -> Any:
+    """Convert a tagged JSON mapping back to the YAML value it was encoded from."""
+    if len(value) != 1 or _TAG not in value:
+        return value
+    kind, payload = value[_TAG]
+    if kind == "datetime":
+        return datetime.datetime.fromisoformat(payload)
+    if kind == "date":
+        return datetime.date.fromisoformat(payload)
+    if kind == "binary":
+        return base64.b64decode(payload)
+    if kind == "set":
+        return set(payload)
+    if kind == "map":
+        return {key: item for key, item in payload}
+    raise ValueError(f"Unknown config cache tag '{kind}'")
+
+
+def _decode(entry: str) -> Any:
+    return json.loads(entry, object_hook=_decode_tagged)
+
+
+class ConfigCache:
+    """Parsed config files keyed by a digest of their content.
+
+    Entries are stored as JSON, so every load returns a fresh copy
+    that handlers are free to modify,
+    and a cache entry can only ever hold data, never code.
+    This is safe to share between threads.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """Keep parsed configs in memory and, if ``directory`` is set, on disk there."""
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = {}
+        self._validated: Set[str] = set()
+
+    @staticmethod
+    def key(content: bytes) -> str:
+        """Build the cache key for a config file's content."""
+        return hashlib.sha256(_FORMAT_VERSION + b"\0" + content).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[str]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), "r") as raw:
+                return raw.read()
+        except OSError:
+            return None
+
+    def _write(self, key: str, entry: str):
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "w") as raw:
+                raw.write(entry)
+            os.replace(temp_path, self._path(key))
+        except OSError as error:
+            _LOGGER.debug("Unable to write config cache entry %s: %s", key, error)
+
+    def _parse(self, key: str, content: bytes) -> str:
+        entry = json.dumps(_encode(load_yaml(content) or {}))
+        self._write(key, entry)
+        return entry
+
+    def load(
+        self, path: str, validator: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Load a config file, parsing it only if its content has not been seen before.
+
+        An empty file is loaded as an empty config.
+
+        :param validator: function that raises if a config is invalid;
+            it is only called the first time each config is loaded by this process
+        """
+        with open(path, "rb") as raw:
+            content = raw.read()
+
+        key = self.key(content)
+        with self._lock:
+            entry = self._entries.get(key) or self._read(key)
+            if entry is not None:
+                try:
+                    config = _decode(entry)
+                except (ValueError, TypeError):
+                    _LOGGER.debug("Ignoring unreadable config cache entry %s", key)
+                    entry = None
+            if entry is None:
+                entry = self._parse(key, content)
+                config = _decode(entry)
+            if validator is not None and key not in self._validated:
+                validator(config)
+                self._validated.add(key)
+            self._entries[key] = entry
+
+        return config
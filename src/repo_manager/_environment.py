@@ -0,0 +1,38 @@
+"""Read action inputs from the environment.
+
+This module only uses the standard library
+so that commands that never contact GitHub can read inputs without loading the API clients.
+"""
+import os
+
+from .exceptions import UserConfigError
+
+__all__ = ("load_from_environment", "load_count_from_environment", "NOT_SET")
+NOT_SET = object()
+
+
+def load_from_environment(*names: str, kind: str, default: str = NOT_SET) -> str:
+    """Return the first environment variable value that is set and not empty."""
+    for name in names:
+        value = os.environ.get(name, None)
+        if value:
+            return value
+
+    if default is not NOT_SET:
+        return default
+
+    raise UserConfigError(f"{kind} not set")
+
+
+def load_count_from_environment(name: str, kind: str, default: str) -> int:
+    """Return a positive integer from an environment variable."""
+    raw = load_from_environment(name, kind=kind, default=default)
+    try:
+        value = int(raw)
+    except ValueError:
+        raise UserConfigError(f"Invalid {kind.lower()} value '{raw}'")
+
+    if value < 1:
+        raise UserConfigError(f"{kind} must be at least 1, not {value}")
+
+    return value
@@ -0,0 +1,109 @@
+"""Persistent cache of conditional-request validators.
+
+GitHub does not count ``304 Not Modified`` responses against the rate limit,
+so revalidating a cached response is much cheaper than fetching it again.
+Entries are stored as one JSON file each so that the cache directory
+can be persisted between workflow runs (for example with ``actions/cache``)
+and shared by concurrent processes.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ("ETagCache", "CachedResponse")
+_LOGGER = logging.getLogger(__name__)
+# Request headers that change what the response body contains.
+_VARY_HEADERS = ("accept", "authorization")
+
+
+@dataclass
+class CachedResponse:
+    """A stored response and its validators."""
+
+    url: str
+    headers: List[Tuple[str, str]]
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def validators(self) -> Dict[str, str]:
+        """Build the conditional request headers for this response."""
+        headers = {}
+        if self.etag is not None:
+            headers["if-none-match"] = self.etag
+        if self.last_modified is not None:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+
+class ETagCache:
+    """Disk-backed store of GET responses keyed by URL and the request headers that vary them."""
+
+    def __init__(self, directory: str):
+        """Use ``directory`` for cache entries, creating it if needed."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, headers: Dict[str, str]) -> str:
+        """Build the cache key for a request.
+
+        Credentials are only ever stored as part of a hash.
+        """
+        digest = hashlib.sha256(url.encode("utf-8"))
+        for name in _VARY_HEADERS:
+            digest.update(b"\0" + headers.get(name, "").encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[CachedResponse]:
+        """Load a cached response, if there is a usable one."""
+        try:
+            with open(self._path(key), "r") as raw:
+                entry = json.load(raw)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            _LOGGER.debug("Ignoring unreadable cache entry %s", key)
+            return None
+
+        return CachedResponse(
+            url=entry["url"],
+            headers=[tuple(header) for header in entry["headers"]],  # type: ignore
+            body=base64.b64decode(entry["body"]),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+        )
+
+    def store(self, key: str, response: CachedResponse):
+        """Store a response.
+
+        The entry is written to a temporary file and then moved into place
+        so that concurrent readers never see a partial entry.
+        """
+        if response.etag is None and response.last_modified is None:
+            return
+
+        entry = dict(
+            url=response.url,
+            headers=response.headers,
+            body=base64.b64encode(response.body).decode("ascii"),
+            etag=response.etag,
+            last_modified=response.last_modified,
+        )
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as raw:
+                json.dump(entry, raw)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            _LOGGER.debug("Unable to write cache entry %s", key, exc_info=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
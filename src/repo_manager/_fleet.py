@@ -0,0 +1,220 @@
+"""Apply one config file to many repositories in a single process."""
+import asyncio
+import contextvars
+import fnmatch
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+from github.GithubException import UnknownObjectException
+
+from ._config import load_yaml
+from ._groups import apply_config, apply_config_async, parse_config
+from ._tracing import span
+from ._util import Inputs, RepoContext, split_repository_name
+from ._verify import no_writes
+from .exceptions import RepoAdminError, UserConfigError
+
+__all__ = (
+    "load_manifest",
+    "resolve_targets",
+    "run_fleet",
+    "run_fleet_async",
+    "FleetResult",
+    "write_report",
+)
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class FleetResult:
+    """Outcome of applying the config to one repository."""
+
+    repository: str
+    success: bool
+    duration: float
+    timings: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+def load_manifest(manifest_file: str) -> List[str]:
+    """Load the list of repository targets from a manifest file.
+
+    .. code-block:: yaml
+
+        repositories:
+          # Exact repository names
+          - mattsb42/repo-manager
+          # Glob patterns are matched against every repository the owner has.
+          # The owner must always be an exact name.
+          - mattsb42-meta/repo-manager-*
+
+    A bare list of targets is also accepted.
+    """
+    with open(manifest_file, "r") as raw:
+        manifest = load_yaml(raw)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("repositories")
+
+    if not isinstance(manifest, list) or not manifest:
+        raise UserConfigError(f"Fleet manifest '{manifest_file}' does not list any repositories")
+
+    return [str(target) for target in manifest]
+
+
+def _owner_repository_names(inputs: Inputs, owner: str) -> List[str]:
+    """List the names of all unarchived repositories that belong to an owner."""
+    try:
+        repos = inputs.github.get_organization(owner).get_repos()
+    except UnknownObjectException:
+        repos = inputs.github.get_user(owner).get_repos()
+
+    return [repo.name for repo in repos if not repo.archived]
+
+
+def resolve_targets(inputs: Inputs, targets: Iterable[str]) -> List[RepoContext]:
+    """Expand manifest targets into repository contexts.
+
+    Each owner is listed at most once, no matter how many patterns reference it.
+    Repositories matched by more than one target are only included once.
+    """
+    owner_repos: Dict[str, List[str]] = {}
+    contexts: Dict[str, RepoContext] = {}
+
+    for target in targets:
+        context = split_repository_name(target)
+        if not any(char in context.repo for char in "*?["):
+            contexts.setdefault(target, context)
+            continue
+
+        if context.owner not in owner_repos:
+            owner_repos[context.owner] = _owner_repository_names(inputs, context.owner)
+
+        matches = fnmatch.filter(owner_repos[context.owner], context.repo)
+        if not matches:
+            _LOGGER.warning("Fleet target '%s' did not match any repositories.", target)
+
+        for name in matches:
+            contexts.setdefault(
+                f"{context.owner}/{name}", RepoContext(owner=context.owner, repo=name)
+            )
+
+    return list(contexts.values())
+
+
+def _apply_repo(inputs: Inputs, context: RepoContext) -> FleetResult:
+    name = f"{context.owner}/{context.repo}"
+    _LOGGER.info("Applying config to repository '%s'", name)
+    start = time.perf_counter()
+    try:
+        with span(name, "repository"):
+            prepped_config = parse_config(inputs, context)
+            timings = apply_config(prepped_config, max_workers=inputs.max_workers)
+            if inputs.verify_idempotent:
+                with no_writes(f"'{name}'"):
+                    apply_config(
+                        parse_config(inputs, context, use_state_store=False),
+                        max_workers=inputs.max_workers,
+                    )
+    except Exception as error:  # pylint: disable=broad-except
+        _LOGGER.exception("Failed to apply config to repository '%s'", name)
+        return FleetResult(
+            repository=name, success=False, duration=time.perf_counter() - start, error=repr(error)
+        )
+
+    return FleetResult(
+        repository=name, success=True, duration=time.perf_counter() - start, timings=timings
+    )
+
+
+def run_fleet(inputs: Inputs, contexts: List[RepoContext]) -> List[FleetResult]:
+    """Apply the config to every repository, several repositories at a time.
+
+    A failure in one repository does not stop the others.
+
+    :returns: one result per repository, in the same order as ``contexts``
+    """
+    with ThreadPoolExecutor(
+        max_workers=inputs.fleet_workers, thread_name_prefix="repo"
+    ) as executor:
+        # Each repository runs in its own copy of the caller's context so that traces nest.
+        futures = [
+            executor.submit(contextvars.copy_context().run, _apply_repo, inputs, context)
+            for context in contexts
+        ]
+        return [future.result() for future in futures]
+
+
+async def _apply_repo_async(
+    inputs: Inputs, context: RepoContext, semaphore: asyncio.Semaphore
+) -> FleetResult:
+    name = f"{context.owner}/{context.repo}"
+    async with semaphore:
+        _LOGGER.info("Applying config to repository '%s'", name)
+        start = time.perf_counter()
+        try:
+            with span(name, "repository"):
+                loop = asyncio.get_event_loop()
+                prepped_config = await loop.run_in_executor(None, parse_config, inputs, context)
+                timings = await apply_config_async(prepped_config, max_workers=inputs.max_workers)
+                if inputs.verify_idempotent:
+                    with no_writes(f"'{name}'"):
+                        prepped_config = await loop.run_in_executor(
+                            None, partial(parse_config, inputs, context, use_state_store=False)
+                        )
+                        await apply_config_async(prepped_config, max_workers=inputs.max_workers)
+        except Exception as error:  # pylint: disable=broad-except
+            _LOGGER.exception("Failed to apply config to repository '%s'", name)
+            return FleetResult(
+                repository=name,
+                success=False,
+                duration=time.perf_counter() - start,
+                error=repr(error),
+            )
+
+    return FleetResult(
+        repository=name, success=True, duration=time.perf_counter() - start, timings=timings
+    )
+
+
+async def run_fleet_async(inputs: Inputs, contexts: List[RepoContext]) -> List[FleetResult]:
+    """Apply the config to every repository using the asyncio engine.
+
+    ``inputs.aiogithub`` must already be open.
+    All repositories share its session.
+
+    :returns: one result per repository, in the same order as ``contexts``
+    """
+    semaphore = asyncio.Semaphore(inputs.fleet_workers)
+    return list(
+        await asyncio.gather(
+            *(_apply_repo_async(inputs, context, semaphore) for context in contexts)
+        )
+    )
+
+
+def write_report(results: List[FleetResult], report_file: Optional[str]):
+    """Log a summary of the fleet run and optionally write the full report as JSON.
+
+    :raises RepoAdminError: if any repository failed
+    """
+    failures = [result for result in results if not result.success]
+    _LOGGER.info(
+        "Fleet run complete: %d repositories succeeded, %d failed.",
+        len(results) - len(failures),
+        len(failures),
+    )
+
+    if report_file is not None:
+        with open(report_file, "w") as report:
+            json.dump([asdict(result) for result in results], report, indent=2)
+        _LOGGER.info("Fleet report written to '%s'", report_file)
+
+    if failures:
+        names = ", ".join(result.repository for result in failures)
+        raise RepoAdminError(f"Failed to apply config to repositories: {names}")
@@ -0,0 +1,211 @@
+"""Read the current state of a repository with batched GraphQL queries.
+
+One query fetches the first page of every connection that the configured groups read,
+along with the protection rule of every configured branch.
+Connections with more pages are then fetched together,
+each with its own cursor,
+so a read takes as many round trips as the longest connection has pages
+rather than one or more per group.
+
+Teams and pending invitations have no repository connection in the GraphQL API,
+so the handlers still read those with REST.
+
+https://docs.github.com/en/graphql/reference/objects#repository
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from agithub.GitHub import GitHub
+
+from ._branch_patterns import is_pattern
+from .exceptions import RepoAdminError
+
+__all__ = ("RepositoryState", "fetch_state", "GRAPHQL_GROUPS", "PAGE_SIZE")
+_LOGGER = logging.getLogger(__name__)
+PAGE_SIZE = 100
+# Each branch is one aliased field, so long branch lists are split across queries.
+_BRANCHES_PER_QUERY = 100
+_PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+# Collaborator permissions, as the permission names used in the config.
+_PERMISSIONS = dict(ADMIN="admin", MAINTAIN="maintain", WRITE="push", TRIAGE="triage", READ="pull")
+_RULE_FIELDS = " ".join(
+    (
+        "pattern",
+        "isAdminEnforced",
+        "requiresApprovingReviews",
+        "requiredApprovingReviewCount",
+        "dismissesStaleReviews",
+        "requiresCodeOwnerReviews",
+        "requiresStatusChecks",
+        "requiresStrictStatusChecks",
+        "requiredStatusCheckContexts",
+        "restrictsPushes",
+    )
+)
+
+
+@dataclass(frozen=True)
+class _Connection:
+    """A paginated repository connection and the fields read from each page."""
+
+    arguments: str
+    selection: str
+
+
+_CONNECTIONS = dict(
+    labels=_Connection(arguments="", selection="nodes { name color description }"),
+    milestones=_Connection(
+        arguments="states: [OPEN, CLOSED]",
+        selection="nodes { number title state description dueOn }",
+    ),
+    collaborators=_Connection(
+        arguments="affiliation: DIRECT", selection="edges { permission node { login } }"
+    ),
+)
+# Groups whose current state is included in a GraphQL read.
+GRAPHQL_GROUPS = tuple(_CONNECTIONS) + ("branches",)
+
+
+@dataclass
+class RepositoryState:
+    """Current state of a repository, for the groups that were read.
+
+    Collections for groups that were not read are ``None``.
+    """
+
+    #: name, color, and description of each label
+    labels: Optional[List[Tuple[str, str, Optional[str]]]] = None
+    #: number, title, state, description, and due_on of each milestone
+    milestones: Optional[List[Dict[str, Any]]] = None
+    #: login and permission string of each collaborator
+    collaborators: Optional[List[Tuple[str, str]]] = None
+    #: protection rule of each configured branch that exists, or ``None`` if it is unprotected
+    branches: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+    #: number of queries the read took
+    queries: int = field(default=0, compare=False)
+
+
+def _due_on(raw: Optional[str]) -> Optional[datetime]:
+    if raw is None:
+        return None
+    return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+
+
+def _build_query(
+    cursors: Dict[str, Optional[str]], branches: List[str]
+) -> Tuple[str, Dict[str, Any]]:
+    """Build one query for the next page of each connection in ``cursors`` and for ``branches``."""
+    declarations = ["$owner: String!", "$name: String!"]
+    variables: Dict[str, Any] = {}
+    fields = []
+    for name, cursor in cursors.items():
+        connection = _CONNECTIONS[name]
+        declarations.append(f"${name}: String")
+        variables[name] = cursor
+        arguments = ", ".join(
+            part
+            for part in (f"first: {PAGE_SIZE}", f"after: ${name}", connection.arguments)
+            if part
+        )
+        fields.append(f"{name}({arguments}) {{ {_PAGE_INFO} {connection.selection} }}")
+
+    for index, branch in enumerate(branches):
+        declarations.append(f"$branch{index}: String!")
+        variables[f"branch{index}"] = f"refs/heads/{branch}"
+        fields.append(
+            f"branch{index}: ref(qualifiedName: $branch{index}) "
+            f"{{ name branchProtectionRule {{ {_RULE_FIELDS} }} }}"
+        )
+
+    query = (
+        f"query({', '.join(declarations)}) "
+        f"{{ repository(owner: $owner, name: $name) {{ {' '.join(fields)} }} }}"
+    )
+    return query, variables
+
+
+def _collect(state: RepositoryState, name: str, page: Dict[str, Any]):
+    if name == "labels":
+        state.labels.extend(  # type: ignore
+            (label["name"], label["color"], label["description"]) for label in page["nodes"]
+        )
+    elif name == "milestones":
+        state.milestones.extend(  # type: ignore
+            dict(
+                number=milestone["number"],
+                title=milestone["title"],
+                state=milestone["state"].lower(),
+                description=milestone["description"],
+                due_on=_due_on(milestone["dueOn"]),
+            )
+            for milestone in page["nodes"]
+        )
+    else:
+        state.collaborators.extend(  # type: ignore
+            (edge["node"]["login"], _PERMISSIONS[edge["permission"]]) for edge in page["edges"]
+        )
+
+
+def _send(agithub: GitHub, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+    status, response = agithub.graphql.post(body=dict(query=query, variables=variables))
+    if status != 200:
+        raise RepoAdminError(f"Encountered unknown error: STATUS {status} :: {response}")
+
+    errors = response.get("errors")
+    if errors:
+        messages = "; ".join(error.get("message", str(error)) for error in errors)
+        raise RepoAdminError(f"GraphQL query failed: {messages}")
+
+    repository = response["data"]["repository"]
+    if repository is None:
+        raise RepoAdminError(f"Repository '{variables['owner']}/{variables['name']}' not found")
+    return repository
+
+
+def fetch_state(agithub: GitHub, owner: str, repo: str, config: Dict[str, Any]) -> RepositoryState:
+    """Read the current state of every group in ``config`` that has a GraphQL read.
+
+    :param config: config groups to read state for; only branch names are read from the config itself
+    """
+    state = RepositoryState()
+    cursors: Dict[str, Optional[str]] = {}
+    for name in _CONNECTIONS:
+        if name in config:
+            setattr(state, name, [])
+            cursors[name] = None
+
+    pending_branches: List[str] = []
+    if "branches" in config:
+        state.branches = {}
+        # Branch patterns are expanded against the REST branch listing by the handler.
+        pending_branches = list(
+            dict.fromkeys(
+                branch["name"] for branch in config["branches"] if not is_pattern(branch["name"])
+            )
+        )
+
+    while cursors or pending_branches:
+        branches = pending_branches[:_BRANCHES_PER_QUERY]
+        pending_branches = pending_branches[_BRANCHES_PER_QUERY:]
+        query, variables = _build_query(cursors, branches)
+        variables.update(owner=owner, name=repo)
+        repository = _send(agithub, query, variables)
+        state.queries += 1
+
+        next_cursors = {}
+        for name in cursors:
+            page = repository[name]
+            _collect(state, name, page)
+            if page["pageInfo"]["hasNextPage"]:
+                next_cursors[name] = page["pageInfo"]["endCursor"]
+        cursors = next_cursors
+
+        for index, branch in enumerate(branches):
+            ref = repository[f"branch{index}"]
+            if ref is not None:
+                state.branches[branch] = ref["branchProtectionRule"]  # type: ignore
+
+    _LOGGER.debug("Read state for '%s/%s' in %d GraphQL queries", owner, repo, state.queries)
+    return state
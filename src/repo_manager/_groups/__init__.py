@@ -1,60 +1,249 @@
 """Handlers for all data groups."""
+import asyncio
+import contextvars
 import importlib
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from functools import partial
-from typing import Any, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
 
-import yaml
-from github.GithubException import UnknownObjectException
-
-from .._util import HandlerRequest, Inputs, RepoContext
+from .._config import ConfigCache
+from .._select import load_previous_config, select_groups
+from .._state import FastPath
+from .._tracing import span
+from .._validate import validate_config
+from .._util import CONTEXT_NAMES, HandlerRequest, Inputs, RepoContext, RepoResources
 from ..exceptions import RepoAdminError
 
-__all__ = ("parse_config", "apply_config")
+__all__ = (
+    "load_config",
+    "parse_config",
+    "apply_config",
+    "apply_config_async",
+    "DEFAULT_MAX_WORKERS",
+)
+_LOGGER = logging.getLogger(__name__)
+DEFAULT_MAX_WORKERS = 4
+# Groups that must finish before any other group starts.
+# A repository rename or default branch change alters what every other group targets,
+# so nothing else may run until the repository group is done.
+_BARRIER_GROUPS = ("repository",)
+
+
+def _sync_adapter(
+    handler: Callable[[HandlerRequest], None]
+) -> Callable[[HandlerRequest], Awaitable[None]]:
+    """Wrap a sync handler so that the asyncio engine can run it in a worker thread."""
 
+    async def _adapted(request: HandlerRequest):
+        loop = asyncio.get_event_loop()
+        # Executor threads do not inherit the caller's context, so carry it over for tracing.
+        await loop.run_in_executor(None, contextvars.copy_context().run, handler, request)
 
-def _load_handler(group: str) -> Callable[[RepoContext, str, Any], None]:
+    return _adapted
+
+
+def _load_handler(group: str, use_async: bool = False) -> Callable[[HandlerRequest], Any]:
     try:
         handler = importlib.import_module(f"{__name__}.{group}")
     except Exception:
         raise RepoAdminError(f"Unknown config group '{group}'")
 
+    if use_async:
+        # Handlers without native async support still work through a thread adapter.
+        if hasattr(handler, "apply_async"):
+            return handler.apply_async  # type: ignore
+        return _sync_adapter(handler.apply)  # type: ignore
+
     # mypy doesn't know how to follow module import magic
     return handler.apply  # type: ignore
 
 
-def parse_config(inputs: Inputs, context: RepoContext) -> Dict[str, Callable[[], None]]:
+def _load_requirements(group: str) -> Iterable[str]:
+    """Determine which repository and organization objects a group handler uses.
+
+    Handlers declare these in a module-level ``REQUIRES``.
+    Handlers that do not declare anything may use everything.
+    """
+    handler = importlib.import_module(f"{__name__}.{group}")
+    return getattr(handler, "REQUIRES", CONTEXT_NAMES)
+
+
+def _load_snapshot(group: str) -> Optional[Callable[[HandlerRequest], Any]]:
+    """Find the function that captures a group's remote state, if the handler has one."""
+    handler = importlib.import_module(f"{__name__}.{group}")
+    return getattr(handler, "snapshot", None)
+
+
+def load_config(inputs: Inputs) -> Dict[str, Any]:
+    """Load the config file and check all of it against the group schemas.
+
+    Nothing is sent to GitHub, so an invalid config fails before any API call.
+    """
+    config_cache = inputs.config_cache if inputs.config_cache is not None else ConfigCache()
+    return config_cache.load(
+        inputs.config_file,
+        validator=partial(validate_config, source=f"config file '{inputs.config_file}'"),
+    )
+
+
+def parse_config(
+    inputs: Inputs, context: RepoContext, use_state_store: bool = True
+) -> Dict[str, Callable[[], Any]]:
     """Parse a config file give inputs and context.
 
+    If ``inputs`` includes an async client,
+    the curried handlers are coroutine functions for :func:`apply_config_async`.
+
+    No API calls are made here, and the whole config is checked before anything is returned.
+    Each handler resolves the repository and organization objects it declares on first use,
+    and those objects are shared by all handlers.
+
+    Only the groups selected by ``inputs`` are included.
+    If ``inputs`` names a previous config,
+    groups that are unchanged from it are left out.
+    If ``inputs`` includes a state store and ``use_state_store`` is set,
+    groups that have not changed since they were last applied are skipped.
+    A verification pass turns this off, so that every group is applied again in full
+    and no state is recorded.
+
     :returns: mapping of group name to curried handlers
     """
-    with open(inputs.config_file, "r") as raw:
-        raw_config = yaml.safe_load(raw)
+    raw_config = load_config(inputs)
 
-    repository = inputs.github.get_repo(full_name_or_id=f"{context.owner}/{context.repo}")
-    repo = getattr(getattr(inputs.agithub.repos, context.owner), context.repo)
-    try:
-        organization = inputs.github.get_organization(context.owner)
-
-    except UnknownObjectException:
-        organization = None
-
-    org = getattr(inputs.agithub.orgs, context.owner)
-    status, _org_data = org.get()
-    if status != 200:
-        org = None
-
-    return {
-        group: partial(
-            _load_handler(group),
-            HandlerRequest(
-                data=data, repository=repository, arepo=repo, organization=organization, aorg=org
-            ),
+    previous = load_previous_config(
+        inputs.config_file, inputs.previous_config_file, inputs.previous_ref
+    )
+    raw_config = select_groups(raw_config, previous, only=inputs.only, skip=inputs.skip)
+
+    use_async = inputs.aiogithub is not None
+    resources = RepoResources(inputs, context, raw_config)
+    fast_path = None
+    if inputs.state_store is not None and use_state_store:
+        fast_path = FastPath(inputs.state_store, f"{context.owner}/{context.repo}")
+
+    prepped: Dict[str, Callable[[], Any]] = {}
+    for group, data in raw_config.items():
+        handler = _load_handler(group, use_async=use_async)
+        request = HandlerRequest(
+            data=data,
+            resources=resources,
+            requires=_load_requirements(group),
+            write_workers=inputs.write_workers,
+            team_directory=inputs.team_directory,
         )
-        for group, data in raw_config.items()
-    }
+        snapshot = _load_snapshot(group)
+
+        if fast_path is not None and snapshot is not None:
+            prepped[group] = fast_path.wrap(group, handler, snapshot, request, use_async=use_async)
+        else:
+            prepped[group] = partial(handler, request)
+
+    return prepped
 
 
-def apply_config(config: Dict[str, Callable[[], None]]):
-    """Apply curried config handlers."""
-    for prepped in config.values():
-        prepped()
+def _dependencies(group: str, groups: Iterable[str]) -> Set[str]:
+    """Determine which of the requested groups must finish before ``group`` can start."""
+    if group in _BARRIER_GROUPS:
+        return set()
+
+    return {barrier for barrier in _BARRIER_GROUPS if barrier in groups}
+
+
+def _timed(group: str, handler: Callable[[], None]) -> float:
+    """Run a handler and return how long it took in seconds."""
+    start = time.perf_counter()
+    with span(group, "group"):
+        handler()
+    return time.perf_counter() - start
+
+
+def apply_config(
+    config: Dict[str, Callable[[], None]], max_workers: int = DEFAULT_MAX_WORKERS
+) -> Dict[str, float]:
+    """Apply curried config handlers.
+
+    Groups are applied concurrently on a bounded worker pool
+    as soon as every group they depend on has finished.
+    If any group fails, no further groups are started
+    and the first error is raised once running groups complete.
+
+    :param config: mapping of group name to curried handlers
+    :param max_workers: maximum number of groups to apply at once
+    :returns: mapping of group name to wall time in seconds
+    """
+    pending = dict(config)
+    running: Dict[Future, str] = {}
+    finished: Set[str] = set()
+    timings: Dict[str, float] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="group") as executor:
+        while pending or running:
+            for group in list(pending):
+                if _dependencies(group, config) <= finished:
+                    _LOGGER.debug("Starting group '%s'", group)
+                    future = executor.submit(
+                        contextvars.copy_context().run, _timed, group, pending.pop(group)
+                    )
+                    running[future] = group
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                group = running.pop(future)
+                try:
+                    timings[group] = future.result()
+                except Exception:
+                    _LOGGER.error("Group '%s' failed. Not starting any remaining groups.", group)
+                    pending.clear()
+                    raise
+                finished.add(group)
+                _LOGGER.info("Group '%s' applied in %.3f seconds", group, timings[group])
+
+    return timings
+
+
+async def apply_config_async(
+    config: Dict[str, Callable[[], Awaitable[None]]], max_workers: int = DEFAULT_MAX_WORKERS
+) -> Dict[str, float]:
+    """Apply curried async config handlers on the running event loop.
+
+    Ordering and concurrency follow the same rules as :func:`apply_config`.
+    If any group fails, all groups that have not finished are cancelled.
+
+    :param config: mapping of group name to curried async handlers
+    :param max_workers: maximum number of groups to apply at once
+    :returns: mapping of group name to wall time in seconds
+    """
+    semaphore = asyncio.Semaphore(max_workers)
+    finished = {group: asyncio.Event() for group in config}
+    timings: Dict[str, float] = {}
+
+    async def _run(group: str, handler: Callable[[], Awaitable[None]]):
+        for dependency in _dependencies(group, config):
+            await finished[dependency].wait()
+
+        async with semaphore:
+            _LOGGER.debug("Starting group '%s'", group)
+            start = time.perf_counter()
+            try:
+                with span(group, "group"):
+                    await handler()
+            except Exception:
+                _LOGGER.error("Group '%s' failed. Cancelling all remaining groups.", group)
+                raise
+            timings[group] = time.perf_counter() - start
+
+        _LOGGER.info("Group '%s' applied in %.3f seconds", group, timings[group])
+        finished[group].set()
+
+    tasks = [asyncio.ensure_future(_run(group, handler)) for group, handler in config.items()]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return timings
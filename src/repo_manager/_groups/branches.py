@@ -1,14 +1,326 @@
 """Handler for applying branch protections settings.
 
 See https://developer.github.com/v3/repos/branches/#update-branch-protection for all available settings.
+
+The current protection of each branch is compared with the config first.
+Nothing is sent when they match.
+When only one section differs, only that section is updated through its own endpoint.
+
+Patterns in branch names are expanded against the repository's branch list,
+read one page at a time, and each page of matching branches is protected concurrently.
+The list says which branches are protected,
+so unprotected branches are protected without being read first.
+Protected branches are always read and compared,
+so protection that was changed by hand is restored even while the config is unchanged.
 """
+import hashlib
 import logging
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from .._util import HandlerRequest
+from .._branch_patterns import compile_pattern, is_pattern
+from .._state import digest
+from .._util import HandlerRequest, arepo_request, arepo_send
+from .._writes import Write, run_writes
+from ..exceptions import RepoAdminError
 
-__all__ = ("apply",)
+__all__ = ("apply", "snapshot")
 _LOGGER = logging.getLogger(__name__)
+REQUIRES = ("repository", "arepo", "state")
 HEADERS = dict(Accept="application/vnd.github.luke-cage-preview+json")
+# Sections of a protection that have their own endpoints, and are absent from a response when off.
+_SECTIONS = (
+    "required_status_checks",
+    "enforce_admins",
+    "required_pull_request_reviews",
+    "restrictions",
+)
+_ACTORS = ("users", "teams", "apps")
+
+
+def snapshot(request: HandlerRequest) -> Any:
+    """Capture the current protection of every configured branch so that drift can be detected.
+
+    Branches matched by a pattern are captured by name and, if they are protected, their protection.
+    """
+    exact = [
+        branch_config for branch_config in request.data if not is_pattern(branch_config["name"])
+    ]
+    patterns = [
+        branch_config for branch_config in request.data if is_pattern(branch_config["name"])
+    ]
+    captured: Dict[str, Any] = {
+        branch_config["name"]: arepo_send(
+            request.arepo, "GET", "branches", branch_config["name"], "protection", headers=HEADERS
+        )
+        for branch_config in exact
+    }
+    if patterns:
+        matched = {branch_config["name"]: hashlib.sha256() for branch_config in patterns}
+        exact_names = {branch_config["name"] for branch_config in exact}
+        for page in _expand(request, patterns, exact_names):
+            for name, protected, branch_config in page:
+                protection = (
+                    arepo_send(
+                        request.arepo, "GET", "branches", name, "protection", headers=HEADERS
+                    )
+                    if protected
+                    else None
+                )
+                matched[branch_config["name"]].update(
+                    f"{name}\0{digest(protection)}\n".encode("utf-8")
+                )
+        captured.update((pattern, value.hexdigest()) for pattern, value in matched.items())
+    return captured
+
+
+def _actors(values: Iterable[Any]) -> List[str]:
+    """Convert users, teams, or apps, given as names or as API objects, to sorted lower-case names."""
+    return sorted(
+        (value if isinstance(value, str) else value.get("login") or value["slug"]).lower()
+        for value in values
+    )
+
+
+def _normalize_value(key: str, value: Any) -> Any:
+    if isinstance(value, dict):
+        if "enabled" in value and set(value) <= {"url", "enabled"}:
+            return bool(value["enabled"])
+        return {
+            item_key: _normalize_value(item_key, item)
+            for item_key, item in value.items()
+            if not item_key.endswith("url")
+        }
+    if key in _ACTORS:
+        return _actors(value)
+    return value
+
+
+def _normalize(protection: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a branch protection response into the shape of the update request.
+
+    Users, teams, and apps become lists of logins and slugs,
+    settings reported as ``{"enabled": ...}`` become booleans,
+    and sections that are not reported are disabled.
+    """
+    normalized = {section: None for section in _SECTIONS}
+    normalized.update(
+        (key, _normalize_value(key, value))
+        for key, value in protection.items()
+        if not key.endswith("url")
+    )
+    return normalized
+
+
+def _matches(desired: Any, current: Any, key: str = "") -> bool:
+    """Check whether a normalized current value already has every setting that the config sets.
+
+    Settings that the config leaves out are not compared.
+    """
+    if key == "dismissal_restrictions" and not desired:
+        # An empty object turns dismissal restrictions off.
+        return not current or not any(current.values())
+    if desired is None:
+        return current is None or current is False
+    if isinstance(desired, bool):
+        return desired == bool(current)
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            _matches(value, current.get(item_key), item_key) for item_key, value in desired.items()
+        )
+    if isinstance(desired, list):
+        if key in _ACTORS:
+            return _actors(desired) == (current or [])
+        return sorted(map(repr, desired)) == sorted(map(repr, current or []))
+    return desired == current
+
+
+def _section_writes(
+    section: str, desired: Any, current: Any
+) -> Optional[List[Tuple[str, Tuple[str, ...], Any]]]:
+    """Find the sub-endpoint writes that change one section of an existing protection.
+
+    :returns: method, path parts, and body of each write,
+        or ``None`` if the section can only be changed by updating the whole protection
+    """
+    if section == "enforce_admins":
+        return [("POST" if desired else "DELETE", (section,), None)]
+    if section not in _SECTIONS:
+        return None
+    if desired is None:
+        return [("DELETE", (section,), None)]
+    if current is None:
+        # Sections can only be turned on by updating the whole protection.
+        return None
+    if section == "restrictions":
+        return [
+            ("PUT", (section, kind), {kind: desired[kind]})
+            for kind in _ACTORS
+            if kind in desired and not _matches(desired[kind], current.get(kind), kind)
+        ]
+    return [("PATCH", (section,), desired)]
+
+
+def _read(request: HandlerRequest, name: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Read the current protection of a branch configured by exact name.
+
+    :returns: whether the branch exists, and its normalized protection or ``None`` if unprotected
+    """
+    state = request.state
+    if state is not None:
+        # The GraphQL read already found which branches exist and which are protected.
+        if name not in state.branches:  # type: ignore
+            return False, None
+        if state.branches[name] is None:  # type: ignore
+            return True, None
+
+    return _read_protection(request, name)
+
+
+def _read_protection(request: HandlerRequest, name: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Read the current protection of a branch from the REST API.
+
+    :returns: whether the branch exists, and its normalized protection or ``None`` if unprotected
+    """
+    status, current_protection = arepo_send(
+        request.arepo, "GET", "branches", name, "protection", headers=HEADERS
+    )
+    if status == 404:
+        if (current_protection or {}).get("message") == "Branch not protected":
+            return True, None
+        return False, None
+    if status != 200:
+        raise RepoAdminError(f"Encountered unknown error: STATUS {status} :: {current_protection}")
+
+    return True, _normalize(current_protection)
+
+
+def _protect(
+    request: HandlerRequest,
+    name: str,
+    desired: Optional[Dict[str, Any]],
+    current: Optional[Dict[str, Any]],
+):
+    """Bring the protection of an existing branch from its normalized ``current`` protection to ``desired``."""
+    if desired is None:
+        if current is None:
+            _LOGGER.info("Branch '%s' is not protected, as configured. Skipping.", name)
+            return
+        _LOGGER.info("Removing branch protection for branch '%s'", name)
+        arepo_request(request.arepo, "DELETE", "branches", name, "protection", headers=HEADERS)
+        return
+
+    changed = (
+        [
+            section
+            for section, value in desired.items()
+            if not _matches(value, current.get(section), section)
+        ]
+        if current is not None
+        else list(desired)
+    )
+    if not changed:
+        _LOGGER.info("Branch protection for branch '%s' already matches config. Skipping.", name)
+        return
+
+    if current is not None and len(changed) == 1:
+        section = changed[0]
+        writes = _section_writes(section, desired[section], current[section])
+        if writes is not None and len(writes) == 1:
+            method, parts, body = writes[0]
+            _LOGGER.info("Updating '%s' branch protection for branch '%s'", section, name)
+            arepo_request(
+                request.arepo,
+                method,
+                "branches",
+                name,
+                "protection",
+                *parts,
+                body=body,
+                headers=HEADERS,
+            )
+            return
+
+    _LOGGER.info("Updating branch protection for branch '%s'", name)
+    arepo_request(
+        request.arepo, "PUT", "branches", name, "protection", body=desired, headers=HEADERS,
+    )
+
+
+def _update(request: HandlerRequest, branch_config: Dict[str, Any]):
+    name = branch_config["name"]
+    exists, current = _read(request, name)
+    if not exists:
+        _LOGGER.warning("Branch protection requested for non-existant branch '%s'. Skipping.", name)
+        return
+
+    _protect(request, name, branch_config["protection"], current)
+
+
+def _update_listed(
+    request: HandlerRequest, name: str, protected: bool, branch_config: Dict[str, Any]
+):
+    """Update a branch matched by a pattern, using what the branch listing says about it.
+
+    An unprotected branch needs no read.
+    A protected branch is read from the REST API,
+    since the GraphQL state only holds branches configured by exact name.
+    """
+    if not protected:
+        _protect(request, name, branch_config["protection"], None)
+        return
+
+    exists, current = _read_protection(request, name)
+    if not exists:
+        _LOGGER.warning("Branch '%s' was deleted after it was listed. Skipping.", name)
+        return
+
+    _protect(request, name, branch_config["protection"], current)
+
+
+def _listed_branches(request: HandlerRequest) -> Iterator[List[Tuple[str, bool]]]:
+    """List the name of each branch and whether it is protected, one page at a time.
+
+    Pages are not kept, so the full branch list is never held in memory.
+    """
+    branches = request.repository.get_branches()
+    page = 0
+    page_size = 0
+    while True:
+        items = branches.get_page(page)
+        if not items:
+            return
+        yield [(branch.name, branch.protected) for branch in items]
+        # Every page but the last is full, so a short page is the last one.
+        page_size = page_size or len(items)
+        if len(items) < page_size:
+            return
+        page += 1
+
+
+def _expand(
+    request: HandlerRequest, patterns: List[Dict[str, Any]], exact: Set[str]
+) -> Iterator[List[Tuple[str, bool, Dict[str, Any]]]]:
+    """Match listed branches against the configured patterns, one page at a time.
+
+    Branches configured by exact name are left to their own config.
+    Otherwise, the first pattern that matches a branch applies to it.
+
+    :returns: each page's matches, as branch name, whether it is protected, and branch config
+    """
+    matchers = [
+        (compile_pattern(branch_config["name"]), branch_config) for branch_config in patterns
+    ]
+    for page in _listed_branches(request):
+        matches = []
+        for name, protected in page:
+            if name in exact:
+                continue
+            for matcher, branch_config in matchers:
+                if matcher(name):
+                    matches.append((name, protected, branch_config))
+                    break
+        yield matches
 
 
 def apply(request: HandlerRequest):
@@ -17,6 +329,10 @@ def apply(request: HandlerRequest):
     .. code-block:: yaml
 
         branches:
+          # Exact branch name, a glob pattern such as `release/*`,
+          # or a regular expression wrapped in slashes such as `/^release-[0-9]+$/`.
+          # Branches named exactly use their own entry;
+          # otherwise the first pattern that matches a branch applies to it.
           - name: master
             # https://developer.github.com/v3/repos/branches/#update-branch-protection
             # Branch Protection settings. Set to null to disable
@@ -60,21 +376,45 @@ def apply(request: HandlerRequest):
     _LOGGER.info("Applying branch protection settings")
     _LOGGER.info("Branch protection configuration:\n%s", request.data)
 
-    repo_url = request.arepo.url
-    for branch_config in request.data:
-        request.arepo.url = repo_url
-        _LOGGER.info("Updating branch protection for branch '%s'", branch_config["name"])
-        branch = getattr(request.arepo.branches, branch_config["name"])
-        protection = branch.protection
-        status, current_protection = protection.get(headers=HEADERS)
-        if status == 404:
-            _LOGGER.warning(
-                "Branch protection requested for non-existant branch '%s'. Skipping.",
-                branch_config["name"],
+    exact = [
+        branch_config for branch_config in request.data if not is_pattern(branch_config["name"])
+    ]
+    patterns = [
+        branch_config for branch_config in request.data if is_pattern(branch_config["name"])
+    ]
+
+    run_writes(
+        (
+            Write(
+                keys=frozenset((branch_config["name"],)),
+                send=partial(_update, request, branch_config),
             )
-        if status != 200:
-            raise Exception(f"Encountered unknown error: STATUS {status} :: {current_protection}")
+            for branch_config in exact
+        ),
+        max_workers=request.write_workers,
+    )
+
+    if not patterns:
+        return
 
-        protection.put(body=branch_config["protection"], headers=HEADERS)
+    matched = {branch_config["name"]: 0 for branch_config in patterns}
+    for page in _expand(request, patterns, {branch_config["name"] for branch_config in exact}):
+        for _name, _protected, branch_config in page:
+            matched[branch_config["name"]] += 1
+        run_writes(
+            (
+                Write(
+                    keys=frozenset((name,)),
+                    send=partial(_update_listed, request, name, protected, branch_config),
+                )
+                for name, protected, branch_config in page
+            ),
+            max_workers=request.write_workers,
+        )
 
-    request.arepo.url = repo_url
+    for branch_config in patterns:
+        _LOGGER.info(
+            "Branch pattern '%s' matched %d branches.",
+            branch_config["name"],
+            matched[branch_config["name"]],
+        )
@@ -1,15 +1,236 @@
 """Handler for applying collaborators settings."""
+import asyncio
 import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
-from .._util import HandlerRequest, permission_to_string
+from .._schema import PERMISSIONS
+from .._util import HandlerRequest, arepo_request, permission_to_string
+from .._writes import Write, run_writes, run_writes_async
+from ..exceptions import RepoAdminError
 
-__all__ = ("apply",)
+__all__ = ("apply", "apply_async", "snapshot")
 _LOGGER = logging.getLogger(__name__)
+REQUIRES = ("repository", "arepo", "aiorepo", "state")
+# Collaborator roles and invitation permissions that have a different name in the config.
+_ROLE_PERMISSIONS = dict(read="pull", write="push")
+_INVITATION_PERMISSIONS = {value: key for key, value in _ROLE_PERMISSIONS.items()}
+
+
+@dataclass
+class _Change:
+    """A single collaborator or invitation write."""
+
+    action: str
+    username: str
+    permission: str = ""
+    invitation_id: int = 0
+
+    @property
+    def keys(self) -> FrozenSet[str]:
+        """User that this write touches. GitHub ignores case in user names."""
+        return frozenset((self.username.lower(),))
+
+
+@dataclass
+class _Invitation:
+    """A pending invitation to collaborate."""
+
+    invitation_id: int
+    username: str
+    permission: str
+
+
+def _permissions_to_string(permissions: Dict[str, bool]) -> str:
+    """Convert a REST API ``permissions`` object to the corresponding string."""
+    for name in ("admin", "push", "pull"):
+        if permissions.get(name):
+            return name
+
+    raise RepoAdminError(f"Unknown permissions: {permissions!r}")
+
+
+def _role_to_permission(role: Optional[str]) -> Optional[str]:
+    """Convert a collaborator role or invitation permission to the name used in the config.
+
+    Returns ``None`` for custom roles, which have no config name.
+    """
+    permission = _ROLE_PERMISSIONS.get(role, role)  # type: ignore
+    return permission if permission in PERMISSIONS else None
+
+
+def _collaborator_permission(role: Optional[str], permissions: Dict[str, bool]) -> str:
+    """Find the config permission of a collaborator from the REST API ``role_name`` and ``permissions``.
+
+    The role tells triage and maintain access apart from pull and push,
+    which ``permissions`` alone cannot.
+    """
+    return _role_to_permission(role) or _permissions_to_string(permissions)
+
+
+def _user_permission(user: Any) -> str:
+    """Find the config permission of a PyGithub collaborator.
+
+    ``role_name`` is only set by recent PyGithub releases.
+    Without it, triage and maintain access read as pull and push.
+    """
+    return _role_to_permission(getattr(user, "role_name", None)) or permission_to_string(
+        user.permissions
+    )
+
+
+def _plan(
+    data: List[Dict[str, Any]],
+    current: Iterable[Tuple[str, str]],
+    owner: str,
+    invitations: Iterable[_Invitation] = (),
+) -> List[_Change]:
+    """Determine the writes needed to move from the current collaborators to the config.
+
+    Pending invitations count as current state:
+    an invitation with the configured permission is kept,
+    one with a different permission is updated in place,
+    and one for a user who is not configured is deleted.
+    A collaborator whose permission changed is updated in place too.
+
+    :param data: collaborators config
+    :param current: login and permission string of each existing collaborator
+    :param owner: login of the repository owner, whose access is never changed
+    :param invitations: pending invitations
+    """
+    new_collaborators = {user["username"].lower(): user for user in data}
+    changes: List[_Change] = []
+
+    for login, current_permissions in current:
+        if login.lower() == owner.lower() and login.lower() not in new_collaborators:
+            continue
+
+        if login.lower() not in new_collaborators:
+            _LOGGER.info(
+                "Collaborator '%s' found with %s permissions not in config. Removing access for user.",
+                login,
+                current_permissions,
+            )
+            changes.append(_Change(action="remove", username=login))
+            continue
+
+        new_permissions = new_collaborators.pop(login.lower())["permission"]
+
+        if current_permissions == new_permissions:
+            _LOGGER.info(
+                "Found existing collaborator '%s' with expected %s permissions. Skipping.",
+                login,
+                current_permissions,
+            )
+        else:
+            _LOGGER.info(
+                "Collaborator '%s' found with %s permissions when %s permissions in config."
+                " Adjusting access for user.",
+                login,
+                current_permissions,
+                new_permissions,
+            )
+            changes.append(_Change(action="add", username=login, permission=new_permissions))
+
+    for invitation in invitations:
+        if invitation.username.lower() not in new_collaborators:
+            _LOGGER.info(
+                "Pending invitation for '%s' not in config. Deleting invitation.",
+                invitation.username,
+            )
+            changes.append(
+                _Change(
+                    action="uninvite",
+                    username=invitation.username,
+                    invitation_id=invitation.invitation_id,
+                )
+            )
+            continue
+
+        new_permissions = new_collaborators.pop(invitation.username.lower())["permission"]
+
+        if invitation.permission == new_permissions:
+            _LOGGER.info(
+                "Found pending invitation for '%s' with expected %s permissions. Skipping.",
+                invitation.username,
+                invitation.permission,
+            )
+        else:
+            _LOGGER.info(
+                "Pending invitation for '%s' found with %s permissions when %s permissions in"
+                " config. Updating invitation.",
+                invitation.username,
+                invitation.permission,
+                new_permissions,
+            )
+            changes.append(
+                _Change(
+                    action="reinvite",
+                    username=invitation.username,
+                    permission=new_permissions,
+                    invitation_id=invitation.invitation_id,
+                )
+            )
+
+    for collaborator in new_collaborators.values():
+        _LOGGER.info(
+            "Adding new collaborator '%s' with %s permissions.",
+            collaborator["username"],
+            collaborator["permission"],
+        )
+        changes.append(
+            _Change(
+                action="add",
+                username=collaborator["username"],
+                permission=collaborator["permission"],
+            )
+        )
+
+    return changes
+
+
+def snapshot(request: HandlerRequest) -> Any:
+    """Capture the current collaborators and pending invitations so that drift can be detected."""
+    return dict(
+        collaborators=sorted(
+            [user.login, _user_permission(user)]
+            for user in request.repository.get_collaborators(affiliation="direct")
+        ),
+        invitations=sorted(
+            [invite.invitee.login, invite.permissions]
+            for invite in request.repository.get_pending_invitations()
+        ),
+    )
+
+
+def _send_change(request: HandlerRequest, change: _Change):
+    if change.action == "remove":
+        request.repository.remove_from_collaborators(change.username)
+    elif change.action == "add":
+        request.repository.add_to_collaborators(change.username, permission=change.permission)
+    elif change.action == "uninvite":
+        request.repository.remove_invitation(change.invitation_id)
+    else:
+        arepo_request(
+            request.arepo,
+            "PATCH",
+            "invitations",
+            change.invitation_id,
+            body=dict(
+                permissions=_INVITATION_PERMISSIONS.get(change.permission, change.permission)
+            ),
+        )
 
 
 def apply(request: HandlerRequest):
     """Manage collaborators.
 
+    Pending invitations are kept when their permission matches the config,
+    so users who have not accepted yet are not invited again on every run.
+    Only direct collaborators are managed;
+    organization members with access through the organization or a team are left alone.
+
     .. code-block:: yaml
 
         # Collaborators: give specific users access to this repository.
@@ -18,7 +239,9 @@ def apply(request: HandlerRequest):
             # Note: Only valid on organization-owned repositories.
             # The permission to grant the collaborator. Can be one of:
             # * `pull` - can pull, but not push to or administer this repository.
+            # * `triage` - can pull and manage issues and pull requests.
             # * `push` - can pull and push, but not administer this repository.
+            # * `maintain` - can push and manage the repository without admin access.
             # * `admin` - can pull, push and administer this repository.
             permission: push
 
@@ -30,56 +253,93 @@ def apply(request: HandlerRequest):
     _LOGGER.info("Applying collaborator settings.")
     _LOGGER.info("Collaborators configuration:\n%s", request.data)
 
-    new_collaborators = {user["username"]: user for user in request.data}
+    state = request.state
+    if state is not None:
+        current: Iterable[Tuple[str, str]] = state.collaborators  # type: ignore
+    else:
+        current = (
+            (user.login, _user_permission(user))
+            for user in request.repository.get_collaborators(affiliation="direct")
+        )
+    invitations = (
+        _Invitation(
+            invitation_id=invite.id,
+            username=invite.invitee.login,
+            permission=_role_to_permission(invite.permissions) or invite.permissions,
+        )
+        for invite in request.repository.get_pending_invitations()
+    )
+    changes = _plan(request.data, current, request.repository.owner.login, invitations)
+
+    run_writes(
+        (
+            Write(keys=change.keys, send=partial(_send_change, request, change))
+            for change in changes
+        ),
+        max_workers=request.write_workers,
+    )
 
-    # First, clear all pending invites
-    for invite in request.repository.get_pending_invitations():
-        request.repository.remove_invitation(invite.id)
+    _LOGGER.info("Branch collaborator settings applied.")
 
-    # Then, sync collaborators
-    for collaborator in request.repository.get_collaborators():
-        current_permissions = permission_to_string(collaborator.permissions)
 
-        if (
-            collaborator.login not in new_collaborators
-            and collaborator.login != request.repository.owner
-        ):
-            _LOGGER.info(
-                "Collaborator '%s' found with %s permissions not in config. Removing access for user.",
-                collaborator.login,
-                current_permissions,
-            )
-            request.repository.remove_from_collaborators(collaborator)
-        else:
-            new_permissions = new_collaborators[collaborator.login]["permission"]
+async def _apply_change_async(request: HandlerRequest, change: _Change):
+    if change.action == "remove":
+        await request.aiorepo.request("DELETE", "collaborators", change.username)
+    elif change.action == "add":
+        await request.aiorepo.request(
+            "PUT", "collaborators", change.username, body=dict(permission=change.permission)
+        )
+    elif change.action == "uninvite":
+        await request.aiorepo.request("DELETE", "invitations", change.invitation_id)
+    else:
+        await request.aiorepo.request(
+            "PATCH",
+            "invitations",
+            change.invitation_id,
+            body=dict(
+                permissions=_INVITATION_PERMISSIONS.get(change.permission, change.permission)
+            ),
+        )
 
-            if current_permissions == new_permissions:
-                _LOGGER.info(
-                    "Found existing collaborator '%s' with expected %s permissions. Skipping.",
-                    collaborator.login,
-                    current_permissions,
-                )
-            else:
-                _LOGGER.info(
-                    "Collaborator '%s' found with %s permissions when %s permissions in config."
-                    " Adjusting access for user.",
-                    collaborator.login,
-                    current_permissions,
-                    new_permissions,
-                )
-                request.repository.remove_from_collaborators(collaborator)
-                request.repository.add_to_collaborators(collaborator, permission=new_permissions)
 
-            del new_collaborators[collaborator.login]
+async def apply_async(request: HandlerRequest):
+    """Manage collaborators using the asyncio engine.
 
-    for collaborator in new_collaborators.values():
-        _LOGGER.info(
-            "Adding new collaborator '%s' with %s permissions.",
-            collaborator["username"],
-            collaborator["permission"],
+    Accepts the same config as :func:`apply`.
+    """
+    _LOGGER.info("Applying collaborator settings.")
+    _LOGGER.info("Collaborators configuration:\n%s", request.data)
+
+    state = await request.state_async()
+    if state is not None:
+        invites = await request.aiorepo.get_all("invitations")
+        current: Iterable[Tuple[str, str]] = state.collaborators  # type: ignore
+    else:
+        invites, collaborators = await asyncio.gather(
+            request.aiorepo.get_all("invitations"),
+            request.aiorepo.get_all("collaborators", affiliation="direct"),
         )
-        request.repository.add_to_collaborators(
-            collaborator=collaborator["username"], permission=collaborator["permission"]
+        current = (
+            (user["login"], _collaborator_permission(user.get("role_name"), user["permissions"]))
+            for user in collaborators
         )
 
+    invitations = (
+        _Invitation(
+            invitation_id=invite["id"],
+            username=invite["invitee"]["login"],
+            permission=_role_to_permission(invite["permissions"]) or invite["permissions"],
+        )
+        for invite in invites
+    )
+    changes = _plan(request.data, current, request.aiorepo.owner, invitations)
+
+    await run_writes_async(
+        (
+            Write(keys=change.keys, send=partial(_apply_change_async, request, change))
+            for change in changes
+        ),
+        max_workers=request.write_workers,
+    )
+
     _LOGGER.info("Branch collaborator settings applied.")
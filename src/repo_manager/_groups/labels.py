@@ -1,11 +1,240 @@
 """Handler for applying labels settings."""
 import logging
-from typing import Dict
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
-from .._util import HandlerRequest
+from .._util import HandlerRequest, arepo_request
+from .._writes import Write, run_writes, run_writes_async
 
-__all__ = ("apply",)
+__all__ = ("apply", "apply_async", "snapshot")
 _LOGGER = logging.getLogger(__name__)
+REQUIRES = ("repository", "arepo", "aiorepo", "state")
+
+
+@dataclass
+class _Change:
+    """A single label write.
+
+    ``name`` is the current label name for edits and deletes
+    and the new label name for creates.
+    """
+
+    action: str
+    name: str
+    values: Dict[str, str]
+
+    @property
+    def keys(self) -> FrozenSet[str]:
+        """Label names that this write touches. GitHub ignores case in label names."""
+        names = {self.name, self.values.get("name", self.name)}
+        return frozenset(name.lower() for name in names)
+
+
+def _color(value: Any) -> str:
+    # YAML can interpret these as numbers but the API requires strings.
+    # Also, make sure that any leading # values are removed.
+    return str(value).replace("#", "")
+
+
+def _matches(current: Tuple[str, str, Optional[str]], label: Dict[str, str]) -> bool:
+    """Determine whether an existing label already has the configured values.
+
+    Colors are compared without regard to case,
+    a missing description is the same as an empty one,
+    and a label without a configured color or description keeps whatever it has.
+    """
+    name, color, description = current
+    return all(
+        (
+            name == label["name"],
+            "color" not in label or color.lower() == label["color"].lower(),
+            "description" not in label or (description or "") == (label["description"] or ""),
+        )
+    )
+
+
+def _temporary_name(taken: Set[str]) -> str:
+    """Find a label name that is not in use, to park a label on while a rename cycle is resolved."""
+    index = 1
+    while f"repo-manager-rename-{index}" in taken:
+        index += 1
+    name = f"repo-manager-rename-{index}"
+    taken.add(name)
+    return name
+
+
+def _configured_labels(data: List[Dict[str, Any]]) -> Dict[str, Dict[str, str]]:
+    """Index the configured labels by lower case name, as they are sent to the API.
+
+    The config itself is left unchanged, since it is reused across repositories.
+    """
+    labels: Dict[str, Dict[str, str]] = {}
+    for label in data:
+        values = {name: value for name, value in label.items() if name != "oldname"}
+        if "color" in label:
+            values["color"] = _color(label["color"])
+        labels[label["name"].lower()] = values
+    return labels
+
+
+def _rename_candidates(
+    data: List[Dict[str, Any]],
+    labels: Dict[str, Dict[str, str]],
+    existing: Dict[str, Tuple[str, str, Optional[str]]],
+) -> Dict[str, str]:
+    """Find the configured renames of existing labels that were not already done.
+
+    :returns: new name to old name, both lower case
+    """
+    renames: Dict[str, str] = {}
+    for label in data:
+        if "oldname" not in label:
+            continue
+        key = label["name"].lower()
+        old = label["oldname"].lower()
+        # A label that already has every configured value was renamed by an earlier run.
+        done = key in existing and _matches(existing[key], labels[key])
+        if old != key and old in existing and old not in renames.values() and not done:
+            renames[key] = old
+    return renames
+
+
+def _drop_settled_renames(
+    renames: Dict[str, str],
+    labels: Dict[str, Dict[str, str]],
+    existing: Dict[str, Tuple[str, str, Optional[str]]],
+):
+    """Drop renames of labels that stay where they are.
+
+    A rename is dropped if its old label is also configured under its own name,
+    or if its new name is held by an existing label that stays where it is.
+    """
+    dropped = True
+    while dropped:
+        dropped = False
+        for key, old in list(renames.items()):
+            if (old in labels and old not in renames) or (
+                key in existing and key not in renames.values()
+            ):
+                del renames[key]
+                dropped = True
+
+
+def _plan(
+    data: List[Dict[str, Any]], current: Iterable[Tuple[str, str, Optional[str]]]
+) -> List[_Change]:
+    """Determine the fewest label writes that move from the current labels to the configured labels.
+
+    GitHub ignores case in label names, so labels are matched without regard to case.
+    A configured ``oldname`` renames the existing label with that name,
+    unless a label with the new name already matches the config
+    or holds the new name without being renamed itself,
+    in which case the label is treated as already renamed.
+    Chains of renames are ordered so that each name is free before it is reused,
+    and a temporary name is only used to break a cycle of renames.
+
+    :param data: labels config
+    :param current: name, color, and description of each existing label
+    """
+    existing: Dict[str, Tuple[str, str, Optional[str]]] = {
+        name.lower(): (name, color, description) for name, color, description in current
+    }
+    labels = _configured_labels(data)
+    renames = _rename_candidates(data, labels, existing)
+    _drop_settled_renames(renames, labels, existing)
+
+    sources = set(renames.values())
+    changes: List[_Change] = []
+
+    for key, label_values in existing.items():
+        if key in sources:
+            continue
+
+        if key in labels:
+            if _matches(label_values, labels[key]):
+                _LOGGER.debug("Found label '%s' that matches config. Skipping.", label_values[0])
+            else:
+                _LOGGER.info(
+                    "Found label '%s' that is updated in config. Updating label.", label_values[0]
+                )
+                changes.append(
+                    _Change(action="edit", name=label_values[0], values=labels[key].copy())
+                )
+            continue
+
+        _LOGGER.info("Found label '%s' that is not in config. Deleting label.", label_values[0])
+        changes.append(_Change(action="delete", name=label_values[0], values={}))
+
+    changes.extend(_plan_renames(renames, labels, existing))
+
+    for key, label in labels.items():
+        if key not in renames and key not in existing:
+            _LOGGER.info("New label '%s' in config. Adding label.", label["name"])
+            changes.append(_Change(action="create", name=label["name"], values=label))
+
+    return changes
+
+
+def _plan_renames(
+    renames: Dict[str, str],
+    labels: Dict[str, Dict[str, str]],
+    existing: Dict[str, Tuple[str, str, Optional[str]]],
+) -> List[_Change]:
+    """Order renames so that every new name is free by the time it is used.
+
+    :param renames: new name to old name, both lower case
+    :param labels: configured labels by lower case name
+    :param existing: existing labels by lower case name
+    """
+    names = {key: values[0] for key, values in existing.items()}
+    taken = set(existing) | set(labels)
+    pending = dict(renames)
+    changes: List[_Change] = []
+
+    while pending:
+        sources = set(pending.values())
+        ready = [key for key in pending if key not in sources]
+        if not ready:
+            # Every remaining rename waits on another, so they form a cycle.
+            # Park one label on a temporary name to free its name for the rest of the cycle.
+            key = next(iter(pending))
+            old = pending[key]
+            temporary = _temporary_name(taken)
+            _LOGGER.info(
+                "Labels are renamed in a cycle. Renaming label '%s' to '%s' first.",
+                names[old],
+                temporary,
+            )
+            changes.append(_Change(action="edit", name=names[old], values=dict(name=temporary)))
+            names[temporary.lower()] = temporary
+            pending[key] = temporary.lower()
+            continue
+
+        for key in ready:
+            old = pending.pop(key)
+            _LOGGER.info("Found label '%s' that is renamed in config. Updating label.", names[old])
+            changes.append(_Change(action="edit", name=names[old], values=labels[key].copy()))
+
+    return changes
+
+
+def _apply_change(request: HandlerRequest, change: _Change):
+    if change.action == "create":
+        arepo_request(request.arepo, "POST", "labels", body=change.values)
+    elif change.action == "edit":
+        body = change.values.copy()
+        body["new_name"] = body.pop("name")
+        arepo_request(request.arepo, "PATCH", "labels", change.name, body=body)
+    else:
+        arepo_request(request.arepo, "DELETE", "labels", change.name)
+
+
+def snapshot(request: HandlerRequest) -> Any:
+    """Capture the current labels so that drift can be detected."""
+    return sorted(
+        [label.name, label.color, label.description] for label in request.repository.get_labels()
+    )
 
 
 def apply(request: HandlerRequest):
@@ -28,62 +257,63 @@ def apply(request: HandlerRequest):
 
           - name: first-timers-only
             # include the old name to rename an existing label
+            # the label keeps its current color unless one is set
             oldname: Help Wanted
 
     """
     _LOGGER.info("Applying label settings")
     _LOGGER.info("Labels configuration:\n%s", request.data)
 
-    requested_new_or_update: Dict[str, Dict[str, str]] = {}
-    requested_rename: Dict[str, Dict[str, str]] = {}
-
-    for label in request.data:
-        # YAML can interpret these as numbers but the API requires strings.
-        # Also, make sure that any leading # values are removed.
-        label["color"] = str(label["color"]).replace("#", "")
-        if "oldname" in label:
-            old_name = label["oldname"]
-            # prep rename and update scenarios
-            rename = label.copy()
-            del rename["oldname"]
-
-            # add to rename in case the label has not yet been renamed
-            requested_rename[old_name] = rename
-            # add to updates in case it has
-            requested_new_or_update[rename["name"]] = rename
-
-        else:
-            requested_new_or_update[label["name"]] = label
-
-    for label in request.repository.get_labels():
-        if label.name in requested_rename:
-            _LOGGER.info("Found label '%s' that is renamed in config. Updating label.", label.name)
-            new_values = requested_rename[label.name].copy()
-            old_name = label.name
-            label.edit(**new_values)
-            del requested_rename[old_name]
-            # The label has not previously been renamed, so remove it from the update request
-            del requested_new_or_update[label.name]
-            continue
+    state = request.state
+    if state is not None:
+        current: Iterable[Tuple[str, str, Optional[str]]] = state.labels  # type: ignore
+    else:
+        current = (
+            (label.name, label.color, label.description)
+            for label in request.repository.get_labels()
+        )
 
-        if label.name in requested_new_or_update:
-            new_values = requested_new_or_update[label.name].copy()
-            if not all(
-                (
-                    label.color == new_values["color"],
-                    label.description == new_values["description"],
-                )
-            ):
-                _LOGGER.info(
-                    "Found label '%s' that is updated in config. Updating label.", label.name,
-                )
-                label.edit(**new_values)
-            del requested_new_or_update[label.name]
-            continue
+    changes = _plan(request.data, current)
+    run_writes(
+        (
+            Write(keys=change.keys, send=partial(_apply_change, request, change))
+            for change in changes
+        ),
+        max_workers=request.write_workers,
+    )
+
+
+async def _apply_change_async(request: HandlerRequest, change: _Change):
+    if change.action == "create":
+        await request.aiorepo.request("POST", "labels", body=change.values)
+    elif change.action == "edit":
+        body = change.values.copy()
+        body["new_name"] = body.pop("name")
+        await request.aiorepo.request("PATCH", "labels", change.name, body=body)
+    else:
+        await request.aiorepo.request("DELETE", "labels", change.name)
+
+
+async def apply_async(request: HandlerRequest):
+    """Manage labels using the asyncio engine.
+
+    Accepts the same config as :func:`apply`.
+    """
+    _LOGGER.info("Applying label settings")
+    _LOGGER.info("Labels configuration:\n%s", request.data)
 
-        _LOGGER.info("Found label '%s' that is not in config. Deleting label.", label.name)
-        label.delete()
+    state = await request.state_async()
+    if state is not None:
+        current: Iterable[Tuple[str, str, Optional[str]]] = state.labels  # type: ignore
+    else:
+        labels = await request.aiorepo.get_all("labels")
+        current = ((label["name"], label["color"], label["description"]) for label in labels)
+    changes = _plan(request.data, current)
 
-    for name, label in requested_new_or_update.items():
-        _LOGGER.info("New label '%s' in config. Adding label.", name)
-        request.repository.create_label(**label)
+    await run_writes_async(
+        (
+            Write(keys=change.keys, send=partial(_apply_change_async, request, change))
+            for change in changes
+        ),
+        max_workers=request.write_workers,
+    )
@@ -1,11 +1,95 @@
 """Handler for applying milestones settings."""
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional
 
-from .._util import HandlerRequest
+from .._util import HandlerRequest, arepo_request
+from .._writes import Write, run_writes
 
-__all__ = ("apply",)
+__all__ = ("apply", "snapshot")
 _LOGGER = logging.getLogger(__name__)
+REQUIRES = ("repository", "arepo", "state")
+
+
+def snapshot(request: HandlerRequest) -> Any:
+    """Capture the current milestones so that drift can be detected."""
+    return sorted(
+        [
+            milestone.title,
+            milestone.state,
+            milestone.description,
+            milestone.due_on.isoformat() if milestone.due_on else None,
+        ]
+        for milestone in request.repository.get_milestones(state="all")
+    )
+
+
+def _current(request: HandlerRequest) -> List[Dict[str, Any]]:
+    """Find the number, title, state, description, and due date of each existing milestone."""
+    state = request.state
+    if state is not None:
+        return state.milestones  # type: ignore
+
+    return [
+        dict(
+            number=milestone.number,
+            title=milestone.title,
+            state=milestone.state,
+            description=milestone.description,
+            due_on=milestone.due_on,
+        )
+        for milestone in request.repository.get_milestones(state="all")
+    ]
+
+
+def _due_on(value: Any) -> Optional[datetime]:
+    """Normalize a due date to an aware UTC datetime.
+
+    Naive values, and dates without a time, are taken to be in UTC.
+    """
+    if value is None:
+        return None
+
+    # PyGithub sanely requires due_on to be a date or datetime rather than a string
+    if isinstance(value, str):
+        # Something strange is going on here:
+        # https://github.com/mattsb42/repo-manager/issues/26
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _matches(current: Dict[str, Any], milestone: Dict[str, Any]) -> bool:
+    """Determine whether an existing milestone already has the configured values.
+
+    A missing description is the same as an empty one,
+    and a value that is not configured is left as it is, so it is not compared.
+    GitHub only keeps the day of a due date, so due dates are compared by their day in UTC.
+    """
+    due_on = _due_on(current["due_on"])
+    return all(
+        (
+            current["state"] == milestone.get("state", "open"),
+            "description" not in milestone
+            or (current["description"] or "") == (milestone["description"] or ""),
+            "due_on" not in milestone
+            or (due_on.date() if due_on else None)
+            == (milestone["due_on"].date() if milestone["due_on"] else None),
+        )
+    )
+
+
+def _body(milestone: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the request body for a milestone, with the due date formatted the way PyGithub does."""
+    body = dict(milestone)
+    if body.get("due_on") is not None:
+        body["due_on"] = body["due_on"].strftime("%Y-%m-%dT%H:%M:%SZ")
+    return body
 
 
 def apply(request: HandlerRequest):
@@ -26,40 +110,39 @@ def apply(request: HandlerRequest):
     _LOGGER.info("Applying milestone settings")
     _LOGGER.info("Milestones configuration:\n%s", request.data)
 
-    new_milestones = {}
+    new_milestones: Dict[str, Dict[str, Any]] = {}
     for milestone in request.data:
-        # PyGithub sanely requires due_on to be a date or datetime rather than a string
         if "due_on" in milestone:
-            # Something strange is going on here:
-            # https://github.com/mattsb42/repo-manager/issues/26
-            milestone["due_on"] = datetime.fromisoformat(milestone["due_on"])
+            milestone["due_on"] = _due_on(milestone["due_on"])
         new_milestones[milestone["title"]] = milestone
 
-    for milestone in request.repository.get_milestones(state="all"):
-        if milestone.title not in new_milestones:
-            _LOGGER.info("Found milestone '%s' that is not in config. Deleting.", milestone.title)
-            milestone.delete()
+    # Index the existing milestones by title so that each write can address its milestone by number.
+    existing = {milestone["title"]: milestone for milestone in _current(request)}
+    writes: List[Write] = []
+
+    def _write(title: str, *args: Any, **kwargs: Any):
+        writes.append(
+            Write(
+                keys=frozenset((title,)),
+                send=partial(arepo_request, request.arepo, *args, **kwargs),
+            )
+        )
+
+    for title, milestone in existing.items():
+        if title not in new_milestones:
+            _LOGGER.info("Found milestone '%s' that is not in config. Deleting.", title)
+            _write(title, "DELETE", "milestones", milestone["number"])
+
+    for title, new_values in new_milestones.items():
+        if title not in existing:
+            _LOGGER.info("Adding new milestone '%s'.", title)
+            _write(title, "POST", "milestones", body=_body(new_values))
+        elif _matches(existing[title], new_values):
+            _LOGGER.info("Found milestone '%s' that matches config. Skipping milestone.", title)
         else:
-            new_values = new_milestones[milestone.title]
-            if all(
-                (
-                    milestone.state == new_values["state"],
-                    milestone.description == new_values.get("description"),
-                    milestone.due_on == new_values.get("due_on"),
-                )
-            ):
-                _LOGGER.info(
-                    "Found milestone '%s' that matches config. Skipping milestone.", milestone.title
-                )
-            else:
-                _LOGGER.info(
-                    "Found milestone '%s' that is updated in config. Updating milestone.",
-                    milestone.title,
-                )
-                milestone.edit(**new_milestones[milestone.title])
-
-            del new_milestones[milestone.title]
-
-    for milestone in new_milestones.values():
-        _LOGGER.info("Adding new milestone '%s'.", milestone["title"])
-        request.repository.create_milestone(**milestone)
+            _LOGGER.info(
+                "Found milestone '%s' that is updated in config. Updating milestone.", title,
+            )
+            _write(title, "PATCH", "milestones", existing[title]["number"], body=_body(new_values))
+
+    run_writes(writes, max_workers=request.write_workers)
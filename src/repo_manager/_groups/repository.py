@@ -1,13 +1,19 @@
 """Handler for applying repository settings.
 
 See https://developer.github.com/v3/repos/#edit for all available settings.
+
+The config is compared with the repository as it was already fetched for the run,
+and only the settings that differ are sent.
+Topics are set through their own endpoint, and only when the set of topics changes.
 """
 import logging
+from typing import Any, List
 
-from .._util import HandlerRequest
+from .._util import HandlerRequest, arepo_request
 
-__all__ = ("apply",)
+__all__ = ("apply", "snapshot")
 _LOGGER = logging.getLogger(__name__)
+REQUIRES = ("repository", "arepo")
 
 HEADERS = dict(
     Accept=",".join(
@@ -19,6 +25,42 @@ HEADERS = dict(
 )
 
 
+def snapshot(request: HandlerRequest) -> Any:
+    """Capture the current values of the configured repository settings so that drift can be detected."""
+    status, data = request.arepo.get(headers=HEADERS)
+    if status != 200:
+        return [status, data]
+
+    return {key: data.get(key) for key in request.data}
+
+
+def _topics(value: Any) -> List[str]:
+    """Convert configured or current topics, as a list or a comma-separated string, to a list.
+
+    GitHub stores topics in lower case.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return list(dict.fromkeys(topic.strip().lower() for topic in value if topic.strip()))
+
+
+def _matches(desired: Any, current: Any) -> bool:
+    """Check whether a current setting already has the configured value.
+
+    Empty and missing strings are the same,
+    and only the keys that the config sets are compared in nested settings.
+    """
+    if isinstance(desired, dict):
+        return isinstance(current, dict) and all(
+            _matches(value, current.get(key)) for key, value in desired.items()
+        )
+    if desired in (None, "") and current in (None, ""):
+        return True
+    return desired == current
+
+
 def apply(request: HandlerRequest):
     """Manage repository-level settings.
 
@@ -36,7 +78,7 @@ def apply(request: HandlerRequest):
           # A URL with more information about the repository
           homepage: https://example.github.io/
 
-          # A comma-separated list of topics to set on the repository
+          # A list, or a comma-separated string, of topics to set on the repository
           topics: github, probot
 
           # Either `true` to make the repository private, or `false` to make it public.
@@ -74,4 +116,22 @@ def apply(request: HandlerRequest):
     _LOGGER.info("Applying repository settings")
     _LOGGER.info("Repository configuration:\n%s", request.data)
 
-    request.arepo.patch(body=request.data, headers=HEADERS)
+    current = request.repository.raw_data
+    settings = {key: value for key, value in request.data.items() if key != "topics"}
+    changed = {
+        key: value for key, value in settings.items() if not _matches(value, current.get(key))
+    }
+
+    if changed:
+        _LOGGER.info("Updating repository settings: %s", ", ".join(sorted(changed)))
+        arepo_request(request.arepo, "PATCH", body=changed, headers=HEADERS)
+    else:
+        _LOGGER.info("Repository settings already match config. Skipping.")
+
+    if "topics" in request.data:
+        topics = _topics(request.data["topics"])
+        if set(topics) != set(_topics(current.get("topics"))):
+            _LOGGER.info("Replacing repository topics with: %s", ", ".join(topics))
+            arepo_request(request.arepo, "PUT", "topics", body=dict(names=topics), headers=HEADERS)
+        else:
+            _LOGGER.info("Repository topics already match config. Skipping.")
@@ -3,12 +3,55 @@
 https://developer.github.com/v3/teams/#add-or-update-team-repository
 """
 import logging
+from functools import partial
+from typing import Any, List
 
+from github.GithubException import UnknownObjectException
+
+from .._team_directory import TeamDirectory
 from .._util import HandlerRequest
+from .._writes import Write, run_writes
 from ..exceptions import RepoAdminError
 
-__all__ = ("apply",)
+__all__ = ("apply", "snapshot")
 _LOGGER = logging.getLogger(__name__)
+REQUIRES = ("repository", "organization")
+
+
+def snapshot(request: HandlerRequest) -> Any:
+    """Capture the current team access so that drift can be detected."""
+    return sorted([team.name, team.permission] for team in request.repository.get_teams())
+
+
+def _find_team(request: HandlerRequest, directory: TeamDirectory, name: str) -> Any:
+    """Find an organization team by slug, or by name if it is not a slug.
+
+    Teams are looked up by slug directly.
+    The organization's full team list is only read when that lookup fails,
+    and is then kept in ``directory``.
+    """
+    organization = request.organization
+    if organization is None:
+        raise RepoAdminError(
+            f"Unable to grant access to team '{name}': owner is not an organization"
+        )
+
+    teams = directory.cached(organization)
+    if teams is not None and name.lower() in teams:
+        return teams[name.lower()]
+
+    # Only look up the slug directly if this PyGithub provides it; the team list always works.
+    get_team_by_slug = getattr(organization, "get_team_by_slug", None)
+    if get_team_by_slug is not None:
+        try:
+            return get_team_by_slug(name)
+        except UnknownObjectException:
+            _LOGGER.info("No team with slug '%s'. Looking for a team with that name.", name)
+
+    try:
+        return directory.teams(organization)[name.lower()]
+    except KeyError:
+        raise RepoAdminError(f"Unknown team '{name}'")
 
 
 def apply(request: HandlerRequest):
@@ -21,51 +64,65 @@ def apply(request: HandlerRequest):
             permission: admin
           - name: docs
             permission: push
-        # NOTE: name must be the "slug" not the given name
+        # NOTE: name should be the "slug";
+        # a team's display name also works, but costs a listing of every team in the organization
 
     """
     _LOGGER.info("Applying team access settings")
     _LOGGER.info("Teams configuration:\n%s", request.data)
 
-    new_teams = {team["name"]: team for team in request.data}
+    new_teams = {team["name"].lower(): team for team in request.data}
+    writes: List[Write] = []
 
     for team in request.repository.get_teams():
         current_permissions = team.permission
+        # The config names teams by slug, but a team's name is accepted too.
+        key = team.slug.lower() if team.slug.lower() in new_teams else team.name.lower()
 
-        if team.name not in new_teams:
+        if key not in new_teams:
             _LOGGER.info(
                 "Team '%s' found with %s permissions not in config. Removing access for team.",
-                team.name,
+                team.slug,
                 current_permissions,
             )
-            team.remove_from_repos(request.repository)
+            writes.append(
+                Write(
+                    keys=frozenset((key,)),
+                    send=partial(team.remove_from_repos, request.repository),
+                )
+            )
         else:
-            new_permissions = new_teams[team.name]["permission"]
+            new_permissions = new_teams[key]["permission"]
             if current_permissions != new_permissions:
                 _LOGGER.info(
                     "Team '%s' found with %s permissions when %s permissions in config. Adjusting access for team.",
-                    team.name,
+                    team.slug,
                     current_permissions,
                     new_permissions,
                 )
-                team.set_repo_permission(request.repository, new_permissions)
-
-            del new_teams[team.name]
+                writes.append(
+                    Write(
+                        keys=frozenset((key,)),
+                        send=partial(team.set_repo_permission, request.repository, new_permissions),
+                    )
+                )
 
-    # Apparently we can't just get the team by name :(
-    # Also, since PyGithub lacks type stubs, mypy things it's an Any
-    org_teams = {team.slug: team for team in request.organization.get_teams()}  # type: ignore
+            del new_teams[key]
 
-    for team_data in new_teams.values():
+    directory = request.team_directory or TeamDirectory()
+    for key, team_data in new_teams.items():
         _LOGGER.info(
             "Adding new team access for team '%s' with %s permissions.",
             team_data["name"],
             team_data["permission"],
         )
-        name = team_data["name"]
-        try:
-            team = org_teams[name]
-        except KeyError:
-            raise RepoAdminError(f"Unknown team '{name}")
+        team = _find_team(request, directory, team_data["name"])
+
+        writes.append(
+            Write(
+                keys=frozenset((key,)),
+                send=partial(team.set_repo_permission, request.repository, team_data["permission"]),
+            )
+        )
 
-        team.set_repo_permission(request.repository, team_data["permission"])
+    run_writes(writes, max_workers=request.write_workers)
@@ -0,0 +1,142 @@
+"""Central rate limit tracking and request pacing.
+
+GitHub enforces a primary rate limit (a request budget that resets hourly)
+and secondary rate limits that apply to bursts,
+especially of content-creating requests.
+:class:`RateLimiter` keeps track of both for every request in the process
+and tells callers how long to wait, rather than letting a 403 end the run.
+It only computes delays so that both the threaded and the asyncio engines can use it.
+
+https://docs.github.com/en/rest/overview/resources-in-the-rest-api#rate-limiting
+"""
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from .exceptions import RateLimitError
+
+__all__ = ("RateLimiter", "is_content_creating", "CONTENT_INTERVAL", "MAX_RETRIES", "MAX_WAIT")
+_LOGGER = logging.getLogger(__name__)
+# GitHub allows at most 80 content-creating requests per minute.
+CONTENT_INTERVAL = 60 / 80
+MAX_RETRIES = 5
+MAX_WAIT = 3600.0
+_SECONDARY_BACKOFF = 60.0
+_COLLABORATOR_INVITE = re.compile(r"/repos/[^/]+/[^/]+/collaborators/[^/?]+")
+
+
+def is_content_creating(method: str, url: str) -> bool:
+    """Determine whether a request creates content, which the secondary limits restrict most."""
+    method = method.upper()
+    if method == "POST":
+        # Only queries are sent to the GraphQL endpoint, and they do not create content.
+        return not urlsplit(url).path.endswith("/graphql")
+
+    # Adding a collaborator sends them an invitation.
+    return method == "PUT" and _COLLABORATOR_INVITE.search(url) is not None
+
+
+class RateLimiter:
+    """Track the rate limit budget and pace requests to stay within it.
+
+    This is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        content_interval: float = CONTENT_INTERVAL,
+        max_retries: int = MAX_RETRIES,
+        max_wait: float = MAX_WAIT,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Start with an unknown budget."""
+        self._content_interval = content_interval
+        self._max_retries = max_retries
+        self._max_wait = max_wait
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.remaining: Optional[int] = None
+        self.reset: float = 0.0
+        self._paused_until = 0.0
+        self._next_content_slot = 0.0
+
+    def _check_wait(self, delay: float) -> float:
+        if delay > self._max_wait:
+            raise RateLimitError(
+                f"Rate limit requires waiting {delay:.0f} seconds,"
+                f" more than the {self._max_wait:.0f} seconds allowed"
+            )
+        return delay
+
+    def delay_before(self, method: str, url: str) -> float:
+        """Reserve a slot for a request.
+
+        :returns: seconds the caller must wait before sending the request
+        """
+        now = self._clock()
+        with self._lock:
+            delay = max(0.0, self._paused_until - now)
+            if self.remaining is not None and self.remaining <= 0 and self.reset > now:
+                delay = max(delay, self.reset - now + 1)
+
+            if is_content_creating(method, url):
+                slot = max(self._next_content_slot, now + delay)
+                self._next_content_slot = slot + self._content_interval
+                delay = slot - now
+
+        if delay > 0:
+            _LOGGER.debug("Waiting %.2f seconds before %s %s", delay, method, url)
+        return self._check_wait(delay)
+
+    def _update(self, headers: Dict[str, str]):
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if reset is not None:
+                self.reset = float(reset)
+
+    def retry_delay(
+        self, status: int, headers: Dict[str, str], body: bytes, attempt: int
+    ) -> Optional[float]:
+        """Record a response and decide whether it should be retried.
+
+        :param headers: response headers, with lowercase names
+        :param attempt: how many times this request has already been retried
+        :returns: seconds to wait before retrying, or ``None`` if the response should be returned.
+            The wait is also applied to every later :meth:`delay_before` call,
+            so callers only need to loop back and reserve a new slot.
+        """
+        self._update(headers)
+        if status not in (403, 429):
+            return None
+
+        now = self._clock()
+        retry_after = headers.get("retry-after")
+        if retry_after is not None:
+            delay = float(retry_after)
+            kind = "secondary"
+        elif self.remaining == 0:
+            delay = max(0.0, self.reset - now) + 1
+            kind = "primary"
+        elif status == 429 or b"secondary rate limit" in body.lower():
+            delay = _SECONDARY_BACKOFF * 2 ** attempt
+            kind = "secondary"
+        else:
+            # A plain 403 is a permissions problem, not a rate limit.
+            return None
+
+        if attempt >= self._max_retries:
+            _LOGGER.warning("Still rate limited after %d retries. Giving up.", attempt)
+            return None
+
+        self._check_wait(delay)
+        with self._lock:
+            self._paused_until = max(self._paused_until, now + delay)
+
+        _LOGGER.warning("Hit the %s rate limit. Waiting %.0f seconds before retrying.", kind, delay)
+        return delay
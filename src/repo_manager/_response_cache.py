@@ -0,0 +1,268 @@
+"""Persistent cache of slow-changing GET responses.
+
+Some lookups return the same answer for hours or days,
+for example whether an owner is an organization, a user's ID, or an organization's teams,
+yet every run would otherwise fetch them again.
+Responses from these routes are kept for a while, each route with its own lifetime,
+and are served without sending a request at all.
+``404 Not Found`` responses are kept as well, usually for less time,
+so that looking up the organization of a personal repository does not fail over the network every run.
+
+Entries are stored as one JSON file each, like the :mod:`._etag_cache`,
+so the directory can be persisted between workflow runs (for example with ``actions/cache``)
+and shared by concurrent processes.
+The least recently used entries are removed once the cache holds more than ``max_entries``.
+"""
+import base64
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from ._etag_cache import ETagCache
+from ._tracing import route_template
+
+__all__ = (
+    "ResponseCache",
+    "ResponseCacheStats",
+    "CachedEntry",
+    "CachePolicy",
+    "DEFAULT_POLICIES",
+    "DEFAULT_MAX_ENTRIES",
+)
+_LOGGER = logging.getLogger(__name__)
+DEFAULT_MAX_ENTRIES = 5000
+# GitHub Enterprise Server serves the API under this prefix.
+_ENTERPRISE_PREFIX = "/api/v3"
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long to keep responses from one route.
+
+    :param ttl: seconds to keep a successful response
+    :param not_found_ttl: seconds to keep a ``404 Not Found`` response, or 0 to not keep it
+    """
+
+    ttl: float
+    not_found_ttl: float = 0
+
+
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    # An owner rarely changes between being a user and an organization.
+    "/orgs/{org}": CachePolicy(ttl=86400, not_found_ttl=86400),
+    "/users/{username}": CachePolicy(ttl=86400, not_found_ttl=3600),
+    # Kept no longer than the in-process team directory, so new teams are found promptly.
+    "/orgs/{org}/teams": CachePolicy(ttl=600),
+    "/orgs/{org}/teams/{team}": CachePolicy(ttl=3600, not_found_ttl=300),
+}
+# Repositories are not cached: the repository group compares its config
+# against the repository's current settings, which must never be stale.
+
+
+@dataclass
+class ResponseCacheStats:
+    """Counters for a :class:`ResponseCache`."""
+
+    hits: int = 0
+    not_found_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def count(self, name: str, amount: int = 1):
+        """Add to one of the counters."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+
+@dataclass
+class CachedEntry:
+    """A stored response."""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+def _ancestors(path: str) -> List[str]:
+    """List a path and each of its parents, for example ``/a/b``, ``/a``."""
+    parts = path.rstrip("/").split("/")
+    return ["/".join(parts[:end]) for end in range(len(parts), 1, -1)]
+
+
+class ResponseCache:
+    """Disk-backed store of GET responses that are served until they expire.
+
+    Only routes listed in ``policies`` are cached.
+    A successful write to a path stops responses for that path and its parents being served,
+    so, for example, updating a repository's topics is seen by the next read of the repository.
+    This is safe to share between threads and between processes.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        policies: Optional[Dict[str, CachePolicy]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """Use ``directory`` for cache entries, creating it if needed.
+
+        ``clock`` must be wall-clock time, since entries outlive the process.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.stats = ResponseCacheStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._changed: Set[str] = set()
+        # Pruning lists the whole directory, so it is only done every so often.
+        self._prune_every = max(1, max_entries // 20)
+        self._stores_since_prune = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def policy(self, url: str) -> Optional[CachePolicy]:
+        """Find the cache policy for a URL, if its route is cached."""
+        route = route_template(url)
+        if route.startswith(f"{_ENTERPRISE_PREFIX}/"):
+            route = route[len(_ENTERPRISE_PREFIX) :]
+        return self.policies.get(route)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remove(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def load(self, url: str, headers: Dict[str, str]) -> Optional[CachedEntry]:
+        """Load an unexpired response for a GET request, if there is one."""
+        if self.policy(url) is None:
+            return None
+
+        key = ETagCache.key(url, headers)
+        try:
+            with open(self._path(key), "r") as raw:
+                entry = json.load(raw)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError):
+            _LOGGER.debug("Ignoring unreadable response cache entry %s", key)
+            entry = None
+
+        path = urlsplit(url).path
+        with self._lock:
+            changed = path in self._changed
+        if entry is None or changed or entry["expires"] <= self._clock():
+            if entry is not None:
+                self._remove(key)
+            self.stats.count("misses")
+            return None
+
+        try:
+            # Loading an entry marks it as recently used.
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        self.stats.count("not_found_hits" if entry["status"] == 404 else "hits")
+        return CachedEntry(
+            status=entry["status"],
+            headers=[tuple(header) for header in entry["headers"]],  # type: ignore
+            body=base64.b64decode(entry["body"]),
+        )
+
+    def store(self, url: str, headers: Dict[str, str], response: CachedEntry):
+        """Store the response to a GET request, if its route and status are cached.
+
+        The entry is written to a temporary file and then moved into place
+        so that concurrent readers never see a partial entry.
+        """
+        policy = self.policy(url)
+        if policy is None:
+            return
+        ttl = {200: policy.ttl, 404: policy.not_found_ttl}.get(response.status, 0)
+        if ttl <= 0:
+            return
+
+        key = ETagCache.key(url, headers)
+        entry = dict(
+            url=url,
+            status=response.status,
+            headers=response.headers,
+            body=base64.b64encode(response.body).decode("ascii"),
+            expires=self._clock() + ttl,
+        )
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w") as raw:
+                json.dump(entry, raw)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            _LOGGER.debug("Unable to write response cache entry %s", key, exc_info=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        self.stats.count("stores")
+        with self._lock:
+            # The stored response is current again.
+            self._changed.discard(urlsplit(url).path)
+            self._stores_since_prune += 1
+            prune = self._stores_since_prune >= self._prune_every
+            if prune:
+                self._stores_since_prune = 0
+        if prune:
+            self.prune()
+
+    def invalidate(self, url: str):
+        """Stop serving responses for the path a write was sent to and for each of its parents."""
+        with self._lock:
+            self._changed.update(_ancestors(urlsplit(url).path))
+
+    def prune(self):
+        """Remove the least recently used entries until at most ``max_entries`` are left.
+
+        Other processes may remove entries at the same time, so missing files are ignored.
+        """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if not item.name.endswith(".json"):
+                    continue
+                try:
+                    entries.append((item.stat().st_mtime, item.path))
+                except FileNotFoundError:
+                    continue
+
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+
+        entries.sort()
+        for _, path in entries[:excess]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.stats.count("evictions")
+
+    def log_stats(self):
+        """Log the hit and miss counters."""
+        _LOGGER.info(
+            "Response cache: %d hits, %d not found hits, %d misses, %d stored, %d evicted",
+            self.stats.hits,
+            self.stats.not_found_hits,
+            self.stats.misses,
+            self.stats.stores,
+            self.stats.evictions,
+        )
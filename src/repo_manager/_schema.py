@@ -0,0 +1,288 @@
+"""Typed schemas for each config group.
+
+Schemas describe the shape that each handler expects,
+so that a config can be checked offline before any API call is made.
+This module must not import the handlers or the API clients.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ._branch_patterns import compile_pattern, is_pattern
+
+__all__ = ("Schema", "GROUP_SCHEMAS", "check")
+PERMISSIONS = ("pull", "triage", "push", "maintain", "admin")
+_HEX_COLOR = re.compile(r"^[0-9a-fA-F]{6}$")
+_TYPE_NAMES = {
+    bool: "a boolean",
+    int: "an integer",
+    str: "a string",
+    dict: "a mapping",
+    list: "a list",
+    datetime: "a date and time",
+    date: "a date",
+}
+
+
+@dataclass(frozen=True)
+class Schema:
+    """Expected shape of one config value.
+
+    :param types: accepted Python types, as loaded from YAML
+    :param required: whether the key must be present, if this is a mapping value
+    :param required_unless: key of the same mapping that makes a required key optional when present
+    :param nullable: whether ``null`` is accepted
+    :param choices: if not empty, the only accepted values of a scalar
+    :param keys: schemas for the values of a mapping
+    :param extra_keys: whether a mapping may have keys that are not in ``keys``
+    :param items: schema for each item of a list
+    :param unique: key that must be unique across the mappings in a list
+    :param ignore_case: whether ``unique`` values that only differ in case are duplicates
+    :param validator: extra check of a scalar value,
+        returning an error message or ``None`` if the value is valid
+    """
+
+    types: Tuple[type, ...]
+    required: bool = False
+    required_unless: Optional[str] = None
+    nullable: bool = False
+    choices: Tuple[Any, ...] = ()
+    keys: Dict[str, "Schema"] = field(default_factory=dict)
+    extra_keys: bool = True
+    items: Optional["Schema"] = None
+    unique: Optional[str] = None
+    ignore_case: bool = False
+    validator: Optional[Callable[[Any], Optional[str]]] = None
+
+
+def _is_instance(value: Any, types: Tuple[type, ...]) -> bool:
+    # YAML booleans are ints to Python, but an integer setting never accepts them.
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def _describe(types: Tuple[type, ...]) -> str:
+    return " or ".join(_TYPE_NAMES.get(kind, kind.__name__) for kind in types)
+
+
+def check(value: Any, schema: Schema, path: str) -> List[str]:
+    """Check a value against a schema.
+
+    :param path: location of the value in the config, used in error messages
+    :returns: every error found, or an empty list if the value is valid
+    """
+    if value is None:
+        return [] if schema.nullable else [f"{path}: must not be null"]
+
+    if not _is_instance(value, schema.types):
+        return [f"{path}: must be {_describe(schema.types)}, not {type(value).__name__}"]
+
+    return _checker(value, schema)(value, schema, path)
+
+
+def _checker(value: Any, schema: Schema) -> Callable[[Any, Schema, str], List[str]]:
+    """Choose the check for the kind of value that passed the type check."""
+    if isinstance(value, dict):
+        return _check_mapping
+    if isinstance(value, list):
+        return _check_list
+    if schema.choices:
+        return _check_enum
+    return _check_scalar
+
+
+def _check_scalar(value: Any, schema: Schema, path: str) -> List[str]:
+    if schema.validator is not None:
+        message = schema.validator(value)
+        if message is not None:
+            return [f"{path}: {message}"]
+    return []
+
+
+def _check_enum(value: Any, schema: Schema, path: str) -> List[str]:
+    if value not in schema.choices:
+        choices = ", ".join(str(choice) for choice in schema.choices)
+        return [f"{path}: must be one of {choices}, not '{value}'"]
+    return _check_scalar(value, schema, path)
+
+
+def _check_mapping(value: Dict[str, Any], schema: Schema, path: str) -> List[str]:
+    errors: List[str] = []
+    for key, key_schema in schema.keys.items():
+        if key in value:
+            errors.extend(check(value[key], key_schema, f"{path}.{key}"))
+        elif key_schema.required and key_schema.required_unless not in value:
+            errors.append(f"{path}: missing required key '{key}'")
+    if not schema.extra_keys:
+        errors.extend(f"{path}: unknown key '{key}'" for key in value if key not in schema.keys)
+    return errors
+
+
+def _check_list(value: List[Any], schema: Schema, path: str) -> List[str]:
+    errors: List[str] = []
+    if schema.items is not None:
+        for index, item in enumerate(value):
+            errors.extend(check(item, schema.items, f"{path}[{index}]"))
+    if schema.unique is not None:
+        errors.extend(_duplicates(value, schema, path))
+    return errors
+
+
+def _duplicates(value: List[Any], schema: Schema, path: str) -> List[str]:
+    """Find the mappings in a list that repeat the ``unique`` key of an earlier one."""
+    unique = schema.unique
+    errors: List[str] = []
+    seen: Dict[str, int] = {}
+    for index, item in enumerate(value):
+        if not isinstance(item, dict) or unique not in item:
+            continue
+        identity = str(item[unique])
+        if schema.ignore_case:
+            identity = identity.lower()
+        if identity in seen:
+            errors.append(
+                f"{path}[{index}]: duplicate {unique} '{item[unique]}'"
+                f" (also at {path}[{seen[identity]}])"
+            )
+        else:
+            seen[identity] = index
+    return errors
+
+
+def _color(value: Any) -> Optional[str]:
+    # The handler strips any leading "#" and sends the rest as a string.
+    color = str(value).replace("#", "")
+    if not _HEX_COLOR.match(color):
+        return f"must be a six digit hex color, not '{value}' (quote colors that YAML reads as numbers)"
+    return None
+
+
+def _iso_datetime(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return f"must be an ISO 8601 date and time, not '{value}'"
+    return None
+
+
+def _branch_name(value: Any) -> Optional[str]:
+    if isinstance(value, str) and is_pattern(value):
+        try:
+            compile_pattern(value)
+        except re.error as error:
+            return f"must be a valid pattern, not '{value}' ({error})"
+    return None
+
+
+def _string(**kwargs) -> Schema:
+    return Schema(types=(str,), **kwargs)
+
+
+def _boolean(**kwargs) -> Schema:
+    return Schema(types=(bool,), **kwargs)
+
+
+def _strings(**kwargs) -> Schema:
+    return Schema(types=(list,), items=_string(), **kwargs)
+
+
+def _mapping(keys: Dict[str, Schema], **kwargs) -> Schema:
+    return Schema(types=(dict,), keys=keys, **kwargs)
+
+
+def _list_of(items: Schema, **kwargs) -> Schema:
+    return Schema(types=(list,), items=items, **kwargs)
+
+
+_LABEL = _mapping(
+    dict(
+        name=_string(required=True),
+        # A renamed label keeps its current color unless one is configured.
+        color=Schema(types=(str, int), required=True, required_unless="oldname", validator=_color),
+        description=_string(),
+        oldname=_string(),
+    ),
+    extra_keys=False,
+)
+_MILESTONE = _mapping(
+    dict(
+        title=_string(required=True),
+        state=_string(choices=("open", "closed")),
+        description=_string(),
+        due_on=Schema(types=(str, datetime, date), validator=_iso_datetime),
+    ),
+    extra_keys=False,
+)
+_TEAM = _mapping(
+    dict(name=_string(required=True), permission=_string(required=True, choices=PERMISSIONS)),
+    extra_keys=False,
+)
+_COLLABORATOR = _mapping(
+    dict(username=_string(required=True), permission=_string(required=True, choices=PERMISSIONS),),
+    extra_keys=False,
+)
+_PROTECTION = _mapping(
+    dict(
+        required_status_checks=_mapping(
+            dict(strict=_boolean(required=True), contexts=_strings(required=True)),
+            required=True,
+            nullable=True,
+        ),
+        enforce_admins=_boolean(required=True, nullable=True),
+        required_pull_request_reviews=_mapping(
+            dict(
+                required_approving_review_count=Schema(types=(int,), choices=tuple(range(0, 7)),),
+                dismiss_stale_reviews=_boolean(),
+                require_code_owner_reviews=_boolean(),
+                dismissal_restrictions=_mapping(dict(users=_strings(), teams=_strings())),
+            ),
+            required=True,
+            nullable=True,
+        ),
+        restrictions=_mapping(
+            dict(users=_strings(), teams=_strings(), apps=_strings()), required=True, nullable=True,
+        ),
+    ),
+    required=True,
+    nullable=True,
+)
+_BRANCH = _mapping(
+    dict(name=_string(required=True, validator=_branch_name), protection=_PROTECTION),
+    extra_keys=False,
+)
+# The API accepts more repository settings than these, so other keys are left to it.
+_REPOSITORY = _mapping(
+    dict(
+        name=_string(),
+        description=_string(nullable=True),
+        homepage=_string(nullable=True),
+        topics=Schema(types=(str, list), nullable=True),
+        private=_boolean(),
+        visibility=_string(choices=("public", "private", "internal")),
+        has_issues=_boolean(),
+        has_projects=_boolean(),
+        has_wiki=_boolean(),
+        has_downloads=_boolean(),
+        default_branch=_string(),
+        allow_squash_merge=_boolean(),
+        allow_merge_commit=_boolean(),
+        allow_rebase_merge=_boolean(),
+        allow_auto_merge=_boolean(),
+        delete_branch_on_merge=_boolean(),
+        archived=_boolean(),
+        is_template=_boolean(),
+    ),
+)
+
+GROUP_SCHEMAS: Dict[str, Schema] = dict(
+    # GitHub treats label, team, and user names that only differ in case as the same name.
+    labels=_list_of(_LABEL, unique="name", ignore_case=True),
+    milestones=_list_of(_MILESTONE, unique="title"),
+    teams=_list_of(_TEAM, unique="name", ignore_case=True),
+    collaborators=_list_of(_COLLABORATOR, unique="username", ignore_case=True),
+    branches=_list_of(_BRANCH, unique="name"),
+    repository=_REPOSITORY,
+)
@@ -0,0 +1,124 @@
+"""Select which config groups to apply.
+
+Groups can be selected explicitly with ``only`` and ``skip``,
+and by comparing the config with a previous version of it,
+so that a change to one section only applies that section.
+"""
+import logging
+import os
+import subprocess  # nosec
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ._config import load_yaml
+from .exceptions import UserConfigError
+
+__all__ = ("load_previous_config", "select_groups", "split_groups")
+_LOGGER = logging.getLogger(__name__)
+
+
+def split_groups(raw: str) -> Tuple[str, ...]:
+    """Split a comma or whitespace separated list of group names."""
+    return tuple(name for name in raw.replace(",", " ").split() if name)
+
+
+def _read_from_git(config_file: str, ref: str) -> Optional[str]:
+    """Read a file as it was at ``ref`` in the git repository that contains it."""
+    if ref.startswith("-"):
+        # git would read it as an option.
+        raise UserConfigError(f"Previous ref must not start with '-': {ref}")
+
+    directory, filename = os.path.split(os.path.abspath(config_file))
+    command = ["git"]
+    workspace = os.environ.get("GITHUB_WORKSPACE")
+    if workspace:
+        # The action container runs as a different user than the one that owns the checkout,
+        # so git only reads the checkout if it is trusted explicitly.
+        command += ["-c", f"safe.directory={workspace}"]
+    command += ["show", f"{ref}:./{filename}"]
+    try:
+        result = subprocess.run(  # nosec
+            command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+    except OSError as error:
+        raise UserConfigError(f"Unable to run git to read the previous config: {error}")
+
+    if result.returncode != 0:
+        _LOGGER.warning(
+            "Unable to read '%s' at '%s': %s",
+            config_file,
+            ref,
+            result.stderr.decode("utf-8", "replace").strip(),
+        )
+        return None
+
+    return result.stdout.decode("utf-8")
+
+
+def load_previous_config(
+    config_file: str, previous_config_file: Optional[str] = None, previous_ref: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Load the previous version of the config, if one was requested.
+
+    :param previous_config_file: path to a copy of the previous config
+    :param previous_ref: git ref to read ``config_file`` at
+    :returns: previous config, or ``None`` if there is no usable previous config
+    """
+    if previous_config_file and previous_ref:
+        raise UserConfigError("Only one of previous config file or previous ref can be set")
+
+    if previous_config_file:
+        with open(previous_config_file, "r") as raw:
+            return load_yaml(raw) or {}
+
+    if previous_ref:
+        raw_previous = _read_from_git(config_file, previous_ref)
+        if raw_previous is None:
+            return None
+        return load_yaml(raw_previous) or {}
+
+    return None
+
+
+def _check_names(kind: str, names: Iterable[str], config: Dict[str, Any]):
+    unknown = sorted(set(names) - set(config))
+    if unknown:
+        raise UserConfigError(f"Unknown config groups in {kind}: {', '.join(unknown)}")
+
+
+def select_groups(
+    config: Dict[str, Any],
+    previous: Optional[Dict[str, Any]] = None,
+    only: Iterable[str] = (),
+    skip: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """Select the groups to apply.
+
+    :param previous: previous config; if provided, only groups that changed are selected
+    :param only: if not empty, only these groups are selected
+    :param skip: these groups are never selected
+    :returns: the selected subset of ``config``
+    """
+    only = tuple(only)
+    skip = tuple(skip)
+    _check_names("only", only, config)
+    _check_names("skip", skip, config)
+
+    selected = {}
+    for group, data in config.items():
+        if only and group not in only:
+            _LOGGER.info("Group '%s' was not selected. Skipping.", group)
+        elif group in skip:
+            _LOGGER.info("Group '%s' was skipped by request.", group)
+        elif previous is not None and previous.get(group) == data:
+            _LOGGER.info("Group '%s' is unchanged from the previous config. Skipping.", group)
+        else:
+            selected[group] = data
+
+    if previous is not None:
+        for group in previous:
+            if group not in config:
+                _LOGGER.warning(
+                    "Group '%s' was removed from the config. Its settings are left in place.", group
+                )
+
+    return selected
@@ -0,0 +1,73 @@
+"""Share GET responses between the reads of one group.
+
+When a state store is in use, a group's remote state is read for its fingerprint,
+then again by its handler, and again to record the new fingerprint.
+Within a :func:`share_reads` block, a GET request that was already answered
+is answered again from memory, so each of these reads the same listing only once.
+Any write clears the shared responses, so reads after it see the new state,
+and is noted so that callers can tell whether the block changed anything.
+"""
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+__all__ = ("SharedReads", "share_reads", "current_reads")
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("repo_manager_shared_reads", default=None)
+
+
+class SharedReads:
+    """GET responses shared within one block, and whether the block sent any write.
+
+    This is safe to share between threads.
+    """
+
+    def __init__(self):
+        """Start with no responses and no writes."""
+        self.wrote = False
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._responses: Dict[str, Any] = {}
+
+    @property
+    def generation(self) -> int:
+        """Number of writes sent so far. Pass it to :meth:`store` with the response."""
+        with self._lock:
+            return self._generation
+
+    def load(self, key: str) -> Optional[Any]:
+        """Find the response to an earlier GET request with the same cache key."""
+        with self._lock:
+            return self._responses.get(key)
+
+    def store(self, key: str, response: Any, generation: int):
+        """Keep a GET response, unless a write was sent while it was being read."""
+        with self._lock:
+            if generation == self._generation:
+                self._responses[key] = response
+
+    def write(self):
+        """Note that a write was sent, and forget every response read before it."""
+        with self._lock:
+            self.wrote = True
+            self._generation += 1
+            self._responses.clear()
+
+
+@contextmanager
+def share_reads() -> Iterator[SharedReads]:
+    """Share GET responses within the enclosed block.
+
+    Worker threads and asyncio tasks share them too, as long as they run in a copy of its context.
+    """
+    reads = SharedReads()
+    token = _CURRENT.set(reads)
+    try:
+        yield reads
+    finally:
+        _CURRENT.reset(token)
+
+
+def current_reads() -> Optional[SharedReads]:
+    """Find the responses shared by the enclosing :func:`share_reads` block, if there is one."""
+    return _CURRENT.get()
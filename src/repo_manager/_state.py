@@ -0,0 +1,292 @@
+"""Record what each group last applied so that unchanged groups can be skipped.
+
+After a group applies successfully,
+its fingerprint (a digest of the group config and of the remote state it left behind)
+is recorded in a state store.
+On the next run, if the config and a fresh snapshot of the remote state
+produce the same fingerprint, nothing can have drifted and the group is skipped.
+
+The snapshot and the handler share their GET responses (see :mod:`._shared_reads`),
+so a group that does run reads its remote state once.
+It is only read again to record the new fingerprint if the handler sent a write.
+"""
+import asyncio
+import contextvars
+import copy
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from agithub.GitHub import GitHub
+
+from ._shared_reads import SharedReads, share_reads
+from .exceptions import RepoAdminError, UserConfigError
+
+__all__ = (
+    "digest",
+    "fingerprint",
+    "load_state_store",
+    "StateStore",
+    "LocalStateStore",
+    "CustomPropertyStateStore",
+    "FastPath",
+    "Records",
+)
+_LOGGER = logging.getLogger(__name__)
+
+
+def digest(value: Any) -> str:
+    """Build a stable digest of a JSON-compatible value."""
+    normalized = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def fingerprint(config: Any, remote_state: Any) -> str:
+    """Combine a group config and a snapshot of its remote state into one fingerprint."""
+    return digest([digest(config), digest(remote_state)])[:32]
+
+
+class StateStore:
+    """Base class for places that fingerprints can be recorded."""
+
+    def load(self, repository: str) -> Dict[str, str]:
+        """Load the recorded fingerprints for a repository, keyed by group."""
+        raise NotImplementedError
+
+    def update(self, repository: str, group: str, value: str):
+        """Record the fingerprint for one group."""
+        raise NotImplementedError
+
+
+class LocalStateStore(StateStore):
+    """Fingerprints for any number of repositories, kept in a local JSON file.
+
+    Put the file in a persisted directory (for example ``cache-dir``)
+    to keep it between workflow runs.
+    """
+
+    def __init__(self, path: str):
+        """Use ``path`` as the state file. It is created on the first update."""
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.path, "r") as raw:
+                return json.load(raw)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            _LOGGER.warning("Ignoring unreadable state file '%s'", self.path)
+            return {}
+
+    def load(self, repository: str) -> Dict[str, str]:
+        """Load the recorded fingerprints for a repository, keyed by group."""
+        with self._lock:
+            return self._read().get(repository, {})
+
+    def update(self, repository: str, group: str, value: str):
+        """Record the fingerprint for one group.
+
+        The file is replaced atomically so that readers never see a partial write.
+        """
+        with self._lock:
+            state = self._read()
+            state.setdefault(repository, {})[group] = value
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(handle, "w") as raw:
+                json.dump(state, raw, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+
+
+class CustomPropertyStateStore(StateStore):
+    """Fingerprints kept in a repository custom property.
+
+    The property must already be defined for the organization as a string property.
+    Its value is a compact JSON object of group name to fingerprint.
+
+    https://docs.github.com/en/rest/repos/custom-properties
+    """
+
+    def __init__(self, agithub: GitHub, property_name: str):
+        """Use ``property_name`` on each repository to hold fingerprints."""
+        self._agithub = agithub
+        self.property_name = property_name
+        self._lock = threading.Lock()
+
+    def _properties(self, repository: str):
+        owner, repo = repository.split("/", 1)
+        return self._agithub.repos[owner][repo].properties.values
+
+    def load(self, repository: str) -> Dict[str, str]:
+        """Load the recorded fingerprints for a repository, keyed by group."""
+        status, values = self._properties(repository).get()
+        if status != 200:
+            _LOGGER.warning(
+                "Unable to read custom properties for '%s': STATUS %s", repository, status
+            )
+            return {}
+
+        for value in values:
+            if value["property_name"] == self.property_name and value["value"]:
+                try:
+                    return json.loads(value["value"])
+                except ValueError:
+                    return {}
+
+        return {}
+
+    def update(self, repository: str, group: str, value: str):
+        """Record the fingerprint for one group."""
+        with self._lock:
+            state = self.load(repository)
+            state[group] = value
+            body = dict(
+                properties=[
+                    dict(
+                        property_name=self.property_name,
+                        value=json.dumps(state, sort_keys=True, separators=(",", ":")),
+                    )
+                ]
+            )
+            status, response = self._properties(repository).patch(body=body)
+
+        if status not in (200, 204):
+            raise RepoAdminError(f"Encountered unknown error: STATUS {status} :: {response}")
+
+
+def load_state_store(agithub: GitHub, state_file: str, state_property: str) -> Optional[StateStore]:
+    """Build the configured state store, if any."""
+    if state_file and state_property:
+        raise UserConfigError("Only one of state file or state property can be set")
+
+    if state_file:
+        return LocalStateStore(state_file)
+
+    if state_property:
+        return CustomPropertyStateStore(agithub, state_property)
+
+    return None
+
+
+class Records:
+    """Values recorded in a state store for one repository, loaded on first use.
+
+    This is safe to share between threads.
+    """
+
+    def __init__(self, store: StateStore, repository: str):
+        """Read and write the values recorded for ``repository`` in ``store``."""
+        self._store = store
+        self._repository = repository
+        self._lock = threading.Lock()
+        self._previous: Optional[Dict[str, str]] = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the value recorded under ``key``, if any."""
+        with self._lock:
+            if self._previous is None:
+                self._previous = self._store.load(self._repository)
+            return self._previous.get(key)
+
+    def update(self, key: str, value: str):
+        """Record ``value`` under ``key``."""
+        self._store.update(self._repository, key, value)
+        with self._lock:
+            if self._previous is not None:
+                self._previous[key] = value
+
+
+class FastPath:
+    """Skip groups whose config and remote state match what was last applied to a repository."""
+
+    def __init__(self, store: StateStore, repository: str):
+        """Prepare to check ``repository``. Recorded state is loaded on first use."""
+        self.records = Records(store, repository)
+
+    def _check(self, group: str, config: Any, snapshot: Callable[[], Any]) -> Optional[str]:
+        """Find the current fingerprint of a group, if one was recorded to compare it with."""
+        if self.records.get(group) is None:
+            return None
+        return fingerprint(config, snapshot())
+
+    def _unchanged(self, group: str, current: Optional[str]) -> bool:
+        if current is None or current != self.records.get(group):
+            return False
+
+        _LOGGER.info("Group '%s' matches the last applied config and state. Skipping.", group)
+        return True
+
+    def _record(
+        self,
+        group: str,
+        config: Any,
+        snapshot: Callable[[], Any],
+        before: Optional[str],
+        reads: SharedReads,
+    ):
+        if before is not None and not reads.wrote:
+            # The handler sent no writes, so the state read before it still holds.
+            self.records.update(group, before)
+            return
+        self.records.update(group, fingerprint(config, snapshot()))
+
+    def wrap(
+        self,
+        group: str,
+        handler: Callable[[Any], Any],
+        snapshot: Callable[[Any], Any],
+        request: Any,
+        use_async: bool = False,
+    ) -> Callable[[], Any]:
+        """Curry a handler so that it only runs if its group has changed or drifted.
+
+        :param handler: group handler, a coroutine function if ``use_async``
+        :param snapshot: function that captures the remote state the group manages
+        :param request: handler request
+        """
+        # Handlers normalize their config in place, so keep the config as it was loaded.
+        config = copy.deepcopy(request.data)
+
+        def _snapshot():
+            return snapshot(request)
+
+        if use_async:
+
+            async def _apply_async():
+                loop = asyncio.get_event_loop()
+                with share_reads() as reads:
+                    before = await loop.run_in_executor(
+                        None, contextvars.copy_context().run, self._check, group, config, _snapshot
+                    )
+                    if self._unchanged(group, before):
+                        return
+                    await handler(request)
+                    await loop.run_in_executor(
+                        None,
+                        contextvars.copy_context().run,
+                        self._record,
+                        group,
+                        config,
+                        _snapshot,
+                        before,
+                        reads,
+                    )
+
+            return _apply_async
+
+        def _apply():
+            with share_reads() as reads:
+                before = self._check(group, config, _snapshot)
+                if self._unchanged(group, before):
+                    return
+                handler(request)
+                self._record(group, config, _snapshot, before, reads)
+
+        return _apply
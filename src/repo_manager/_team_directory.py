@@ -0,0 +1,68 @@
+"""Cache the list of teams in each organization.
+
+Listing every team in a large organization takes many pages,
+so the teams handler looks teams up by slug and only lists them
+when a configured name is not a slug.
+The list is kept for a while so that a fleet run over one organization reads it at most once.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+__all__ = ("TeamDirectory", "DEFAULT_TEAM_DIRECTORY_TTL")
+_LOGGER = logging.getLogger(__name__)
+DEFAULT_TEAM_DIRECTORY_TTL = 600.0
+
+
+class TeamDirectory:
+    """Teams of each organization, keyed by lower-cased slug and name.
+
+    Each organization's teams are listed at most once per ``ttl`` seconds,
+    even when many threads ask for them at once.
+    This is safe to share between threads.
+    """
+
+    def __init__(
+        self, ttl: float = DEFAULT_TEAM_DIRECTORY_TTL, clock: Callable[[], float] = time.monotonic
+    ):
+        """Keep each organization's teams for ``ttl`` seconds, as measured by ``clock``."""
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._org_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def _fresh(self, org: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(org)
+        if entry is None or self._clock() - entry[0] >= self.ttl:
+            return None
+        return entry[1]
+
+    def cached(self, organization: Any) -> Optional[Dict[str, Any]]:
+        """Return the teams of an organization if they are cached and fresh, without listing them."""
+        with self._lock:
+            return self._fresh(organization.login.lower())
+
+    def teams(self, organization: Any) -> Dict[str, Any]:
+        """Return the teams of a PyGithub organization, listing them if they are not cached."""
+        org = organization.login.lower()
+        with self._lock:
+            org_lock = self._org_locks.setdefault(org, threading.Lock())
+
+        with org_lock:
+            with self._lock:
+                teams = self._fresh(org)
+            if teams is not None:
+                return teams
+
+            _LOGGER.info("Listing teams in organization '%s'.", organization.login)
+            teams = {}
+            for team in organization.get_teams():
+                # Slugs win over names, so that a name cannot hide another team's slug.
+                teams.setdefault(team.name.lower(), team)
+                teams[team.slug.lower()] = team
+
+            with self._lock:
+                self._entries[org] = (self._clock(), teams)
+            return teams
@@ -0,0 +1,285 @@
+"""Hierarchical timing spans for runs, groups, and API requests.
+
+Tracing is off unless :func:`start_tracing` is called,
+and :func:`span` costs almost nothing while it is off.
+Spans nest through :mod:`contextvars`,
+so a request span is parented to the group that made it
+whether the group runs in a worker thread or an asyncio task.
+
+Code that only needs the spans of one block, such as the idempotency check,
+can collect them with :func:`collect_spans` instead of searching the whole trace.
+
+Traces are exported in the Chrome trace event format,
+which https://ui.perfetto.dev and ``chrome://tracing`` can open.
+https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU
+"""
+import asyncio
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+__all__ = (
+    "Span",
+    "Tracer",
+    "collect_spans",
+    "current_span",
+    "ensure_tracing",
+    "route_template",
+    "span",
+    "start_tracing",
+    "stop_tracing",
+)
+_LOGGER = logging.getLogger(__name__)
+# Path segments that name a collection. The segment after one of these identifies an item in it.
+_PLACEHOLDERS = dict(
+    repos="{owner}/{repo}",
+    orgs="{org}",
+    users="{username}",
+    teams="{team}",
+    labels="{name}",
+    milestones="{number}",
+    collaborators="{username}",
+    invitations="{invitation_id}",
+    branches="{branch}",
+    contents="{path}",
+)
+
+
+def route_template(url: str) -> str:
+    """Replace the variable parts of an API URL with placeholders.
+
+    For example, ``https://api.github.com/repos/foo/bar/labels/bug?page=2``
+    becomes ``/repos/{owner}/{repo}/labels/{name}``.
+    """
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    template: List[str] = []
+    index = 0
+    while index < len(parts):
+        part = parts[index]
+        template.append(part)
+        placeholder = _PLACEHOLDERS.get(part)
+        if placeholder is not None and index + 1 < len(parts):
+            template.append(placeholder)
+            index += placeholder.count("/") + 1
+        index += 1
+
+    return "/" + "/".join(template)
+
+
+class Span:
+    """A named, timed operation."""
+
+    def __init__(
+        self, name: str, category: str, span_id: int, parent_id: Optional[int], **attributes
+    ):
+        """Start timing the operation now.
+
+        :param parent_id: ID of the enclosing span, or ``None`` for a root span
+        """
+        self.name = name
+        self.category = category
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+
+    def set(self, **attributes):
+        """Add or replace attributes."""
+        self.attributes.update(attributes)
+
+
+class _NullSpan(Span):
+    """Stand-in used while tracing is off."""
+
+    def __init__(self):  # pylint: disable=super-init-not-called
+        pass
+
+    def set(self, **attributes):
+        """Discard attributes."""
+
+
+_NULL_SPAN = _NullSpan()
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("repo_manager_span", default=None)
+_COLLECTORS: contextvars.ContextVar = contextvars.ContextVar(
+    "repo_manager_span_collectors", default=()
+)
+_TRACER: Optional["Tracer"] = None
+_START_LOCK = threading.Lock()
+
+
+def _lane_key() -> Tuple[int, Optional[int]]:
+    """Identify the thread, and the asyncio task if there is one, that a span runs on."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return threading.get_ident(), id(task) if task is not None else None
+
+
+def _lane_name() -> str:
+    name = threading.current_thread().name
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        name = f"{name} {task.get_name()}"
+    return name
+
+
+class Tracer:
+    """Collect finished spans and export them.
+
+    This is safe to share between threads.
+    """
+
+    def __init__(self, record: bool = True):
+        """Start the trace clock.
+
+        :param record: keep every finished span for :attr:`spans` and :meth:`export`;
+            if not set, finished spans are only passed to :func:`collect_spans` blocks
+        """
+        self.record = record
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._finished: List[Tuple[Span, int]] = []
+        self._lanes: Dict[Tuple[int, Optional[int]], Tuple[int, str]] = {}
+
+    def _lane(self) -> int:
+        key = _lane_key()
+        with self._lock:
+            if key not in self._lanes:
+                self._lanes[key] = (len(self._lanes) + 1, _lane_name())
+            return self._lanes[key][0]
+
+    @contextmanager
+    def span(self, name: str, category: str, **attributes) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span."""
+        parent = _CURRENT.get()
+        current = Span(
+            name,
+            category,
+            next(self._ids),
+            parent.span_id if parent is not None else None,
+            **attributes,
+        )
+        token = _CURRENT.set(current)
+        try:
+            yield current
+        except BaseException as error:
+            current.set(error=repr(error))
+            raise
+        finally:
+            _CURRENT.reset(token)
+            current.end = time.perf_counter()
+            for collector in _COLLECTORS.get():
+                collector.append(current)
+            if self.record:
+                lane = self._lane()
+                with self._lock:
+                    self._finished.append((current, lane))
+
+    @property
+    def spans(self) -> List[Span]:
+        """Finished spans, in the order they finished."""
+        with self._lock:
+            return [finished for finished, _lane in self._finished]
+
+    def _events(self) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        with self._lock:
+            finished = list(self._finished)
+            lanes = list(self._lanes.values())
+
+        events: List[Dict[str, Any]] = [
+            dict(name="thread_name", ph="M", pid=pid, tid=lane, args=dict(name=name))
+            for lane, name in lanes
+        ]
+        for finished_span, lane in sorted(finished, key=lambda item: item[0].start):
+            args = dict(finished_span.attributes, span_id=finished_span.span_id)
+            if finished_span.parent_id is not None:
+                args["parent_id"] = finished_span.parent_id
+            events.append(
+                dict(
+                    name=finished_span.name,
+                    cat=finished_span.category,
+                    ph="X",
+                    ts=round((finished_span.start - self._origin) * 1e6, 3),
+                    dur=round((finished_span.end - finished_span.start) * 1e6, 3),
+                    pid=pid,
+                    tid=lane,
+                    args=args,
+                )
+            )
+        return events
+
+    def export(self, path: str):
+        """Write the trace to ``path`` as Chrome trace event JSON."""
+        events = self._events()
+        with open(path, "w") as raw:
+            json.dump(dict(traceEvents=events, displayTimeUnit="ms"), raw)
+        _LOGGER.info("Wrote %d trace events to '%s'", len(events), path)
+
+
+def start_tracing() -> Tracer:
+    """Start recording spans for this process."""
+    global _TRACER  # pylint: disable=global-statement
+    _TRACER = Tracer()
+    return _TRACER
+
+
+def ensure_tracing(record: bool = True) -> Tracer:
+    """Start tracing this process, unless it is already being traced.
+
+    :param record: whether a newly started tracer keeps every finished span
+    """
+    global _TRACER  # pylint: disable=global-statement
+    with _START_LOCK:
+        if _TRACER is None:
+            _TRACER = Tracer(record=record)
+        return _TRACER
+
+
+def stop_tracing():
+    """Stop recording spans."""
+    global _TRACER  # pylint: disable=global-statement
+    _TRACER = None
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Span]]:
+    """Collect the spans that finish within the enclosed block, in the order they finish.
+
+    Spans from worker threads and asyncio tasks started within the block are included,
+    as long as they run in a copy of its context.
+    Only the spans of this block are kept,
+    so the cost does not grow with the number of blocks collected before it.
+    """
+    collected: List[Span] = []
+    token = _COLLECTORS.set(_COLLECTORS.get() + (collected,))
+    try:
+        yield collected
+    finally:
+        _COLLECTORS.reset(token)
+
+
+def span(name: str, category: str, **attributes) -> ContextManager[Span]:
+    """Time the enclosed block as a child of the current span, if tracing is on."""
+    if _TRACER is None:
+        return nullcontext(_NULL_SPAN)
+    return _TRACER.span(name, category, **attributes)
+
+
+def current_span() -> Span:
+    """Find the innermost open span, or a stand-in that ignores attributes if there is none."""
+    current = _CURRENT.get()
+    return current if current is not None else _NULL_SPAN
@@ -0,0 +1,442 @@
+"""Shared HTTP transport for the PyGithub and agithub clients.
+
+Both clients normally manage their own connections,
+so each one pays for its own TLS handshakes
+and neither reuses the other's keep-alive connections.
+:class:`Transport` owns a single pool of persistent connections, one pool per host,
+and both clients are wired to send every request through it.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+from urllib.parse import urlsplit
+
+import urllib3
+from agithub.base import ConnectionProperties
+from agithub.GitHub import GitHub, GitHubClient
+from github.Requester import Requester
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from ._etag_cache import CachedResponse, ETagCache
+from ._ratelimit import RateLimiter
+from ._response_cache import CachedEntry, ResponseCache
+from ._shared_reads import current_reads
+from ._tracing import current_span, route_template, span
+from ._verify import is_write
+
+__all__ = ("Transport", "TransportResponse", "TransportStats", "DEFAULT_TIMEOUT")
+_LOGGER = logging.getLogger(__name__)
+DEFAULT_TIMEOUT = 30.0
+_POOL_SIZE = 16
+
+
+@dataclass
+class TransportStats:
+    """Counters for a :class:`Transport`."""
+
+    requests: int = 0
+    connections_opened: int = 0
+    not_modified: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def connections_reused(self) -> int:
+        """Number of requests that were sent on an already open connection."""
+        return self.requests - self.connections_opened
+
+    def count_request(self):
+        """Record that a request was sent."""
+        with self._lock:
+            self.requests += 1
+
+    def count_connection(self):
+        """Record that a new connection was opened."""
+        with self._lock:
+            self.connections_opened += 1
+
+    def count_not_modified(self):
+        """Record that a response was served from the cache after revalidation."""
+        with self._lock:
+            self.not_modified += 1
+
+
+@dataclass
+class TransportResponse:
+    """A fully read, decoded response."""
+
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Find the value of a response header, ignoring case."""
+        name = name.lower()
+        for key, value in self.headers:
+            if key.lower() == name:
+                return value
+        return default
+
+
+def _counting_pool(
+    base: Type[HTTPConnectionPool], stats: TransportStats
+) -> Type[HTTPConnectionPool]:
+    """Build a connection pool class that counts every connection it opens."""
+
+    def _new_conn(self):
+        stats.count_connection()
+        return base._new_conn(self)  # pylint: disable=protected-access
+
+    return type(f"Counting{base.__name__}", (base,), {"_new_conn": _new_conn})
+
+
+class Transport:
+    """Persistent, pooled HTTP transport.
+
+    Connections are kept alive and reused per host,
+    and gzip-encoded responses are decoded transparently.
+    If an ``etag_cache`` is provided,
+    GET requests are sent as conditional requests
+    and ``304 Not Modified`` responses are answered from the cache.
+    Within a :func:`._shared_reads.share_reads` block,
+    repeated GET requests are answered from the responses shared by the block.
+    If a ``response_cache`` is provided,
+    GET requests to slow-changing routes are answered from it without being sent
+    until the cached response expires.
+    Every request is paced by ``rate_limiter``,
+    and rate limited responses are retried once the limit allows.
+    The transport is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = _POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        etag_cache: Optional[ETagCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        response_cache: Optional[ResponseCache] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """Set up an empty pool. Connections are opened on first use."""
+        self.stats = TransportStats()
+        self._etag_cache = etag_cache
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self._sleep = sleep
+        self._pool = urllib3.PoolManager(
+            num_pools=pool_size,
+            maxsize=pool_size,
+            block=False,
+            retries=False,
+            timeout=urllib3.Timeout(total=timeout),
+        )
+        self._pool.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self.stats),
+            "https": _counting_pool(HTTPSConnectionPool, self.stats),
+        }
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Union[bytes, str, None] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> TransportResponse:
+        """Send a request and read the full response.
+
+        :param url: absolute URL, including scheme and host
+        """
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        headers.setdefault("accept-encoding", "gzip")
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        route = route_template(url)
+        with span(
+            f"{method} {route}", "http", method=method, route=route, path=urlsplit(url).path
+        ) as request_span:
+            result = self._request(method, url, body, headers)
+            request_span.set(
+                status=result.status,
+                request_bytes=len(body or b""),
+                response_bytes=len(result.body),
+            )
+        return result
+
+    def _request(
+        self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str]
+    ) -> TransportResponse:
+        """Send a request, answering it from the caches if possible."""
+        reads = current_reads()
+        if reads is None:
+            return self._cached(method, url, body, headers)
+
+        if method.upper() != "GET":
+            result = self._cached(method, url, body, headers)
+            if is_write(method, route_template(url)):
+                reads.write()
+            return result
+
+        key = ETagCache.key(url, headers)
+        shared = reads.load(key)
+        if shared is not None:
+            current_span().set(shared=True)
+            return shared
+
+        generation = reads.generation
+        result = self._cached(method, url, body, headers)
+        if result.status == 200:
+            reads.store(key, result, generation)
+        return result
+
+    def _cached(
+        self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str]
+    ) -> TransportResponse:
+        """Send a request, answering it from the response cache if possible."""
+        if self.response_cache is not None:
+            if method.upper() != "GET":
+                result = self._revalidated(method, url, body, headers)
+                if result.status < 400:
+                    self.response_cache.invalidate(url)
+                return result
+
+            entry = self.response_cache.load(url, headers)
+            if entry is not None:
+                current_span().set(cached=True)
+                return TransportResponse(
+                    status=entry.status, headers=entry.headers, body=entry.body
+                )
+
+            result = self._revalidated(method, url, body, headers)
+            self.response_cache.store(
+                url, headers, CachedEntry(result.status, result.headers, result.body)
+            )
+            return result
+
+        return self._revalidated(method, url, body, headers)
+
+    def _revalidated(
+        self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str]
+    ) -> TransportResponse:
+        """Send a request, answering it from the ETag cache if it was not modified."""
+        cache_key: Optional[str] = None
+        cached: Optional[CachedResponse] = None
+        if self._etag_cache is not None and method.upper() == "GET":
+            cache_key = self._etag_cache.key(url, headers)
+            cached = self._etag_cache.load(cache_key)
+            if cached is not None:
+                # Copied, so that the validators do not change the response cache key.
+                headers = dict(headers, **cached.validators())
+
+        result = self._send(method, url, body, headers)
+
+        if cache_key is None:
+            return result
+
+        if result.status == 304 and cached is not None:
+            self.stats.count_not_modified()
+            current_span().set(not_modified=True)
+            return TransportResponse(status=200, headers=cached.headers, body=cached.body)
+
+        if result.status == 200:
+            self._etag_cache.store(
+                cache_key,
+                CachedResponse(
+                    url=url,
+                    headers=result.headers,
+                    body=result.body,
+                    etag=result.getheader("etag"),
+                    last_modified=result.getheader("last-modified"),
+                ),
+            )
+
+        return result
+
+    def _send(
+        self, method: str, url: str, body: Optional[bytes], headers: Dict[str, str]
+    ) -> TransportResponse:
+        """Send a request, waiting out and retrying any rate limit responses."""
+        attempt = 0
+        while True:
+            delay = self.rate_limiter.delay_before(method, url)
+            if delay > 0:
+                self._sleep(delay)
+
+            self.stats.count_request()
+            response = self._pool.request(
+                method, url, body=body, headers=headers, redirect=False, decode_content=True
+            )
+            _LOGGER.debug("%s %s -> %d", method, url, response.status)
+
+            retry = self.rate_limiter.retry_delay(
+                response.status,
+                {key.lower(): value for key, value in response.headers.items()},
+                response.data,
+                attempt,
+            )
+            if retry is None:
+                break
+
+            # The limiter is now paused, so the next pass waits before resending.
+            attempt += 1
+            current_span().set(retries=attempt)
+
+        # The body is already decoded, so the encoding no longer applies to it.
+        response_headers = [
+            (key, value)
+            for key, value in response.headers.items()
+            if key.lower() not in ("content-encoding", "content-length")
+        ]
+        return TransportResponse(
+            status=response.status, headers=response_headers, body=response.data
+        )
+
+    def log_stats(self):
+        """Log the request and connection counters."""
+        _LOGGER.info(
+            "HTTP transport: %d requests, %d connections opened, %d connections reused,"
+            " %d responses not modified",
+            self.stats.requests,
+            self.stats.connections_opened,
+            self.stats.connections_reused,
+            self.stats.not_modified,
+        )
+        if self.response_cache is not None:
+            self.response_cache.log_stats()
+
+    def install_pygithub(self):
+        """Send all PyGithub requests in this process through this transport."""
+        Requester.injectConnectionClasses(
+            _pygithub_connection_class(self, "http"), _pygithub_connection_class(self, "https")
+        )
+
+    def attach_agithub(self, api: GitHub):
+        """Send all requests from an agithub client through this transport."""
+        properties: ConnectionProperties = api.client.prop
+        client = _PooledGitHubClient(
+            self, paginate=api.client.paginate, sleep_on_ratelimit=api.client.sleep_on_ratelimit,
+        )
+        api.setClient(client)
+        api.setConnectionProperties(properties)
+
+
+class _PyGithubResponse:
+    """Mimic the response object PyGithub expects from its connection classes."""
+
+    def __init__(self, response: TransportResponse):
+        self._response = response
+        self.status = response.status
+        self.headers = dict(response.headers)
+
+    def getheaders(self) -> List[Tuple[str, str]]:
+        return self._response.headers
+
+    def read(self) -> str:
+        return self._response.body.decode("utf-8")
+
+    def iter_content(self, chunk_size: Optional[int] = 1) -> Iterator[bytes]:
+        chunk_size = chunk_size or len(self._response.body) or 1
+        body = self._response.body
+        for start in range(0, len(body), chunk_size):
+            yield body[start : start + chunk_size]
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise urllib3.exceptions.HTTPError(f"HTTP {self.status}")
+
+
+def _pygithub_connection_class(transport: Transport, protocol: str) -> type:
+    """Build a PyGithub connection class that sends requests through ``transport``."""
+
+    class _Connection:
+        def __init__(self, host: str, port: Optional[int] = None, *args, **kwargs):
+            self.host = host
+            self.port = port
+            self.protocol = protocol
+            self._request: Tuple[str, str, Union[bytes, str, None], Dict[str, str]] = (
+                "GET",
+                "/",
+                None,
+                {},
+            )
+
+        def request(self, verb: str, url: str, input, headers: Dict[str, str], stream=False):
+            # pylint: disable=redefined-builtin,unused-argument
+            if hasattr(input, "read"):
+                input = input.read()
+            self._request = (verb, url, input, headers)
+
+        def getresponse(self) -> _PyGithubResponse:
+            verb, url, body, headers = self._request
+            port = f":{self.port}" if self.port else ""
+            return _PyGithubResponse(
+                transport.request(verb, f"{self.protocol}://{self.host}{port}{url}", body, headers)
+            )
+
+        def close(self):
+            """Leave the connection open; it belongs to the shared pool."""
+
+    _Connection.__name__ = f"Pooled{protocol.upper()}Connection"
+    return _Connection
+
+
+class _AgithubConnection:
+    """Mimic the ``http.client`` connection agithub expects."""
+
+    def __init__(self, transport: Transport, base_url: str):
+        self._transport = transport
+        self._base_url = base_url
+        self._response: Optional[TransportResponse] = None
+
+    def request(self, method: str, url: str, body, headers: Dict[str, str]):
+        url = url if url.startswith("http") else f"{self._base_url}{url}"
+        self._response = self._transport.request(method, url, body, headers)
+
+    def getresponse(self) -> "_AgithubResponse":
+        return _AgithubResponse(self._response)
+
+    def close(self):
+        """Leave the connection open; it belongs to the shared pool."""
+
+
+class _AgithubResponse:
+    """Mimic the ``http.client`` response agithub expects."""
+
+    def __init__(self, response: TransportResponse):
+        self._response = response
+        self.status = response.status
+
+    def read(self) -> bytes:
+        return self._response.body
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._response.getheader(name, default)
+
+    def getheaders(self) -> List[Tuple[str, str]]:
+        return self._response.headers
+
+
+class _PooledGitHubClient(GitHubClient):
+    """agithub client that sends requests through a :class:`Transport`.
+
+    agithub keeps the last response headers on the client to drive pagination.
+    They are kept per thread here so that concurrent handlers can share one client.
+    """
+
+    def __init__(self, transport: Transport, **kwargs):
+        super().__init__(**kwargs)
+        self._transport = transport
+        self._local = threading.local()
+
+    @property  # type: ignore
+    def headers(self):
+        return getattr(self._local, "headers", None)
+
+    @headers.setter
+    def headers(self, value):
+        self._local.headers = value
+
+    def get_connection(self) -> _AgithubConnection:
+        scheme = "https" if self.prop.secure_http else "http"
+        return _AgithubConnection(self._transport, f"{scheme}://{self.prop.api_url}")
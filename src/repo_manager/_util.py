@@ -1,15 +1,33 @@
 """Utility helpers."""
+import asyncio
+import contextvars
+import inspect
 import os
+import threading
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import quote
 
 from agithub.base import IncompleteRequest
 from agithub.GitHub import GitHub
 from github import Github
+from github.GithubException import UnknownObjectException
 from github.Organization import Organization
 from github.Permissions import Permissions
 from github.Repository import Repository
 
+from ._aio import AsyncGitHub, AsyncRepo
+from ._config import ConfigCache
+from ._environment import load_count_from_environment as _load_count_from_environment
+from ._environment import load_from_environment as _load_from_environment
+from ._etag_cache import ETagCache
+from ._graphql import GRAPHQL_GROUPS, RepositoryState, fetch_state
+from ._response_cache import ResponseCache
+from ._select import split_groups
+from ._state import StateStore, load_state_store
+from ._team_directory import TeamDirectory
+from ._transport import Transport
+from ._writes import DEFAULT_WRITE_WORKERS
 from .exceptions import RepoAdminError, UserConfigError
 
 __all__ = (
@@ -19,27 +37,111 @@ __all__ = (
     "RepoContext",
     "permission_to_string",
     "HandlerRequest",
+    "split_repository_name",
+    "RepoResources",
+    "CONTEXT_NAMES",
+    "github_client",
+    "arepo_send",
+    "arepo_request",
 )
-_NOT_SET = object()
+CONTEXT_NAMES = ("repository", "arepo", "organization", "aorg", "aiorepo", "state")
 
 
-@dataclass
 class HandlerRequest:
-    """Values for a handler request."""
+    """Values for a handler request.
 
-    data: Any
-    repository: Optional[Repository] = None
-    arepo: Optional[IncompleteRequest] = None
-    organization: Optional[Organization] = None
-    aorg: Optional[IncompleteRequest] = None
+    Repository and organization values can be provided directly.
+    Any value that is not provided is resolved from ``resources`` on first use,
+    but only if its name is listed in ``requires``.
+    ``write_workers`` limits how many writes the handler sends at once.
+    ``team_directory`` caches organization teams between requests.
+    """
 
-    def __post_init__(self):
-        """Verify that at least one of the repo kinds was provided.
+    def __init__(
+        self,
+        data: Any,
+        repository: Optional[Repository] = None,
+        arepo: Optional[IncompleteRequest] = None,
+        organization: Optional[Organization] = None,
+        aorg: Optional[IncompleteRequest] = None,
+        aiorepo: Optional[AsyncRepo] = None,
+        state: Optional[RepositoryState] = None,
+        resources: Optional["RepoResources"] = None,
+        requires: Iterable[str] = CONTEXT_NAMES,
+        write_workers: int = DEFAULT_WRITE_WORKERS,
+        team_directory: Optional[TeamDirectory] = None,
+    ):
+        """Verify that at least one of the repo kinds or a resources source was provided.
 
-        TEMPORARY: REMOVE ONCE AGITHUB MIGRATION IS COMPLETE
+        TEMPORARY: REMOVE REPO KIND CHECK ONCE AGITHUB MIGRATION IS COMPLETE
         """
-        if self.repository is self.arepo is None:
-            raise ValueError("Must provide one of 'repository' or 'arepo'")
+        if resources is None and repository is arepo is None:
+            raise ValueError("Must provide one of 'repository', 'arepo', or 'resources'")
+
+        self.data = data
+        self.write_workers = write_workers
+        self.team_directory = team_directory
+        self._resources = resources
+        self._requires = frozenset(requires)
+        self._values: Dict[str, Any] = dict(
+            repository=repository,
+            arepo=arepo,
+            organization=organization,
+            aorg=aorg,
+            aiorepo=aiorepo,
+            state=state,
+        )
+
+    def _get(self, name: str) -> Any:
+        value = self._values[name]
+        if value is not None or self._resources is None:
+            return value
+
+        if name not in self._requires:
+            raise RepoAdminError(f"Handler did not declare that it requires '{name}'")
+
+        # Keep the resolved value so that each request holds on to the same agithub request.
+        value = getattr(self._resources, name)
+        self._values[name] = value
+        return value
+
+    @property
+    def repository(self) -> Optional[Repository]:
+        """Return the PyGithub repository."""
+        return self._get("repository")
+
+    @property
+    def arepo(self) -> Optional[IncompleteRequest]:
+        """Return the agithub repository request."""
+        return self._get("arepo")
+
+    @property
+    def organization(self) -> Optional[Organization]:
+        """Return the PyGithub organization, or ``None`` if the owner is not an organization."""
+        return self._get("organization")
+
+    @property
+    def aorg(self) -> Optional[IncompleteRequest]:
+        """Return the agithub organization request.
+
+        This is ``None`` if the owner is not an organization.
+        """
+        return self._get("aorg")
+
+    @property
+    def aiorepo(self) -> Optional[AsyncRepo]:
+        """Async repository client, if the asyncio engine is in use."""
+        return self._get("aiorepo")
+
+    @property
+    def state(self) -> Optional[RepositoryState]:
+        """Current repository state read with GraphQL, or ``None`` if GraphQL reads are off."""
+        return self._get("state")
+
+    async def state_async(self) -> Optional[RepositoryState]:
+        """Resolve :attr:`state` from a coroutine without blocking the event loop."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, contextvars.copy_context().run, self._get, "state")
 
 
 @dataclass
@@ -50,19 +152,77 @@ class Inputs:
     github: Github
     config_file: str
     debug: bool
+    transport: Optional[Transport] = None
+    max_workers: int = 4
+    write_workers: int = DEFAULT_WRITE_WORKERS
+    aiogithub: Optional[AsyncGitHub] = None
+    fleet_manifest: Optional[str] = None
+    fleet_report: Optional[str] = None
+    fleet_workers: int = 8
+    state_store: Optional[StateStore] = None
+    only: Tuple[str, ...] = ()
+    skip: Tuple[str, ...] = ()
+    previous_config_file: Optional[str] = None
+    previous_ref: Optional[str] = None
+    trace_file: Optional[str] = None
+    graphql_reads: bool = False
+    verify_idempotent: bool = False
+    config_cache: Optional[ConfigCache] = None
+    team_directory: Optional[TeamDirectory] = None
 
 
-def _load_from_environment(*names: str, kind: str, default: str = _NOT_SET) -> str:
-    """Return the first environment variable value that is set and not empty."""
-    for name in names:
-        value = os.environ.get(name, None)
-        if value:
-            return value
+def arepo_send(
+    arepo: IncompleteRequest,
+    method: str,
+    *parts: Any,
+    body: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Tuple[int, Any]:
+    """Send a request to a path under an agithub repository request.
+
+    agithub builds URLs by mutating the request object,
+    so the URL is built separately, with each part quoted, and ``arepo`` is left unchanged.
+    This makes it safe to send requests for one ``arepo`` from many threads.
+
+    :returns: response status and data
+    """
+    url = "/".join([arepo.url] + [quote(str(part), safe="") for part in parts])
+    send = getattr(arepo.client, method.lower())
+    if body is not None:
+        return send(url, body=body, headers=headers)
+    return send(url, headers=headers)
+
 
-    if default is not _NOT_SET:
-        return default
+def arepo_request(
+    arepo: IncompleteRequest,
+    method: str,
+    *parts: Any,
+    body: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> Any:
+    """Send a request with :func:`arepo_send` and check that it succeeded.
 
-    raise UserConfigError(f"{kind} not set")
+    :returns: response data
+    :raises RepoAdminError: if the response is not a success
+    """
+    status, response = arepo_send(arepo, method, *parts, body=body, headers=headers)
+    if not 200 <= status < 300:
+        raise RepoAdminError(f"Encountered unknown error: STATUS {status} :: {response}")
+
+    return response
+
+
+def github_client(token: str, **kwargs) -> Github:
+    """Build a PyGithub client that leaves request pacing to the shared transport.
+
+    PyGithub 2 waits between every request on its own.
+    The transport's rate limiter already paces requests against the real limits,
+    so that extra wait is turned off where the installed PyGithub supports it.
+    """
+    if "seconds_between_requests" in inspect.signature(Github).parameters:
+        kwargs.update(seconds_between_requests=None, seconds_between_writes=None)
+
+    return Github(token, per_page=100, **kwargs)
 
 
 def load_inputs() -> Inputs:
@@ -72,11 +232,74 @@ def load_inputs() -> Inputs:
         "INPUT_CONFIG-FILE", kind="Config Filename", default=".github/settings.yml"
     )
     debug_raw = _load_from_environment("INPUT_DEBUG", kind="Debug Flag", default="false")
+    max_workers = _load_count_from_environment("INPUT_MAX-WORKERS", kind="Max workers", default="4")
+    write_workers = _load_count_from_environment(
+        "INPUT_WRITE-WORKERS", kind="Write workers", default=str(DEFAULT_WRITE_WORKERS)
+    )
+    engine = _load_from_environment("INPUT_ENGINE", kind="Engine", default="threads")
+    if engine not in ("threads", "asyncio"):
+        raise UserConfigError(f"Unknown engine '{engine}'")
+    fleet_manifest = _load_from_environment(
+        "INPUT_FLEET-MANIFEST", kind="Fleet Manifest", default=""
+    )
+    fleet_report = _load_from_environment("INPUT_FLEET-REPORT", kind="Fleet Report", default="")
+    fleet_workers = _load_count_from_environment(
+        "INPUT_FLEET-WORKERS", kind="Fleet workers", default="8"
+    )
+
+    cache_dir = _load_from_environment("INPUT_CACHE-DIR", kind="Cache Directory", default="")
+    state_file = _load_from_environment("INPUT_STATE-FILE", kind="State File", default="")
+    state_property = _load_from_environment(
+        "INPUT_STATE-PROPERTY", kind="State Property", default=""
+    )
+
+    only = _load_from_environment("INPUT_ONLY", kind="Only Groups", default="")
+    skip = _load_from_environment("INPUT_SKIP", kind="Skip Groups", default="")
+    previous_config_file = _load_from_environment(
+        "INPUT_PREVIOUS-CONFIG-FILE", kind="Previous Config File", default=""
+    )
+    previous_ref = _load_from_environment("INPUT_PREVIOUS-REF", kind="Previous Ref", default="")
+    trace_file = _load_from_environment("INPUT_TRACE-FILE", kind="Trace File", default="")
+    graphql_raw = _load_from_environment(
+        "INPUT_GRAPHQL-READS", kind="GraphQL Reads", default="false"
+    )
+    verify_raw = _load_from_environment(
+        "INPUT_VERIFY-IDEMPOTENT", kind="Verify Idempotent", default="false"
+    )
+
+    # Both clients share one pooled transport.
+    transport = Transport(
+        etag_cache=ETagCache(cache_dir) if cache_dir else None,
+        response_cache=ResponseCache(os.path.join(cache_dir, "responses")) if cache_dir else None,
+    )
+    transport.install_pygithub()
+    agithub = GitHub(token=token, paginate=True)
+    transport.attach_agithub(agithub)
+
     return Inputs(
-        agithub=GitHub(token=token, paginate=True),
-        github=Github(token),
+        agithub=agithub,
+        github=github_client(token),
         config_file=config,
+        transport=transport,
         debug=debug_raw == "true",
+        max_workers=max_workers,
+        write_workers=write_workers,
+        aiogithub=(
+            AsyncGitHub(token, rate_limiter=transport.rate_limiter) if engine == "asyncio" else None
+        ),
+        fleet_manifest=fleet_manifest or None,
+        fleet_report=fleet_report or None,
+        fleet_workers=fleet_workers,
+        state_store=load_state_store(agithub, state_file, state_property),
+        only=split_groups(only),
+        skip=split_groups(skip),
+        previous_config_file=previous_config_file or None,
+        previous_ref=previous_ref or None,
+        trace_file=trace_file or None,
+        graphql_reads=graphql_raw == "true",
+        verify_idempotent=verify_raw == "true",
+        config_cache=ConfigCache(os.path.join(cache_dir, "config") if cache_dir else None),
+        team_directory=TeamDirectory(),
     )
 
 
@@ -88,12 +311,105 @@ class RepoContext:
     repo: str
 
 
-def load_context() -> RepoContext:
-    """Load the repository context from environment variables."""
-    raw_repo = _load_from_environment(
-        "INPUT_GITHUB-REPOSITORY", "GITHUB_REPOSITORY", kind="Repository name"
-    )
+class RepoResources:
+    """Repository and organization objects for one run.
+
+    Anything that needs an API call is resolved on first use
+    and then shared by every handler in the run.
+    """
+
+    def __init__(
+        self, inputs: Inputs, context: RepoContext, config: Optional[Dict[str, Any]] = None
+    ):
+        """Prepare to resolve objects for ``context``. No API calls are made here.
+
+        :param config: config groups in this run, which determine what :attr:`state` reads
+        """
+        self._inputs = inputs
+        self._context = context
+        self._config = config or {}
+        self._locks = {
+            name: threading.Lock() for name in ("repository", "organization", "aorg", "state")
+        }
+        self._resolved: Dict[str, Any] = {}
+
+    def _memoize(self, name: str, loader: Callable[[], Any]) -> Any:
+        if name not in self._resolved:
+            with self._locks[name]:
+                if name not in self._resolved:
+                    self._resolved[name] = loader()
+
+        return self._resolved[name]
+
+    def _load_repository(self) -> Repository:
+        return self._inputs.github.get_repo(
+            full_name_or_id=f"{self._context.owner}/{self._context.repo}"
+        )
+
+    def _load_organization(self) -> Optional[Organization]:
+        try:
+            return self._inputs.github.get_organization(self._context.owner)
+        except UnknownObjectException:
+            return None
+
+    def _probe_aorg(self) -> bool:
+        status, _org_data = getattr(self._inputs.agithub.orgs, self._context.owner).get()
+        return status == 200
+
+    @property
+    def repository(self) -> Repository:
+        """Return the PyGithub repository."""
+        return self._memoize("repository", self._load_repository)
+
+    @property
+    def arepo(self) -> IncompleteRequest:
+        """A new agithub repository request.
+
+        agithub requests build their URL by mutating the request object,
+        so every caller gets its own request.
+        """
+        return getattr(getattr(self._inputs.agithub.repos, self._context.owner), self._context.repo)
+
+    @property
+    def organization(self) -> Optional[Organization]:
+        """Return the PyGithub organization, or ``None`` if the owner is not an organization."""
+        return self._memoize("organization", self._load_organization)
 
+    @property
+    def aorg(self) -> Optional[IncompleteRequest]:
+        """A new agithub organization request, or ``None`` if the owner is not an organization."""
+        if not self._memoize("aorg", self._probe_aorg):
+            return None
+
+        return getattr(self._inputs.agithub.orgs, self._context.owner)
+
+    @property
+    def aiorepo(self) -> Optional[AsyncRepo]:
+        """Async repository client, if the asyncio engine is in use."""
+        if self._inputs.aiogithub is None:
+            return None
+
+        return AsyncRepo(self._inputs.aiogithub, self._context.owner, self._context.repo)
+
+    def _load_state(self) -> Optional[RepositoryState]:
+        config = {group: data for group, data in self._config.items() if group in GRAPHQL_GROUPS}
+        if not self._inputs.graphql_reads or not config:
+            return None
+
+        return fetch_state(self._inputs.agithub, self._context.owner, self._context.repo, config)
+
+    @property
+    def state(self) -> Optional[RepositoryState]:
+        """Current state of every configured group that has a GraphQL read.
+
+        The state is read once, on first use, and shared by every handler in the run.
+        It is ``None`` if GraphQL reads are off.
+        """
+        return self._memoize("state", self._load_state)
+
+
+def split_repository_name(raw_repo: str) -> RepoContext:
+    """Split an ``owner/repo`` name into a repository context."""
     try:
         owner, repo = raw_repo.split("/", 1)
     except ValueError:
@@ -102,6 +418,15 @@ def load_context() -> RepoContext:
     return RepoContext(owner=owner, repo=repo)
 
 
+def load_context() -> RepoContext:
+    """Load the repository context from environment variables."""
+    raw_repo = _load_from_environment(
+        "INPUT_GITHUB-REPOSITORY", "GITHUB_REPOSITORY", kind="Repository name"
+    )
+
+    return split_repository_name(raw_repo)
+
+
 def permission_to_string(permission: Permissions) -> str:
     """Convert a :class:`github.Permissions.Permissions` instance to the corresponding string."""
     if permission.admin:
@@ -0,0 +1,83 @@
+"""Check a config without contacting GitHub.
+
+Nothing here imports the API clients or the group handlers,
+so validation stays fast enough to run as a pre-commit hook
+and can run before any API call is made.
+"""
+import os
+import pkgutil
+from typing import Any, Dict, List, Tuple
+
+import yaml
+
+from ._config import load_yaml
+from ._schema import GROUP_SCHEMAS, check
+from .exceptions import UserConfigError
+
+__all__ = ("config_errors", "known_groups", "validate_config", "validate_config_file")
+_GROUPS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_groups")
+
+
+def known_groups() -> Tuple[str, ...]:
+    """Find the names of all config groups that have a handler, without importing the handlers."""
+    return tuple(
+        sorted(
+            module.name
+            for module in pkgutil.iter_modules([_GROUPS_PATH])
+            if not module.name.startswith("_")
+        )
+    )
+
+
+def config_errors(config: Any) -> List[str]:
+    """Check a whole config against the group schemas.
+
+    :returns: every error found, or an empty list if the config is valid
+    """
+    if not isinstance(config, dict):
+        return ["config must map group names to settings"]
+
+    groups = known_groups()
+    errors = []
+    unknown = sorted(str(group) for group in config if group not in groups)
+    if unknown:
+        errors.append(f"Unknown config groups: {', '.join(unknown)}")
+
+    for group, data in config.items():
+        schema = GROUP_SCHEMAS.get(group)
+        if schema is not None:
+            errors.extend(check(data, schema, group))
+
+    return errors
+
+
+def validate_config(config: Any, source: str = "config"):
+    """Check a whole config against the group schemas and fail with every error found.
+
+    :param source: name of the config in the error message
+    """
+    errors = config_errors(config)
+    if errors:
+        details = "\n".join(f"  - {error}" for error in errors)
+        count = f"{len(errors)} error{'s' if len(errors) > 1 else ''}"
+        raise UserConfigError(f"Invalid {source} ({count}):\n{details}")
+
+
+def validate_config_file(config_file: str) -> Dict[str, Any]:
+    """Load a config file and check it against the group schemas.
+
+    :returns: the loaded config
+    """
+    try:
+        with open(config_file, "r") as raw:
+            config = load_yaml(raw)
+    except OSError as error:
+        raise UserConfigError(f"Unable to read config file '{config_file}': {error}")
+    except yaml.YAMLError as error:
+        raise UserConfigError(f"Config file '{config_file}' is not valid YAML: {error}")
+
+    if config is None:
+        config = {}
+
+    validate_config(config, f"config file '{config_file}'")
+    return config
@@ -0,0 +1,67 @@
+"""Check that applying a config a second time sends no writes.
+
+Once a config has been applied, the remote state matches it,
+so applying it again straight away should only read.
+Any write in that second pass is a change that a handler sends on every run,
+which makes runs slower and hides real drift.
+
+The second pass is traced, and every request made within it is checked.
+Only the spans of the second pass are collected,
+so checking many repositories in one run does not rescan the spans of earlier ones.
+"""
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from ._tracing import Span, collect_spans, ensure_tracing, span
+from .exceptions import IdempotencyError
+
+__all__ = ("is_write", "no_writes")
+_LOGGER = logging.getLogger(__name__)
+_READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# GraphQL queries are sent with POST, but only read.
+_READ_ROUTES = ("/graphql",)
+
+
+def is_write(method: str, route: str) -> bool:
+    """Determine whether a request can change remote state."""
+    return method.upper() not in _READ_METHODS and route not in _READ_ROUTES
+
+
+def _writes(spans: List[Span]) -> List[Span]:
+    """Find the write requests among the spans."""
+    return [
+        item
+        for item in spans
+        if item.category == "http" and is_write(item.attributes["method"], item.attributes["route"])
+    ]
+
+
+@contextmanager
+def no_writes(name: str) -> Iterator[None]:
+    """Fail if the enclosed block sends any write request.
+
+    Tracing is started if it is not already on, without keeping spans for export,
+    so this works in threads and asyncio tasks alike.
+
+    :param name: what is being checked, used in the span and the error message
+    :raises IdempotencyError: listing each write request that was sent
+    """
+    ensure_tracing(record=False)
+    with collect_spans() as collected:
+        with span(f"verify {name}", "verify"):
+            yield
+
+    writes = _writes(collected)
+    if writes:
+        lines = "\n".join(
+            f"  - {item.attributes['method']} {item.attributes.get('path', item.attributes['route'])}"
+            f" (STATUS {item.attributes.get('status')})"
+            for item in writes
+        )
+        raise IdempotencyError(
+            f"Applying the config to {name} a second time sent {len(writes)} "
+            f"write{'' if len(writes) == 1 else 's'}:\n{lines}"
+        )
+
+    _LOGGER.info("Applying the config to %s a second time sent no writes.", name)
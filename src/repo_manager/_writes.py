@@ -0,0 +1,156 @@
+"""Send the writes for one group concurrently.
+
+Each write names the resources it touches, for example the old and new name of a renamed label.
+Writes that share a resource are sent in the order they were planned,
+and each one only starts once the write before it has finished.
+Writes that share nothing are sent at the same time, up to a limit.
+"""
+import asyncio
+import contextvars
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+__all__ = ("Write", "run_writes", "run_writes_async", "DEFAULT_WRITE_WORKERS")
+_LOGGER = logging.getLogger(__name__)
+DEFAULT_WRITE_WORKERS = 4
+
+
+@dataclass(frozen=True)
+class Write:
+    """One API write.
+
+    :param keys: names of the resources the write touches
+    :param send: function that sends the write;
+        for :func:`run_writes_async` it must return an awaitable
+    """
+
+    keys: FrozenSet[str]
+    send: Callable[[], Any]
+
+
+def _dependencies(writes: List[Write]) -> List[Set[int]]:
+    """Find, for each write, the earlier writes that must finish before it starts."""
+    latest: Dict[str, int] = {}
+    dependencies: List[Set[int]] = []
+    for index, write in enumerate(writes):
+        dependencies.append({latest[key] for key in write.keys if key in latest})
+        for key in write.keys:
+            latest[key] = index
+    return dependencies
+
+
+def _dependents(dependencies: List[Set[int]]) -> List[List[int]]:
+    """Find, for each write, the later writes that wait for it."""
+    dependents: List[List[int]] = [[] for _ in dependencies]
+    for index, indexes in enumerate(dependencies):
+        for dependency in indexes:
+            dependents[dependency].append(index)
+    return dependents
+
+
+def _release(index: int, dependents: List[List[int]], waiting_on: List[int]) -> List[int]:
+    """Note that a write finished, and find the writes that it leaves ready to start."""
+    ready = []
+    for dependent in dependents[index]:
+        waiting_on[dependent] -= 1
+        if waiting_on[dependent] == 0:
+            ready.append(dependent)
+    return ready
+
+
+def _collect(
+    done: Iterable[Future], running: Dict[Future, int], error: Optional[BaseException]
+) -> Tuple[List[int], Optional[BaseException]]:
+    """Collect finished writes.
+
+    :returns: the writes that succeeded, and the first error seen so far
+    """
+    succeeded = []
+    for future in done:
+        index = running.pop(future)
+        try:
+            future.result()
+        except Exception as failure:  # pylint: disable=broad-except
+            if error is None:
+                _LOGGER.error("Write failed. Not starting any remaining writes.")
+                error = failure
+            continue
+        succeeded.append(index)
+    return succeeded, error
+
+
+def run_writes(writes: Iterable[Write], max_workers: int = DEFAULT_WRITE_WORKERS):
+    """Send writes on a bounded worker pool, keeping the order of writes that share a resource.
+
+    If any write fails, no further writes are started
+    and the first error is raised once running writes complete.
+    """
+    writes = list(writes)
+    if max_workers <= 1 or len(writes) <= 1:
+        for write in writes:
+            write.send()
+        return
+
+    dependencies = _dependencies(writes)
+    waiting_on = [len(indexes) for indexes in dependencies]
+    dependents = _dependents(dependencies)
+
+    ready: Deque[int] = deque(index for index, count in enumerate(waiting_on) if count == 0)
+    running: Dict[Future, int] = {}
+    error: Optional[BaseException] = None
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="write") as executor:
+        while ready or running:
+            while ready and error is None and len(running) < max_workers:
+                index = ready.popleft()
+                # Executor threads do not inherit the caller's context, so carry it over for tracing.
+                future = executor.submit(contextvars.copy_context().run, writes[index].send)
+                running[future] = index
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            succeeded, error = _collect(done, running, error)
+            for index in succeeded:
+                ready.extend(_release(index, dependents, waiting_on))
+
+    if error is not None:
+        raise error
+
+
+async def run_writes_async(writes: Iterable[Write], max_workers: int = DEFAULT_WRITE_WORKERS):
+    """Send writes on the running event loop, keeping the order of writes that share a resource.
+
+    At most ``max_workers`` writes are in flight at once.
+    If any write fails, all writes that have not finished are cancelled.
+    """
+    writes = list(writes)
+    if max_workers <= 1 or len(writes) <= 1:
+        for write in writes:
+            await write.send()
+        return
+
+    semaphore = asyncio.Semaphore(max_workers)
+    tasks: List[asyncio.Future] = []
+
+    async def _send(write: Write, after: List[asyncio.Future]):
+        if after:
+            await asyncio.gather(*after)
+        async with semaphore:
+            await write.send()
+
+    for write, dependencies in zip(writes, _dependencies(writes)):
+        after = [tasks[index] for index in sorted(dependencies)]
+        tasks.append(asyncio.ensure_future(_send(write, after)))
+
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
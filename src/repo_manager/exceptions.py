@@ -1,6 +1,6 @@
 """Exceptions for use in repo-manager."""
 
-__all__ = ("RepoAdminError", "UserConfigError")
+__all__ = ("RepoAdminError", "UserConfigError", "RateLimitError", "IdempotencyError")
 
 
 class RepoAdminError(Exception):
@@ -9,3 +9,11 @@ class RepoAdminError(Exception):
 
 class UserConfigError(RepoAdminError):
     """Used for all configuration errors."""
+
+
+class RateLimitError(RepoAdminError):
+    """Used when the GitHub rate limit cannot be waited out."""
+
+
+class IdempotencyError(RepoAdminError):
+    """Used when applying a config a second time sends writes."""
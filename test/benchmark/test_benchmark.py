@@ -0,0 +1,232 @@
+"""End to end benchmarks for each handler against the local fake GitHub API.
+
+Each scenario seeds a repository at scale, applies a config that changes a fraction of it,
+and then applies the same config again to measure the steady state.
+Wall time and API calls are reported per handler and engine.
+
+Tune the run with environment variables:
+
+* ``BENCHMARK_SCALE`` : multiplier for the number of resources (default ``1``)
+* ``BENCHMARK_LATENCY`` : seconds the fake API waits before each response (default ``0``)
+* ``BENCHMARK_CONTENT_INTERVAL`` : seconds between content-creating requests (default ``0``)
+* ``BENCHMARK_WRITE_WORKERS`` : writes each handler sends at once (default ``4``)
+* ``BENCHMARK_REPORT`` : if set, the results are also written to this file as JSON
+
+Run with ``tox -e benchmark`` or ``pytest test/ -m benchmark -s``.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import pytest
+import yaml
+from github.Requester import Requester
+
+from repo_manager._aio import AsyncGitHub
+from repo_manager._groups import apply_config, apply_config_async, parse_config
+from repo_manager._ratelimit import RateLimiter
+from repo_manager._util import RepoContext
+
+from ..fake_github import FakeGitHub, FakeRepo, fake_inputs
+
+pytestmark = [pytest.mark.benchmark]
+
+SCALE = float(os.environ.get("BENCHMARK_SCALE", "1"))
+LATENCY = float(os.environ.get("BENCHMARK_LATENCY", "0"))
+CONTENT_INTERVAL = float(os.environ.get("BENCHMARK_CONTENT_INTERVAL", "0"))
+WRITE_WORKERS = int(os.environ.get("BENCHMARK_WRITE_WORKERS", "4"))
+_RESULTS: List[Dict[str, Any]] = []
+# Every Nth existing resource is removed from, changed in, or renamed in the config.
+_REMOVE_EVERY = 50
+_CHANGE_EVERY = 20
+_RENAME_EVERY = 100
+_PROTECTION = dict(
+    required_status_checks=dict(strict=True, contexts=["build"]),
+    enforce_admins=True,
+    required_pull_request_reviews=dict(required_approving_review_count=1),
+    restrictions=None,
+)
+
+
+def _count(base: int) -> int:
+    return max(1, int(base * SCALE))
+
+
+def _labels(fake: FakeGitHub, repo: FakeRepo) -> Any:
+    count = _count(2000)
+    config = []
+    for index in range(count):
+        repo.add_label(f"label-{index}", "ededed", f"Label {index}")
+        if index % _REMOVE_EVERY == 0:
+            continue  # deleted
+        if index % _CHANGE_EVERY == 1:
+            config.append(dict(name=f"label-{index}", color="000000", description=f"Label {index}"))
+        elif index % _RENAME_EVERY == 2:
+            config.append(dict(name=f"renamed-{index}", oldname=f"label-{index}", color="ededed"))
+        else:
+            config.append(dict(name=f"label-{index}", color="ededed", description=f"Label {index}"))
+    config.extend(dict(name=f"new-{index}", color="336699") for index in range(count // 50))
+    return config
+
+
+def _collaborators(fake: FakeGitHub, repo: FakeRepo) -> Any:
+    count = _count(500)
+    config = []
+    for index in range(count):
+        repo.add_collaborator(f"user-{index}", "pull")
+        if index % _REMOVE_EVERY == 0:
+            continue  # removed
+        permission = "push" if index % _CHANGE_EVERY == 1 else "pull"
+        config.append(dict(username=f"user-{index}", permission=permission))
+    config.extend(
+        dict(username=f"new-user-{index}", permission="pull") for index in range(count // 50)
+    )
+    for index in range(count // 50):
+        fake.add_invitation(repo, f"invited-{index}")
+    return config
+
+
+def _milestones(fake: FakeGitHub, repo: FakeRepo) -> Any:
+    count = _count(200)
+    config = []
+    for index in range(count):
+        fake.add_milestone(
+            repo, f"m-{index}", description=f"Milestone {index}", due_on="2030-01-01T00:00:00Z"
+        )
+        state = "closed" if index % _CHANGE_EVERY == 1 else "open"
+        config.append(
+            dict(
+                title=f"m-{index}",
+                state=state,
+                description=f"Milestone {index}",
+                due_on="2030-01-01T00:00:00",
+            )
+        )
+    return config
+
+
+def _teams(fake: FakeGitHub, repo: FakeRepo) -> Any:
+    count = _count(100)
+    config = []
+    for index in range(count):
+        fake.add_team(repo.owner, f"team-{index}")
+        if index % 2:
+            repo.teams[f"team-{index}"] = "pull"
+        config.append(dict(name=f"team-{index}", permission="push" if index % 4 == 1 else "pull"))
+    return config
+
+
+def _branches(fake: FakeGitHub, repo: FakeRepo) -> Any:
+    count = _count(200)
+    config = []
+    for index in range(count):
+        repo.add_branch(f"branch-{index}", dict(_PROTECTION, enforce_admins=bool(index % 2)))
+        config.append(dict(name=f"branch-{index}", protection=_PROTECTION))
+    return config
+
+
+def _repository(fake: FakeGitHub, repo: FakeRepo) -> Any:
+    return dict(description="Benchmark repository", has_wiki=False, allow_rebase_merge=False)
+
+
+_SCENARIOS: Dict[str, Callable[[FakeGitHub, FakeRepo], Any]] = dict(
+    labels=_labels,
+    collaborators=_collaborators,
+    milestones=_milestones,
+    teams=_teams,
+    branches=_branches,
+    repository=_repository,
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def report():
+    yield
+    Requester.resetConnectionClasses()
+
+    header = f"{'group':<14}{'engine':<9}{'run':<8}{'seconds':>9}{'calls':>8}{'writes':>8}"
+    lines = [
+        "",
+        f"Benchmark results (scale {SCALE}, latency {LATENCY}s)",
+        header,
+        "-" * len(header),
+    ]
+    for result in _RESULTS:
+        lines.append(
+            f"{result['group']:<14}{result['engine']:<9}{result['run']:<8}"
+            f"{result['seconds']:>9.2f}{result['calls']:>8}{result['writes']:>8}"
+        )
+    print("\n".join(lines))
+
+    report_path = os.environ.get("BENCHMARK_REPORT")
+    if report_path:
+        with open(report_path, "w") as raw:
+            json.dump(
+                dict(
+                    scale=SCALE,
+                    latency=LATENCY,
+                    content_interval=CONTENT_INTERVAL,
+                    write_workers=WRITE_WORKERS,
+                    results=_RESULTS,
+                ),
+                raw,
+                indent=2,
+            )
+
+
+def _apply(fake: FakeGitHub, config_file: str, engine: str) -> Tuple[float, Counter]:
+    inputs = fake_inputs(
+        fake,
+        config_file,
+        write_workers=WRITE_WORKERS,
+        rate_limiter=RateLimiter(content_interval=CONTENT_INTERVAL),
+    )
+    context = RepoContext(owner="org", repo="repo")
+    fake.reset_calls()
+
+    start = time.perf_counter()
+    if engine == "asyncio":
+        inputs.aiogithub = AsyncGitHub(
+            "fake-token", api_url=fake.url, rate_limiter=inputs.transport.rate_limiter
+        )
+
+        async def _run():
+            async with inputs.aiogithub:
+                await apply_config_async(parse_config(inputs, context))
+
+        asyncio.run(_run())
+    else:
+        apply_config(parse_config(inputs, context))
+
+    return time.perf_counter() - start, Counter(fake.calls)
+
+
+@pytest.mark.parametrize("engine", ("threads", "asyncio"))
+@pytest.mark.parametrize("group", list(_SCENARIOS))
+def test_benchmark(group, engine, tmpdir):
+    with FakeGitHub(latency=LATENCY) as fake:
+        fake.add_org("org")
+        repo = fake.add_repo("org", "repo")
+        config = {group: _SCENARIOS[group](fake, repo)}
+        config_file = tmpdir.join("settings.yml")
+        config_file.write(yaml.safe_dump(config))
+
+        for run in ("apply", "repeat"):
+            seconds, calls = _apply(fake, str(config_file), engine)
+            writes = sum(count for route, count in calls.items() if not route.startswith("GET "))
+            _RESULTS.append(
+                dict(
+                    group=group,
+                    engine=engine,
+                    run=run,
+                    seconds=seconds,
+                    calls=sum(calls.values()),
+                    writes=writes,
+                    routes=dict(calls),
+                )
+            )
+
+        assert calls["<unknown>"] == 0
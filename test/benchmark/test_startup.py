@@ -0,0 +1,71 @@
+"""Startup benchmarks for the command line entry point.
+
+Each command is run in a fresh interpreter several times and the fastest run is reported,
+next to the time it takes to load the API clients for comparison.
+Commands that never contact GitHub must stay within a startup budget.
+
+Tune the run with environment variables:
+
+* ``BENCHMARK_STARTUP_RUNS`` : runs per command (default ``5``)
+* ``BENCHMARK_STARTUP_BUDGET`` : most seconds a trivial command may take (default ``0.2``)
+
+Run with ``tox -e benchmark`` or ``pytest test/ -m benchmark -s``.
+"""
+import os
+import subprocess  # nosec
+import sys
+import time
+
+import pytest
+
+pytestmark = [pytest.mark.benchmark]
+
+RUNS = int(os.environ.get("BENCHMARK_STARTUP_RUNS", "5"))
+BUDGET = float(os.environ.get("BENCHMARK_STARTUP_BUDGET", "0.2"))
+_RESULTS = {}
+_COMMANDS = dict(
+    interpreter="pass",
+    import_package="import repo_manager",
+    version="import repo_manager; repo_manager.cli(['--version'])",
+    validate="import repo_manager; repo_manager.cli(['--validate'])",
+    import_clients="import repo_manager._util",
+)
+_TRIVIAL = ("import_package", "version", "validate")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def report():
+    yield
+
+    lines = ["", f"Startup results (fastest of {RUNS} runs)", f"{'command':<16}{'seconds':>9}"]
+    lines.extend(f"{name:<16}{seconds:>9.3f}" for name, seconds in _RESULTS.items())
+    print("\n".join(lines))
+
+
+def _fastest(code: str, env) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(  # nosec
+            [sys.executable, "-c", code],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@pytest.mark.parametrize("name", list(_COMMANDS))
+def test_startup(name, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("labels: []\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    env["INPUT_CONFIG-FILE"] = str(config_file)
+
+    seconds = _fastest(_COMMANDS[name], env)
+    _RESULTS[name] = seconds
+
+    if name in _TRIVIAL:
+        assert seconds < BUDGET
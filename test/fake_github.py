@@ -0,0 +1,1131 @@
+"""Stateful local stand-in for the GitHub REST API endpoints that ``repo_manager`` uses.
+
+The GraphQL endpoint is also served, for the queries that ``repo_manager._graphql`` builds.
+
+The fake keeps repositories, labels, milestones, collaborators, invitations, teams,
+and branch protection in memory and serves them over HTTP on a local port,
+so handlers can be exercised end to end without a token or network access.
+
+Latency, the primary rate limit, and the secondary (content-creation) rate limit are configurable,
+and every request is counted by route so that tests and benchmarks can assert on API usage.
+"""
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from agithub.GitHub import GitHub
+
+from repo_manager._etag_cache import ETagCache
+from repo_manager._ratelimit import RateLimiter
+from repo_manager._state import StateStore
+from repo_manager._team_directory import TeamDirectory
+from repo_manager._transport import Transport
+from repo_manager._util import Inputs, github_client
+
+__all__ = ("FakeGitHub", "FakeRepo", "fake_inputs")
+
+_DEFAULT_PER_PAGE = 30
+_MAX_PER_PAGE = 100
+# Permission names accepted by the collaborators API, from least to most access.
+_PERMISSIONS = ("pull", "triage", "push", "maintain", "admin")
+# Invitations and collaborator roles use different permission names than the collaborators API accepts.
+_INVITATION_PERMISSIONS = dict(
+    pull="read", triage="triage", push="write", maintain="maintain", admin="admin"
+)
+# The GraphQL API names collaborator permissions differently again.
+_GRAPHQL_PERMISSIONS = dict(
+    pull="READ", triage="TRIAGE", push="WRITE", maintain="MAINTAIN", admin="ADMIN"
+)
+_GRAPHQL_CONNECTION = re.compile(r"(\w+)\(first: (\d+), after: \$(\w+)")
+_GRAPHQL_REF = re.compile(r"(\w+): ref\(qualifiedName: \$(\w+)\)")
+
+
+class _ApiError(Exception):
+    """Abort a request with an error response."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def _normalize_due_on(raw: Optional[str]) -> Optional[str]:
+    """Store due dates the way GitHub reports them: UTC, to the second."""
+    if raw is None:
+        return None
+
+    value = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _permissions(permission: str) -> Dict[str, bool]:
+    """Build the ``permissions`` object for a collaborator with ``permission`` access."""
+    level = _PERMISSIONS.index(permission)
+    return {name: index <= level for index, name in enumerate(_PERMISSIONS)}
+
+
+@dataclass
+class FakeRepo:
+    """In-memory state of one repository."""
+
+    owner: str
+    name: str
+    settings: Dict[str, Any] = field(default_factory=dict)
+    labels: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    milestones: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    collaborators: Dict[str, str] = field(default_factory=dict)
+    invitations: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    teams: Dict[str, str] = field(default_factory=dict)
+    branches: Dict[str, Optional[Dict[str, Any]]] = field(default_factory=dict)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+    def add_label(self, name: str, color: str, description: Optional[str] = None):
+        """Add a label. Label names are unique regardless of case."""
+        self.labels[name.lower()] = dict(name=name, color=color, description=description)
+
+    def label_names(self) -> List[str]:
+        """List the current label names."""
+        return sorted(label["name"] for label in self.labels.values())
+
+    def add_collaborator(self, login: str, permission: str = "push"):
+        """Give a user direct access."""
+        self.collaborators[login] = permission
+
+    def add_branch(self, name: str, protection: Optional[Dict[str, Any]] = None):
+        """Add a branch, optionally protected with the settings in ``protection``."""
+        self.branches[name] = protection
+
+
+class FakeGitHub:
+    """Stateful fake GitHub REST API.
+
+    Use as a context manager to start and stop the server.
+
+    :param latency: seconds to wait before answering each request
+    :param rate_limit: primary rate limit budget per ``rate_limit_window``, or ``None`` for no limit
+    :param secondary_limit: content-creating requests allowed per ``secondary_window``,
+        or ``None`` for no limit
+    :param invite_collaborators: if true, adding a collaborator sends an invitation
+        instead of granting access immediately, as for users outside an organization
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit: Optional[int] = None,
+        rate_limit_window: float = 3600.0,
+        secondary_limit: Optional[int] = None,
+        secondary_window: float = 60.0,
+        invite_collaborators: bool = False,
+    ):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.secondary_limit = secondary_limit
+        self.secondary_window = secondary_window
+        self.invite_collaborators = invite_collaborators
+        self.repos: Dict[str, FakeRepo] = {}
+        self.orgs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self.not_modified = 0
+        self.rate_limited = 0
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._remaining = rate_limit
+        self._reset = time.time() + rate_limit_window
+        self._content_times: List[float] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # Setup
+
+    def add_org(self, org: str):
+        """Add an organization with no teams."""
+        self.orgs.setdefault(org, {})
+
+    def add_team(self, org: str, slug: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """Add a team to an organization."""
+        self.add_org(org)
+        team = dict(id=next(self._ids), slug=slug, name=name or slug, org=org)
+        self.orgs[org][slug] = team
+        return team
+
+    def add_repo(self, owner: str, name: str, **settings) -> FakeRepo:
+        """Add a repository. The owner is always an admin collaborator."""
+        defaults = dict(
+            description=None,
+            homepage=None,
+            private=False,
+            has_issues=True,
+            has_projects=True,
+            has_wiki=True,
+            has_downloads=True,
+            default_branch="master",
+            allow_squash_merge=True,
+            allow_merge_commit=True,
+            allow_rebase_merge=True,
+            topics=[],
+        )
+        defaults.update(settings)
+        repo = FakeRepo(owner=owner, name=name, settings=defaults)
+        repo.add_collaborator(owner, "admin")
+        repo.add_branch(defaults["default_branch"])
+        self.repos[repo.full_name] = repo
+        return repo
+
+    def add_milestone(
+        self,
+        repo: FakeRepo,
+        title: str,
+        state: str = "open",
+        description: Optional[str] = None,
+        due_on: Optional[str] = None,
+    ) -> int:
+        """Add a milestone to a repository and return its number."""
+        number = next(self._ids)
+        repo.milestones[number] = dict(
+            number=number,
+            title=title,
+            state=state,
+            description=description,
+            due_on=_normalize_due_on(due_on),
+        )
+        return number
+
+    def add_invitation(self, repo: FakeRepo, login: str, permission: str = "push") -> int:
+        """Invite a user to a repository and return the invitation ID."""
+        invitation_id = next(self._ids)
+        repo.invitations[invitation_id] = dict(id=invitation_id, login=login, permission=permission)
+        return invitation_id
+
+    # Inspection
+
+    @property
+    def total_calls(self) -> int:
+        """Number of requests answered, including ``304 Not Modified`` and rate limited responses."""
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        """Clear the request counters."""
+        with self._lock:
+            self.calls.clear()
+            self.not_modified = 0
+            self.rate_limited = 0
+
+    # Server
+
+    @property
+    def url(self) -> str:
+        """Base URL of the running server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving on a free local port."""
+        fake = self
+
+        class _Handler(_RequestHandler):
+            github = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "FakeGitHub":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # Request handling
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        if self.rate_limit is None:
+            return {}
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self._remaining),
+            "X-RateLimit-Reset": str(int(self._reset)),
+        }
+
+    def _check_rate_limits(self, method: str, path: str):
+        now = time.time()
+        if self.rate_limit is not None:
+            if now >= self._reset:
+                self._remaining = self.rate_limit
+                self._reset = now + self.rate_limit_window
+            if self._remaining <= 0:
+                self.rate_limited += 1
+                raise _ApiError(403, "API rate limit exceeded", self._rate_limit_headers())
+
+        content_creating = (method == "POST" and path != "/graphql") or (
+            method == "PUT" and re.search(r"/collaborators/[^/]+$", path) is not None
+        )
+        if self.secondary_limit is not None and content_creating:
+            self._content_times = [
+                sent for sent in self._content_times if sent > now - self.secondary_window
+            ]
+            if len(self._content_times) >= self.secondary_limit:
+                self.rate_limited += 1
+                retry_after = int(self._content_times[0] + self.secondary_window - now) + 1
+                raise _ApiError(
+                    403,
+                    "You have exceeded a secondary rate limit. Please wait a few minutes before you try again.",
+                    {"Retry-After": str(retry_after)},
+                )
+            self._content_times.append(now)
+
+    def handle(
+        self, method: str, raw_path: str, body: Any, headers: Dict[str, str]
+    ) -> Tuple[int, Dict[str, str], Any]:
+        """Answer one request.
+
+        :returns: status, response headers, and JSON-compatible response body
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        split = urlsplit(raw_path)
+        path = split.path.rstrip("/") or "/"
+        query = {key: values[-1] for key, values in parse_qs(split.query).items()}
+
+        for route_method, pattern, template, action in _ROUTES:
+            if route_method != method:
+                continue
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+
+            with self._lock:
+                self.calls[f"{method} {template}"] += 1
+                try:
+                    self._check_rate_limits(method, path)
+                    status, response_headers, data = action(
+                        self, *(unquote(part) for part in match.groups()), query=query, body=body
+                    )
+                except _ApiError as error:
+                    error.headers.update(self._rate_limit_headers())
+                    return error.status, error.headers, dict(message=error.message)
+
+                etag = None
+                if method == "GET" and status == 200:
+                    etag = (
+                        'W/"'
+                        + hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+                        + '"'
+                    )
+                    if headers.get("if-none-match") == etag:
+                        # GitHub does not count revalidated responses against the rate limit.
+                        self.not_modified += 1
+                        return 304, dict(ETag=etag, **self._rate_limit_headers()), None
+
+                if self.rate_limit is not None:
+                    self._remaining -= 1
+                response_headers.update(self._rate_limit_headers())
+                if etag is not None:
+                    response_headers["ETag"] = etag
+                return status, response_headers, data
+
+        with self._lock:
+            self.calls[f"{method} <unknown>"] += 1
+        return 404, {}, dict(message="Not Found")
+
+    # Helpers for routes
+
+    def _api_url(self, *parts: Any) -> str:
+        return "/".join([self.url] + [quote(str(part), safe="") for part in parts])
+
+    def _repo(self, owner: str, name: str) -> FakeRepo:
+        try:
+            return self.repos[f"{owner}/{name}"]
+        except KeyError:
+            raise _ApiError(404, "Not Found")
+
+    def _page(
+        self, items: List[Any], query: Dict[str, str], path: str
+    ) -> Tuple[int, Dict[str, str], Any]:
+        per_page = min(int(query.get("per_page", _DEFAULT_PER_PAGE)), _MAX_PER_PAGE)
+        page = int(query.get("page", 1))
+        start = (page - 1) * per_page
+        headers = {}
+        if start + per_page < len(items):
+            extra = {key: value for key, value in query.items() if key not in ("page", "per_page")}
+            params = "&".join(f"{key}={quote(value)}" for key, value in extra.items())
+            params = f"{params}&" if params else ""
+            last = (len(items) - 1) // per_page + 1
+            headers["Link"] = (
+                f'<{self.url}{path}?{params}per_page={per_page}&page={page + 1}>; rel="next", '
+                f'<{self.url}{path}?{params}per_page={per_page}&page={last}>; rel="last"'
+            )
+        return 200, headers, items[start : start + per_page]
+
+    def _user(self, login: str) -> Dict[str, Any]:
+        return dict(
+            login=login,
+            id=abs(hash(login)) % 10 ** 8,
+            type="User",
+            url=self._api_url("users", login),
+        )
+
+    def _repo_json(self, repo: FakeRepo) -> Dict[str, Any]:
+        owner_type = "Organization" if repo.owner in self.orgs else "User"
+        data = dict(repo.settings)
+        data.update(
+            id=abs(hash(repo.full_name)) % 10 ** 8,
+            name=repo.name,
+            full_name=repo.full_name,
+            owner=dict(self._user(repo.owner), type=owner_type),
+            url=self._api_url("repos", repo.owner, repo.name),
+            archived=False,
+        )
+        return data
+
+    def _label_json(self, repo: FakeRepo, label: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(
+            label, url=self._api_url("repos", repo.owner, repo.name, "labels", label["name"])
+        )
+
+    def _milestone_json(self, repo: FakeRepo, milestone: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(
+            milestone,
+            url=self._api_url("repos", repo.owner, repo.name, "milestones", milestone["number"]),
+        )
+
+    def _team_json(self, team: Dict[str, Any], permission: Optional[str] = None) -> Dict[str, Any]:
+        data = dict(
+            id=team["id"],
+            slug=team["slug"],
+            name=team["name"],
+            url=self._api_url("teams", team["id"]),
+        )
+        if permission is not None:
+            data["permission"] = permission
+        return data
+
+    def _find_team(self, team_id: str) -> Dict[str, Any]:
+        for teams in self.orgs.values():
+            for team in teams.values():
+                if str(team["id"]) == team_id:
+                    return team
+        raise _ApiError(404, "Not Found")
+
+    def _actors_json(self, actors: Dict[str, Any]) -> Dict[str, Any]:
+        """Represent stored user, team, and app names as the API's user, team, and app objects."""
+        data: Dict[str, Any] = {}
+        for kind, names in actors.items():
+            if kind == "users":
+                data[kind] = [self._user(login) for login in names]
+            elif kind == "teams":
+                data[kind] = [dict(slug=slug, name=slug) for slug in names]
+            elif kind == "apps":
+                data[kind] = [dict(slug=slug, name=slug) for slug in names]
+            else:
+                data[kind] = names
+        return data
+
+    def _protection_json(
+        self, repo: FakeRepo, branch: str, protection: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Represent stored protection settings the way the API reports them."""
+        url = self._api_url("repos", repo.owner, repo.name, "branches", branch, "protection")
+        data: Dict[str, Any] = dict(url=url)
+        for section, value in protection.items():
+            if value is None:
+                continue
+            if section == "enforce_admins":
+                data[section] = dict(url=f"{url}/{section}", enabled=bool(value))
+            elif section == "required_status_checks":
+                data[section] = dict(
+                    value,
+                    checks=[dict(context=context, app_id=None) for context in value["contexts"]],
+                    url=f"{url}/{section}",
+                )
+            elif section == "required_pull_request_reviews":
+                reviews = {
+                    key: item for key, item in value.items() if key != "dismissal_restrictions"
+                }
+                # GitHub leaves dismissal restrictions out when they are off.
+                if any(value.get("dismissal_restrictions", {}).values()):
+                    reviews["dismissal_restrictions"] = self._actors_json(
+                        value["dismissal_restrictions"]
+                    )
+                data[section] = dict(reviews, url=f"{url}/{section}")
+            elif section == "restrictions":
+                data[section] = dict(self._actors_json(value), url=f"{url}/{section}")
+            elif isinstance(value, bool):
+                data[section] = dict(enabled=value)
+            else:
+                data[section] = value
+        return data
+
+    # Routes
+
+    def get_repo(self, owner, name, query, body):
+        return 200, {}, self._repo_json(self._repo(owner, name))
+
+    def edit_repo(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        new_name = body.pop("name", name)
+        # Topics can only be set through their own endpoint.
+        body.pop("topics", None)
+        repo.settings.update(body)
+        if new_name != name:
+            del self.repos[repo.full_name]
+            repo.name = new_name
+            self.repos[repo.full_name] = repo
+        return 200, {}, self._repo_json(repo)
+
+    def replace_topics(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        names = (body or {}).get("names")
+        if not isinstance(names, list):
+            raise _ApiError(422, "Validation Failed")
+        repo.settings["topics"] = [topic.lower() for topic in names]
+        return 200, {}, dict(names=repo.settings["topics"])
+
+    def get_org(self, org, query, body):
+        if org not in self.orgs:
+            raise _ApiError(404, "Not Found")
+        return 200, {}, dict(login=org, id=abs(hash(org)) % 10 ** 8, url=self._api_url("orgs", org))
+
+    def list_org_teams(self, org, query, body):
+        if org not in self.orgs:
+            raise _ApiError(404, "Not Found")
+        teams = [self._team_json(team) for team in self.orgs[org].values()]
+        return self._page(teams, query, f"/orgs/{org}/teams")
+
+    def get_org_team(self, org, slug, query, body):
+        team = self.orgs.get(org, {}).get(slug)
+        if team is None:
+            raise _ApiError(404, "Not Found")
+        return 200, {}, self._team_json(team)
+
+    def list_labels(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        labels = [self._label_json(repo, label) for label in repo.labels.values()]
+        return self._page(labels, query, f"/repos/{owner}/{name}/labels")
+
+    def create_label(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        if body["name"].lower() in repo.labels:
+            raise _ApiError(422, "Validation Failed")
+        repo.add_label(body["name"], body["color"], body.get("description"))
+        return 201, {}, self._label_json(repo, repo.labels[body["name"].lower()])
+
+    def get_label(self, owner, name, label_name, query, body):
+        repo = self._repo(owner, name)
+        try:
+            return 200, {}, self._label_json(repo, repo.labels[label_name.lower()])
+        except KeyError:
+            raise _ApiError(404, "Not Found")
+
+    def edit_label(self, owner, name, label_name, query, body):
+        repo = self._repo(owner, name)
+        try:
+            label = repo.labels.pop(label_name.lower())
+        except KeyError:
+            raise _ApiError(404, "Not Found")
+
+        new_name = body.get("new_name", body.get("name", label["name"]))
+        if new_name.lower() in repo.labels:
+            repo.labels[label_name.lower()] = label
+            raise _ApiError(422, "Validation Failed")
+
+        label.update(name=new_name)
+        for key in ("color", "description"):
+            if key in body:
+                label[key] = body[key]
+        repo.labels[new_name.lower()] = label
+        return 200, {}, self._label_json(repo, label)
+
+    def delete_label(self, owner, name, label_name, query, body):
+        repo = self._repo(owner, name)
+        if repo.labels.pop(label_name.lower(), None) is None:
+            raise _ApiError(404, "Not Found")
+        return 204, {}, None
+
+    def list_milestones(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        state = query.get("state", "open")
+        milestones = [
+            self._milestone_json(repo, milestone)
+            for milestone in repo.milestones.values()
+            if state == "all" or milestone["state"] == state
+        ]
+        return self._page(milestones, query, f"/repos/{owner}/{name}/milestones")
+
+    def create_milestone(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        if any(milestone["title"] == body["title"] for milestone in repo.milestones.values()):
+            raise _ApiError(422, "Validation Failed")
+        number = self.add_milestone(
+            repo,
+            body["title"],
+            state=body.get("state", "open"),
+            description=body.get("description"),
+            due_on=body.get("due_on"),
+        )
+        return 201, {}, self._milestone_json(repo, repo.milestones[number])
+
+    def edit_milestone(self, owner, name, number, query, body):
+        repo = self._repo(owner, name)
+        try:
+            milestone = repo.milestones[int(number)]
+        except KeyError:
+            raise _ApiError(404, "Not Found")
+        for key in ("title", "state", "description"):
+            if key in body:
+                milestone[key] = body[key]
+        if "due_on" in body:
+            milestone["due_on"] = _normalize_due_on(body["due_on"])
+        return 200, {}, self._milestone_json(repo, milestone)
+
+    def delete_milestone(self, owner, name, number, query, body):
+        repo = self._repo(owner, name)
+        if repo.milestones.pop(int(number), None) is None:
+            raise _ApiError(404, "Not Found")
+        return 204, {}, None
+
+    def list_collaborators(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        users = [
+            dict(
+                self._user(login),
+                permissions=_permissions(permission),
+                role_name=_INVITATION_PERMISSIONS[permission],
+            )
+            for login, permission in repo.collaborators.items()
+        ]
+        return self._page(users, query, f"/repos/{owner}/{name}/collaborators")
+
+    def add_collaborator(self, owner, name, login, query, body):
+        repo = self._repo(owner, name)
+        permission = (body or {}).get("permission", "push")
+        if permission not in _PERMISSIONS:
+            raise _ApiError(422, "Validation Failed")
+
+        if self.invite_collaborators and login not in repo.collaborators:
+            for invitation in repo.invitations.values():
+                if invitation["login"] == login:
+                    invitation["permission"] = permission
+                    return 204, {}, None
+            invitation_id = self.add_invitation(repo, login, permission)
+            return 201, {}, self._invitation_json(repo, repo.invitations[invitation_id])
+
+        repo.add_collaborator(login, permission)
+        return 204, {}, None
+
+    def remove_collaborator(self, owner, name, login, query, body):
+        repo = self._repo(owner, name)
+        repo.collaborators.pop(login, None)
+        return 204, {}, None
+
+    def _invitation_json(self, repo: FakeRepo, invitation: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(
+            id=invitation["id"],
+            invitee=self._user(invitation["login"]),
+            permissions=_INVITATION_PERMISSIONS[invitation["permission"]],
+            repository=self._repo_json(repo),
+            url=self._api_url("repos", repo.owner, repo.name, "invitations", invitation["id"]),
+        )
+
+    def list_invitations(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        invitations = [
+            self._invitation_json(repo, invitation) for invitation in repo.invitations.values()
+        ]
+        return self._page(invitations, query, f"/repos/{owner}/{name}/invitations")
+
+    def update_invitation(self, owner, name, invitation_id, query, body):
+        repo = self._repo(owner, name)
+        invitation = repo.invitations.get(int(invitation_id))
+        if invitation is None:
+            raise _ApiError(404, "Not Found")
+        permissions = {value: key for key, value in _INVITATION_PERMISSIONS.items()}
+        permission = permissions.get((body or {}).get("permissions"))
+        if permission is None:
+            raise _ApiError(422, "Validation Failed")
+        invitation["permission"] = permission
+        return 200, {}, self._invitation_json(repo, invitation)
+
+    def delete_invitation(self, owner, name, invitation_id, query, body):
+        repo = self._repo(owner, name)
+        if repo.invitations.pop(int(invitation_id), None) is None:
+            raise _ApiError(404, "Not Found")
+        return 204, {}, None
+
+    def list_repo_teams(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        teams = [
+            self._team_json(self.orgs[repo.owner][slug], permission)
+            for slug, permission in repo.teams.items()
+        ]
+        return self._page(teams, query, f"/repos/{owner}/{name}/teams")
+
+    def set_team_repo(self, team_id, owner, name, query, body):
+        team = self._find_team(team_id)
+        repo = self._repo(owner, name)
+        repo.teams[team["slug"]] = (body or {}).get("permission", "push")
+        return 204, {}, None
+
+    def remove_team_repo(self, team_id, owner, name, query, body):
+        team = self._find_team(team_id)
+        repo = self._repo(owner, name)
+        repo.teams.pop(team["slug"], None)
+        return 204, {}, None
+
+    def _branch(self, repo: FakeRepo, branch: str):
+        if branch not in repo.branches:
+            raise _ApiError(404, "Branch not found")
+
+    def list_branches(self, owner, name, query, body):
+        repo = self._repo(owner, name)
+        branches = [
+            dict(
+                name=branch,
+                commit=dict(sha="0" * 40, url=self._api_url("repos", owner, name, "commits", "0")),
+                protected=protection is not None,
+                protection_url=self._api_url(
+                    "repos", owner, name, "branches", branch, "protection"
+                ),
+            )
+            for branch, protection in repo.branches.items()
+        ]
+        return self._page(branches, query, f"/repos/{owner}/{name}/branches")
+
+    def get_protection(self, owner, name, branch, query, body):
+        repo = self._repo(owner, name)
+        self._branch(repo, branch)
+        protection = repo.branches[branch]
+        if protection is None:
+            raise _ApiError(404, "Branch not protected")
+        return 200, {}, self._protection_json(repo, branch, protection)
+
+    def set_protection(self, owner, name, branch, query, body):
+        repo = self._repo(owner, name)
+        self._branch(repo, branch)
+        missing = [
+            section
+            for section in (
+                "required_status_checks",
+                "enforce_admins",
+                "required_pull_request_reviews",
+                "restrictions",
+            )
+            if section not in body
+        ]
+        if missing:
+            raise _ApiError(
+                422, f"Invalid request. Missing required sections: {', '.join(missing)}"
+            )
+        repo.branches[branch] = dict(body)
+        return 200, {}, self._protection_json(repo, branch, repo.branches[branch])
+
+    def delete_protection(self, owner, name, branch, query, body):
+        repo = self._repo(owner, name)
+        self._branch(repo, branch)
+        if repo.branches[branch] is None:
+            raise _ApiError(404, "Branch not protected")
+        repo.branches[branch] = None
+        return 204, {}, None
+
+    def _protected(
+        self, owner: str, name: str, branch: str, section: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Find the protection of a branch, which must have ``section`` enabled if it is set."""
+        repo = self._repo(owner, name)
+        self._branch(repo, branch)
+        protection = repo.branches[branch]
+        if protection is None:
+            raise _ApiError(404, "Branch not protected")
+        if section is not None and protection.get(section) is None:
+            raise _ApiError(404, f"{section} not enabled")
+        return protection
+
+    def update_status_checks(self, owner, name, branch, query, body):
+        protection = self._protected(owner, name, branch, "required_status_checks")
+        protection["required_status_checks"].update(body or {})
+        return 200, {}, None
+
+    def delete_status_checks(self, owner, name, branch, query, body):
+        self._protected(owner, name, branch, "required_status_checks")[
+            "required_status_checks"
+        ] = None
+        return 204, {}, None
+
+    def enable_enforce_admins(self, owner, name, branch, query, body):
+        self._protected(owner, name, branch)["enforce_admins"] = True
+        return 200, {}, dict(enabled=True)
+
+    def disable_enforce_admins(self, owner, name, branch, query, body):
+        self._protected(owner, name, branch)["enforce_admins"] = False
+        return 204, {}, None
+
+    def update_reviews(self, owner, name, branch, query, body):
+        protection = self._protected(owner, name, branch, "required_pull_request_reviews")
+        protection["required_pull_request_reviews"].update(body or {})
+        return 200, {}, None
+
+    def delete_reviews(self, owner, name, branch, query, body):
+        self._protected(owner, name, branch, "required_pull_request_reviews")[
+            "required_pull_request_reviews"
+        ] = None
+        return 204, {}, None
+
+    def set_restrictions(self, owner, name, branch, kind, query, body):
+        protection = self._protected(owner, name, branch, "restrictions")
+        protection["restrictions"][kind] = list((body or {}).get(kind, []))
+        return 200, {}, self._actors_json(protection["restrictions"]).get(kind, [])
+
+    def delete_restrictions(self, owner, name, branch, query, body):
+        self._protected(owner, name, branch, "restrictions")["restrictions"] = None
+        return 204, {}, None
+
+    def _graphql_items(self, repo: FakeRepo, connection: str) -> List[Dict[str, Any]]:
+        if connection == "labels":
+            return [dict(label) for label in repo.labels.values()]
+        if connection == "milestones":
+            return [
+                dict(
+                    number=milestone["number"],
+                    title=milestone["title"],
+                    state=milestone["state"].upper(),
+                    description=milestone["description"],
+                    dueOn=milestone["due_on"],
+                )
+                for milestone in repo.milestones.values()
+            ]
+        if connection == "collaborators":
+            return [
+                dict(permission=_GRAPHQL_PERMISSIONS[permission], node=dict(login=login))
+                for login, permission in repo.collaborators.items()
+            ]
+        raise _ApiError(400, f"Unsupported connection '{connection}'")
+
+    @staticmethod
+    def _rule_json(branch: str, protection: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Represent stored protection settings as a GraphQL branch protection rule."""
+        if protection is None:
+            return None
+
+        checks = protection.get("required_status_checks")
+        reviews = protection.get("required_pull_request_reviews")
+        return dict(
+            pattern=branch,
+            isAdminEnforced=bool(protection.get("enforce_admins")),
+            requiresApprovingReviews=reviews is not None,
+            requiredApprovingReviewCount=(reviews or {}).get("required_approving_review_count"),
+            dismissesStaleReviews=bool((reviews or {}).get("dismiss_stale_reviews")),
+            requiresCodeOwnerReviews=bool((reviews or {}).get("require_code_owner_reviews")),
+            requiresStatusChecks=checks is not None,
+            requiresStrictStatusChecks=bool((checks or {}).get("strict")),
+            requiredStatusCheckContexts=(checks or {}).get("contexts", []),
+            restrictsPushes=protection.get("restrictions") is not None,
+        )
+
+    def graphql(self, query, body):
+        """Answer a repository query.
+
+        Only the connection and ref fields that ``repo_manager`` queries are recognized.
+        Cursors are page offsets.
+        """
+        variables = body.get("variables") or {}
+        repo = self.repos.get(f"{variables.get('owner')}/{variables.get('name')}")
+        if repo is None:
+            errors = [dict(type="NOT_FOUND", message="Could not resolve to a Repository")]
+            return 200, {}, dict(data=dict(repository=None), errors=errors)
+
+        result: Dict[str, Any] = {}
+        for connection, first, cursor in _GRAPHQL_CONNECTION.findall(body["query"]):
+            items = self._graphql_items(repo, connection)
+            start = int(variables.get(cursor) or 0)
+            end = start + int(first)
+            result[connection] = {
+                "pageInfo": dict(hasNextPage=end < len(items), endCursor=str(end)),
+                "edges" if connection == "collaborators" else "nodes": items[start:end],
+            }
+
+        for alias, variable in _GRAPHQL_REF.findall(body["query"]):
+            branch = variables[variable][len("refs/heads/") :]
+            if branch in repo.branches:
+                result[alias] = dict(
+                    name=branch, branchProtectionRule=self._rule_json(branch, repo.branches[branch])
+                )
+            else:
+                result[alias] = None
+
+        return 200, {}, dict(data=dict(repository=result))
+
+
+_SEGMENT = "([^/]+)"
+_REPO = f"/repos/{_SEGMENT}/{_SEGMENT}"
+_PROTECTION = f"{_REPO}/branches/{_SEGMENT}/protection"
+_ROUTES: List[Tuple[str, Any, str, Callable]] = [
+    (method, re.compile(pattern), template, action)
+    for method, pattern, template, action in (
+        ("GET", _REPO, "/repos/{owner}/{repo}", FakeGitHub.get_repo),
+        ("PATCH", _REPO, "/repos/{owner}/{repo}", FakeGitHub.edit_repo),
+        ("PUT", f"{_REPO}/topics", "/repos/{owner}/{repo}/topics", FakeGitHub.replace_topics),
+        ("GET", f"/orgs/{_SEGMENT}", "/orgs/{org}", FakeGitHub.get_org),
+        ("GET", f"/orgs/{_SEGMENT}/teams", "/orgs/{org}/teams", FakeGitHub.list_org_teams),
+        (
+            "GET",
+            f"/orgs/{_SEGMENT}/teams/{_SEGMENT}",
+            "/orgs/{org}/teams/{team_slug}",
+            FakeGitHub.get_org_team,
+        ),
+        ("GET", f"{_REPO}/labels", "/repos/{owner}/{repo}/labels", FakeGitHub.list_labels),
+        ("POST", f"{_REPO}/labels", "/repos/{owner}/{repo}/labels", FakeGitHub.create_label),
+        (
+            "GET",
+            f"{_REPO}/labels/{_SEGMENT}",
+            "/repos/{owner}/{repo}/labels/{name}",
+            FakeGitHub.get_label,
+        ),
+        (
+            "PATCH",
+            f"{_REPO}/labels/{_SEGMENT}",
+            "/repos/{owner}/{repo}/labels/{name}",
+            FakeGitHub.edit_label,
+        ),
+        (
+            "DELETE",
+            f"{_REPO}/labels/{_SEGMENT}",
+            "/repos/{owner}/{repo}/labels/{name}",
+            FakeGitHub.delete_label,
+        ),
+        (
+            "GET",
+            f"{_REPO}/milestones",
+            "/repos/{owner}/{repo}/milestones",
+            FakeGitHub.list_milestones,
+        ),
+        (
+            "POST",
+            f"{_REPO}/milestones",
+            "/repos/{owner}/{repo}/milestones",
+            FakeGitHub.create_milestone,
+        ),
+        (
+            "PATCH",
+            f"{_REPO}/milestones/{_SEGMENT}",
+            "/repos/{owner}/{repo}/milestones/{number}",
+            FakeGitHub.edit_milestone,
+        ),
+        (
+            "DELETE",
+            f"{_REPO}/milestones/{_SEGMENT}",
+            "/repos/{owner}/{repo}/milestones/{number}",
+            FakeGitHub.delete_milestone,
+        ),
+        (
+            "GET",
+            f"{_REPO}/collaborators",
+            "/repos/{owner}/{repo}/collaborators",
+            FakeGitHub.list_collaborators,
+        ),
+        (
+            "PUT",
+            f"{_REPO}/collaborators/{_SEGMENT}",
+            "/repos/{owner}/{repo}/collaborators/{username}",
+            FakeGitHub.add_collaborator,
+        ),
+        (
+            "DELETE",
+            f"{_REPO}/collaborators/{_SEGMENT}",
+            "/repos/{owner}/{repo}/collaborators/{username}",
+            FakeGitHub.remove_collaborator,
+        ),
+        (
+            "GET",
+            f"{_REPO}/invitations",
+            "/repos/{owner}/{repo}/invitations",
+            FakeGitHub.list_invitations,
+        ),
+        (
+            "PATCH",
+            f"{_REPO}/invitations/{_SEGMENT}",
+            "/repos/{owner}/{repo}/invitations/{invitation_id}",
+            FakeGitHub.update_invitation,
+        ),
+        (
+            "DELETE",
+            f"{_REPO}/invitations/{_SEGMENT}",
+            "/repos/{owner}/{repo}/invitations/{invitation_id}",
+            FakeGitHub.delete_invitation,
+        ),
+        ("GET", f"{_REPO}/teams", "/repos/{owner}/{repo}/teams", FakeGitHub.list_repo_teams),
+        (
+            "PUT",
+            f"/teams/{_SEGMENT}{_REPO}",
+            "/teams/{team_id}/repos/{owner}/{repo}",
+            FakeGitHub.set_team_repo,
+        ),
+        (
+            "DELETE",
+            f"/teams/{_SEGMENT}{_REPO}",
+            "/teams/{team_id}/repos/{owner}/{repo}",
+            FakeGitHub.remove_team_repo,
+        ),
+        ("GET", f"{_REPO}/branches", "/repos/{owner}/{repo}/branches", FakeGitHub.list_branches),
+        (
+            "GET",
+            f"{_REPO}/branches/{_SEGMENT}/protection",
+            "/repos/{owner}/{repo}/branches/{branch}/protection",
+            FakeGitHub.get_protection,
+        ),
+        (
+            "PUT",
+            f"{_REPO}/branches/{_SEGMENT}/protection",
+            "/repos/{owner}/{repo}/branches/{branch}/protection",
+            FakeGitHub.set_protection,
+        ),
+        (
+            "DELETE",
+            f"{_REPO}/branches/{_SEGMENT}/protection",
+            "/repos/{owner}/{repo}/branches/{branch}/protection",
+            FakeGitHub.delete_protection,
+        ),
+        (
+            "PATCH",
+            f"{_PROTECTION}/required_status_checks",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/required_status_checks",
+            FakeGitHub.update_status_checks,
+        ),
+        (
+            "DELETE",
+            f"{_PROTECTION}/required_status_checks",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/required_status_checks",
+            FakeGitHub.delete_status_checks,
+        ),
+        (
+            "POST",
+            f"{_PROTECTION}/enforce_admins",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/enforce_admins",
+            FakeGitHub.enable_enforce_admins,
+        ),
+        (
+            "DELETE",
+            f"{_PROTECTION}/enforce_admins",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/enforce_admins",
+            FakeGitHub.disable_enforce_admins,
+        ),
+        (
+            "PATCH",
+            f"{_PROTECTION}/required_pull_request_reviews",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/required_pull_request_reviews",
+            FakeGitHub.update_reviews,
+        ),
+        (
+            "DELETE",
+            f"{_PROTECTION}/required_pull_request_reviews",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/required_pull_request_reviews",
+            FakeGitHub.delete_reviews,
+        ),
+        (
+            "PUT",
+            f"{_PROTECTION}/restrictions/(users|teams|apps)",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/restrictions/{kind}",
+            FakeGitHub.set_restrictions,
+        ),
+        (
+            "DELETE",
+            f"{_PROTECTION}/restrictions",
+            "/repos/{owner}/{repo}/branches/{branch}/protection/restrictions",
+            FakeGitHub.delete_restrictions,
+        ),
+        ("POST", "/graphql", "/graphql", FakeGitHub.graphql),
+    )
+]
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Translate HTTP requests into :meth:`FakeGitHub.handle` calls."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, so Nagle's algorithm would delay every response.
+    disable_nagle_algorithm = True
+    github: FakeGitHub
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length) if length else b""
+        body = json.loads(raw_body) if raw_body else None
+        headers = {key.lower(): value for key, value in self.headers.items()}
+
+        status, response_headers, data = self.github.handle(self.command, self.path, body, headers)
+
+        payload = b"" if data is None else json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        for key, value in response_headers.items():
+            self.send_header(key, value)
+        if data is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch  # noqa: N815
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep test output quiet."""
+
+
+def fake_inputs(
+    fake: FakeGitHub,
+    config_file: str,
+    max_workers: int = 4,
+    write_workers: int = 4,
+    etag_cache: Optional[ETagCache] = None,
+    state_store: Optional[StateStore] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    graphql_reads: bool = False,
+) -> Inputs:
+    """Build inputs with clients that talk to ``fake`` through a shared transport.
+
+    The transport is installed for PyGithub process-wide,
+    so callers should reset PyGithub's connection classes when they are done.
+    """
+    transport = Transport(etag_cache=etag_cache, rate_limiter=rate_limiter)
+    transport.install_pygithub()
+    host = fake.url.split("://", 1)[1]
+
+    agithub = GitHub(token="fake-token", paginate=True, api_url=host)
+    agithub.client.prop.secure_http = False
+    transport.attach_agithub(agithub)
+
+    return Inputs(
+        agithub=agithub,
+        github=github_client("fake-token", base_url=fake.url),
+        config_file=config_file,
+        debug=False,
+        transport=transport,
+        max_workers=max_workers,
+        write_workers=write_workers,
+        state_store=state_store,
+        graphql_reads=graphql_reads,
+        team_directory=TeamDirectory(),
+    )
@@ -0,0 +1 @@
+"""Stub to allow relative imports between test groups."""
@@ -0,0 +1,558 @@
+"""Functional tests that apply configs end to end against the local fake GitHub API."""
+import asyncio
+import json
+import time
+
+import pytest
+import yaml
+from github.Requester import Requester
+
+import repo_manager
+from repo_manager._aio import AsyncGitHub
+from repo_manager._groups import apply_config, apply_config_async, labels, parse_config
+from repo_manager._ratelimit import RateLimiter
+from repo_manager._state import LocalStateStore
+from repo_manager._tracing import span, start_tracing, stop_tracing
+from repo_manager._transport import Transport
+from repo_manager._util import RepoContext
+from repo_manager._verify import no_writes
+from repo_manager.exceptions import IdempotencyError
+
+from ..fake_github import FakeGitHub, fake_inputs
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+_PROTECTION = dict(
+    required_status_checks=dict(strict=True, contexts=["build"]),
+    enforce_admins=True,
+    required_pull_request_reviews=None,
+    restrictions=None,
+)
+
+
+@pytest.fixture
+def fake():
+    with FakeGitHub() as server:
+        server.add_team("org", "core")
+        server.add_team("org", "docs")
+        repo = server.add_repo("org", "repo")
+        repo.add_label("bug", "cc0000", "Something is broken")
+        repo.add_label("stale", "ffffff")
+        repo.add_label("Help Wanted", "008672")
+        repo.add_collaborator("alice", "pull")
+        repo.add_collaborator("bob", "push")
+        server.add_invitation(repo, "carol")
+        server.add_milestone(repo, "v1", description="First release")
+        server.add_milestone(repo, "v0", state="closed")
+        repo.teams["docs"] = "pull"
+        repo.add_branch("master", dict(_PROTECTION, enforce_admins=False))
+        yield server
+
+    Requester.resetConnectionClasses()
+
+
+_CONFIG = dict(
+    repository=dict(description="Managed by repo-manager", has_wiki=False),
+    labels=[
+        dict(name="bug", color="CC0000", description="Something is broken"),
+        dict(name="first-timers-only", oldname="Help Wanted", color="#008672"),
+        dict(name="feature", color=336699, description="New functionality"),
+    ],
+    collaborators=[
+        dict(username="alice", permission="push"),
+        dict(username="dave", permission="pull"),
+    ],
+    milestones=[
+        dict(title="v1", state="closed", description="First release"),
+        dict(title="v2", state="open"),
+    ],
+    teams=[dict(name="core", permission="admin")],
+    branches=[dict(name="master", protection=_PROTECTION)],
+)
+
+
+def _inputs(fake, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(_CONFIG))
+    return fake_inputs(fake, str(config_file))
+
+
+def _check_applied(fake):
+    repo = fake.repos["org/repo"]
+    assert repo.settings["description"] == "Managed by repo-manager"
+    assert repo.settings["has_wiki"] is False
+    assert repo.label_names() == ["bug", "feature", "first-timers-only"]
+    assert repo.labels["feature"]["color"] == "336699"
+    assert repo.collaborators == dict(org="admin", alice="push", dave="pull")
+    assert repo.invitations == {}
+    assert sorted((m["title"], m["state"]) for m in repo.milestones.values()) == [
+        ("v1", "closed"),
+        ("v2", "open"),
+    ]
+    assert repo.teams == dict(core="admin")
+    assert repo.branches["master"] == _PROTECTION
+
+
+def test_apply_config(fake, tmpdir):
+    inputs = _inputs(fake, tmpdir)
+
+    apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    _check_applied(fake)
+    assert fake.calls["PATCH /repos/{owner}/{repo}"] == 1
+    assert fake.calls["DELETE /repos/{owner}/{repo}/labels/{name}"] == 1
+    assert fake.calls["DELETE /repos/{owner}/{repo}/invitations/{invitation_id}"] == 1
+    assert fake.calls["<unknown>"] == 0
+
+
+def test_apply_config_async(fake, tmpdir):
+    inputs = _inputs(fake, tmpdir)
+    inputs.aiogithub = AsyncGitHub("fake-token", api_url=fake.url)
+
+    async def _run():
+        async with inputs.aiogithub:
+            await apply_config_async(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    asyncio.run(_run())
+
+    _check_applied(fake)
+
+
+def test_pagination(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    for index in range(250):
+        repo.add_label(f"extra-{index}", "ededed")
+    inputs = _inputs(fake, tmpdir)
+
+    labels = list(inputs.github.get_repo("org/repo").get_labels())
+
+    assert len(labels) == 253
+    assert fake.calls["GET /repos/{owner}/{repo}/labels"] == 3
+
+
+def test_rate_limited_requests_are_retried(fake):
+    fake.secondary_limit = 1
+    fake.secondary_window = 0.2
+    sleeps = []
+
+    def _sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(0.2)
+
+    transport = Transport(rate_limiter=RateLimiter(content_interval=0), sleep=_sleep)
+    url = f"{fake.url}/repos/org/repo/labels"
+
+    for name in ("one", "two"):
+        response = transport.request("POST", url, body=json.dumps(dict(name=name, color="000000")))
+        assert response.status == 201
+
+    assert fake.rate_limited == 1
+    assert sleeps == [pytest.approx(1.0, abs=0.1)]
+    assert sorted(fake.repos["org/repo"].labels) == ["bug", "help wanted", "one", "stale", "two"]
+
+
+def test_trace_spans(fake, tmpdir):
+    inputs = _inputs(fake, tmpdir)
+    tracer = start_tracing()
+    try:
+        with span("run", "run"):
+            apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+    finally:
+        stop_tracing()
+
+    groups = {item.span_id: item.name for item in tracer.spans if item.category == "group"}
+    requests = [item for item in tracer.spans if item.category == "http"]
+    assert set(groups.values()) == set(_CONFIG)
+    assert len(requests) == fake.total_calls
+    assert all(groups[item.parent_id] for item in requests)
+    labels = [item for item in requests if groups[item.parent_id] == "labels"]
+    assert {item.attributes["route"] for item in labels} >= {
+        "/repos/{owner}/{repo}/labels",
+        "/repos/{owner}/{repo}/labels/{name}",
+    }
+    assert all(item.attributes["status"] < 400 for item in requests)
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_apply_config_graphql_reads(fake, tmpdir, use_async):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(_CONFIG))
+    inputs = fake_inputs(fake, str(config_file), graphql_reads=True)
+
+    if use_async:
+        inputs.aiogithub = AsyncGitHub("fake-token", api_url=fake.url)
+
+        async def _run():
+            async with inputs.aiogithub:
+                await apply_config_async(
+                    parse_config(inputs, RepoContext(owner="org", repo="repo"))
+                )
+
+        asyncio.run(_run())
+    else:
+        apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    _check_applied(fake)
+    assert fake.calls["POST /graphql"] == 1
+    assert fake.calls["GET /repos/{owner}/{repo}/labels"] == 0
+    assert fake.calls["GET /repos/{owner}/{repo}/milestones"] == 0
+    assert fake.calls["GET /repos/{owner}/{repo}/collaborators"] == 0
+    assert fake.calls["GET /repos/{owner}/{repo}/branches/{branch}"] == 0
+    assert fake.calls["<unknown>"] == 0
+
+
+def test_graphql_reads_paginate(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    for index in range(250):
+        repo.add_label(f"extra-{index}", "ededed")
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(dict(labels=_CONFIG["labels"], teams=_CONFIG["teams"])))
+    inputs = fake_inputs(fake, str(config_file), graphql_reads=True)
+
+    apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    assert repo.label_names() == ["bug", "feature", "first-timers-only"]
+    assert fake.calls["POST /graphql"] == 3
+    assert fake.calls["GET /repos/{owner}/{repo}/labels"] == 0
+
+
+def test_labels_minimal_writes(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    repo.add_label("a", "000000")
+    repo.add_label("b", "111111")
+    repo.add_label("c", "222222")
+    config = dict(
+        labels=[
+            dict(name="BUG", color="#CC0000", description="Something is broken"),
+            dict(name="b", oldname="a", color="000000"),
+            dict(name="c", oldname="b", color="111111"),
+            dict(name="a", oldname="c", color="222222"),
+            dict(name="Help Wanted", color="008672"),
+        ]
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(fake, str(config_file), write_workers=8)
+
+    for _ in range(2):
+        apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    assert repo.label_names() == ["BUG", "Help Wanted", "a", "b", "c"]
+    assert [repo.labels[name]["color"] for name in ("a", "b", "c")] == [
+        "222222",
+        "000000",
+        "111111",
+    ]
+    # The cycle takes one temporary rename and three renames, the case change one edit,
+    # the unconfigured label one delete, and the second run nothing at all.
+    assert fake.calls["PATCH /repos/{owner}/{repo}/labels/{name}"] == 5
+    assert fake.calls["DELETE /repos/{owner}/{repo}/labels/{name}"] == 1
+    assert fake.calls["POST /repos/{owner}/{repo}/labels"] == 0
+
+
+def test_milestones_repeat_without_writes(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    config = dict(
+        milestones=[
+            dict(title="v1", description="First release", due_on="2020-02-02T00:00:00"),
+            dict(title="v2", state="closed", due_on="2020-03-03T00:00:00-08:00"),
+        ]
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(fake, str(config_file))
+
+    apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+    fake.reset_calls()
+    apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    assert sorted((m["title"], m["state"], m["due_on"]) for m in repo.milestones.values()) == [
+        ("v1", "open", "2020-02-02T00:00:00Z"),
+        ("v2", "closed", "2020-03-03T08:00:00Z"),
+    ]
+    assert fake.calls["GET /repos/{owner}/{repo}/milestones"] == 1
+    assert not [route for route in fake.calls if not route.startswith("GET ")]
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_collaborators_keep_pending_invitations(fake, tmpdir, use_async):
+    repo = fake.repos["org/repo"]
+    fake.add_invitation(repo, "erin", "pull")
+    fake.add_invitation(repo, "Frank", "pull")
+    config = dict(
+        collaborators=[
+            dict(username="alice", permission="maintain"),
+            dict(username="bob", permission="push"),
+            dict(username="erin", permission="push"),
+            dict(username="frank", permission="pull"),
+        ]
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(fake, str(config_file))
+    context = RepoContext(owner="org", repo="repo")
+
+    async def _run():
+        async with inputs.aiogithub:
+            for _ in range(2):
+                await apply_config_async(parse_config(inputs, context))
+
+    if use_async:
+        inputs.aiogithub = AsyncGitHub("fake-token", api_url=fake.url)
+        asyncio.run(_run())
+    else:
+        for _ in range(2):
+            apply_config(parse_config(inputs, context))
+
+    assert repo.collaborators == dict(org="admin", alice="maintain", bob="push")
+    assert sorted((item["login"], item["permission"]) for item in repo.invitations.values()) == [
+        ("Frank", "pull"),
+        ("erin", "push"),
+    ]
+    # Alice's permission is changed in place, erin's invitation is updated, carol's is deleted,
+    # and the second run sends nothing.
+    assert fake.calls["PUT /repos/{owner}/{repo}/collaborators/{username}"] == 1
+    assert fake.calls["DELETE /repos/{owner}/{repo}/collaborators/{username}"] == 0
+    assert fake.calls["PATCH /repos/{owner}/{repo}/invitations/{invitation_id}"] == 1
+    assert fake.calls["DELETE /repos/{owner}/{repo}/invitations/{invitation_id}"] == 1
+
+
+def test_teams_resolved_by_slug(fake, tmpdir):
+    fake.add_team("org", "release-managers", name="Release Managers")
+    for index in range(150):
+        fake.add_team("org", f"team-{index}")
+    fake.add_repo("org", "other")
+    config = dict(
+        teams=[
+            dict(name="core", permission="admin"),
+            dict(name="Release Managers", permission="push"),
+        ]
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(fake, str(config_file))
+
+    for repo in ("repo", "other"):
+        apply_config(parse_config(inputs, RepoContext(owner="org", repo=repo)))
+
+    for repo in ("repo", "other"):
+        assert fake.repos[f"org/{repo}"].teams == {"core": "admin", "release-managers": "push"}
+    # "core" is found by slug on the first repository and in the team list after that.
+    # The team list, two pages long, is read once, to find "Release Managers" by name.
+    assert fake.calls["GET /orgs/{org}/teams/{team_slug}"] == 2
+    assert fake.calls["GET /orgs/{org}/teams"] == 2
+
+
+def test_branches_skip_matching_protection(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    repo.add_branch("release")
+    repo.add_branch(
+        "docs", dict(_PROTECTION, restrictions=dict(users=["alice"], teams=[], apps=[]))
+    )
+    protection = dict(
+        _PROTECTION,
+        required_pull_request_reviews=dict(
+            required_approving_review_count=1,
+            dismissal_restrictions=dict(users=["Alice"], teams=["core"]),
+        ),
+    )
+    restricted = dict(_PROTECTION, restrictions=dict(users=["bob"], teams=[], apps=[]))
+    config = dict(
+        branches=[
+            dict(name="master", protection=_PROTECTION),
+            dict(name="release", protection=protection),
+            dict(name="docs", protection=restricted),
+        ]
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(fake, str(config_file))
+
+    for _ in range(2):
+        apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    assert repo.branches == dict(master=_PROTECTION, release=protection, docs=restricted)
+    # Only "release" needs the whole protection.
+    # "master" only needs admins enforced and "docs" only a new user restriction,
+    # and the second run sends nothing.
+    assert fake.calls["PUT /repos/{owner}/{repo}/branches/{branch}/protection"] == 1
+    assert fake.calls["POST /repos/{owner}/{repo}/branches/{branch}/protection/enforce_admins"] == 1
+    assert (
+        fake.calls["PUT /repos/{owner}/{repo}/branches/{branch}/protection/restrictions/{kind}"]
+        == 1
+    )
+    assert fake.calls["GET /repos/{owner}/{repo}/branches/{branch}/protection"] == 6
+
+
+def test_branch_patterns(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    for index in range(240):
+        repo.add_branch(f"release/{index}", _PROTECTION if index % 2 else None)
+    repo.add_branch("release-1")
+    repo.add_branch("feature/x")
+    hotfix = dict(_PROTECTION, enforce_admins=False)
+    config = dict(
+        branches=[
+            dict(name="release/0", protection=hotfix),
+            dict(name="release/*", protection=_PROTECTION),
+            dict(name="/^release-[0-9]+$/", protection=hotfix),
+        ]
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(
+        fake, str(config_file), state_store=LocalStateStore(str(tmpdir.join("state.json")))
+    )
+    context = RepoContext(owner="org", repo="repo")
+
+    apply_config(parse_config(inputs, context))
+
+    assert repo.branches["release/0"] == hotfix
+    assert all(repo.branches[f"release/{index}"] == _PROTECTION for index in range(1, 240))
+    assert repo.branches["release-1"] == hotfix
+    assert repo.branches["feature/x"] is None
+    # Unprotected matches are protected without being read first, and protected ones are read.
+    # Once written, "release/0" and every protected match are read to record the state.
+    assert fake.calls["GET /repos/{owner}/{repo}/branches/{branch}/protection"] == 121 + 241
+    assert fake.calls["PUT /repos/{owner}/{repo}/branches/{branch}/protection"] == 1 + 119 + 1
+
+    fake.reset_calls()
+    repo.add_branch("release/new")
+    apply_config(parse_config(inputs, context))
+
+    # Only the new branch is written.
+    # The handler reuses the snapshot's reads, and the state is read again after the write.
+    assert repo.branches["release/new"] == _PROTECTION
+    assert fake.calls["GET /repos/{owner}/{repo}/branches/{branch}/protection"] == 241 + 242
+    assert fake.calls["GET /repos/{owner}/{repo}/branches"] == 2 * 3
+    assert fake.calls["PUT /repos/{owner}/{repo}/branches/{branch}/protection"] == 1
+
+    # Protection weakened by hand is restored, though the config is unchanged.
+    repo.branches["release/5"] = dict(_PROTECTION, enforce_admins=False)
+    fake.reset_calls()
+    apply_config(parse_config(inputs, context))
+
+    assert repo.branches["release/5"] == _PROTECTION
+    assert fake.calls["POST /repos/{owner}/{repo}/branches/{branch}/protection/enforce_admins"] == 1
+
+
+def test_branch_patterns_graphql_reads(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    repo.add_branch("release/1", dict(_PROTECTION, enforce_admins=False))
+    repo.add_branch("release/2")
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(
+        yaml.safe_dump(dict(branches=[dict(name="release/*", protection=_PROTECTION)]))
+    )
+    inputs = fake_inputs(fake, str(config_file), graphql_reads=True)
+
+    apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    # Pattern matches are not in the GraphQL state, so the protected one is read and corrected.
+    assert repo.branches["release/1"] == _PROTECTION
+    assert repo.branches["release/2"] == _PROTECTION
+    assert fake.calls["GET /repos/{owner}/{repo}/branches/{branch}/protection"] == 1
+    assert fake.calls["POST /repos/{owner}/{repo}/branches/{branch}/protection/enforce_admins"] == 1
+
+
+def test_state_store_shares_reads(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(dict(labels=_CONFIG["labels"])))
+    context = RepoContext(owner="org", repo="repo")
+    state_file = str(tmpdir.join("state.json"))
+    inputs = fake_inputs(fake, str(config_file), state_store=LocalStateStore(state_file))
+    reads = []
+
+    def _run():
+        fake.reset_calls()
+        apply_config(parse_config(inputs, context))
+        reads.append(fake.calls["GET /repos/{owner}/{repo}/labels"])
+
+    # Nothing recorded: the handler reads and writes, then the new state is read to record it.
+    _run()
+    # Unchanged: only the snapshot reads.
+    _run()
+    repo.labels["bug"]["color"] = "000000"
+    # Drifted: the handler reuses the snapshot's read, then the new state is read to record it.
+    _run()
+    assert repo.labels["bug"]["color"].lower() == "cc0000"
+    # Nothing recorded and nothing to write: the handler's read is reused to record the state.
+    inputs.state_store = LocalStateStore(str(tmpdir.join("other.json")))
+    _run()
+    _run()
+
+    assert reads == [2, 1, 2, 1, 1]
+    assert fake.calls["PATCH /repos/{owner}/{repo}/labels/{name}"] == 0
+
+
+def test_repository_minimal_writes(fake, tmpdir):
+    repo = fake.repos["org/repo"]
+    config = dict(
+        repository=dict(
+            description="Managed by repo-manager",
+            homepage="",
+            has_issues=True,
+            default_branch="master",
+            topics="Python, github",
+        )
+    )
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(yaml.safe_dump(config))
+    inputs = fake_inputs(fake, str(config_file))
+
+    for _ in range(2):
+        apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+    repo.settings["topics"] = ["github", "python"]
+    apply_config(parse_config(inputs, RepoContext(owner="org", repo="repo")))
+
+    assert repo.settings["description"] == "Managed by repo-manager"
+    assert repo.settings["topics"] == ["github", "python"]
+    # Only the first run writes, and reordered topics are the same set.
+    assert fake.calls["PATCH /repos/{owner}/{repo}"] == 1
+    assert fake.calls["PUT /repos/{owner}/{repo}/topics"] == 1
+    assert fake.calls["GET /repos/{owner}/{repo}"] == 3
+
+
+def test_verify_idempotent(fake, tmpdir):
+    fake.invite_collaborators = True
+    inputs = _inputs(fake, tmpdir)
+    context = RepoContext(owner="org", repo="repo")
+    apply_config(parse_config(inputs, context))
+    invitations = list(fake.repos["org/repo"].invitations)
+
+    try:
+        # Every group only reads once the config has been applied.
+        with no_writes("'org/repo'"):
+            apply_config(parse_config(inputs, context))
+
+        fake.repos["org/repo"].settings["has_wiki"] = True
+        with pytest.raises(IdempotencyError) as excinfo:
+            with no_writes("'org/repo'"):
+                apply_config(parse_config(inputs, context))
+    finally:
+        stop_tracing()
+
+    # Pending invitations are kept rather than sent again.
+    assert list(fake.repos["org/repo"].invitations) == invitations
+    # Drift is corrected, and the correction is reported.
+    writes = str(excinfo.value).splitlines()[1:]
+    assert [line.split(" (")[0] for line in writes] == ["  - PATCH /repos/org/repo"]
+
+
+def test_verify_idempotent_with_state_store(fake, tmpdir, monkeypatch, mocker):
+    inputs = _inputs(fake, tmpdir)
+    inputs.state_store = LocalStateStore(str(tmpdir.join("state.json")))
+    inputs.verify_idempotent = True
+    monkeypatch.setenv("GITHUB_REPOSITORY", "org/repo")
+    apply_labels = mocker.patch.object(labels, "apply", wraps=labels.apply)
+
+    try:
+        repo_manager._run(inputs)
+    finally:
+        stop_tracing()
+
+    _check_applied(fake)
+    # The verification pass applies the group again instead of skipping it as recorded.
+    assert apply_labels.call_count == 2
+    assert inputs.state_store.load("org/repo")
@@ -0,0 +1,142 @@
+"""Unit test suite for ``repo_manager._groups.branches``."""
+import pytest
+
+from repo_manager._groups.branches import _matches, _normalize, _section_writes
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+_URL = "https://api.github.com/repos/org/repo/branches/main/protection"
+_RESPONSE = dict(
+    url=_URL,
+    required_status_checks=dict(
+        url=f"{_URL}/required_status_checks",
+        strict=True,
+        contexts=["build", "lint"],
+        contexts_url=f"{_URL}/required_status_checks/contexts",
+        checks=[dict(context="build", app_id=None), dict(context="lint", app_id=None)],
+    ),
+    enforce_admins=dict(url=f"{_URL}/enforce_admins", enabled=True),
+    required_pull_request_reviews=dict(
+        url=f"{_URL}/required_pull_request_reviews",
+        dismiss_stale_reviews=False,
+        require_code_owner_reviews=True,
+        required_approving_review_count=2,
+        dismissal_restrictions=dict(
+            url=f"{_URL}/dismissal_restrictions",
+            users_url=f"{_URL}/dismissal_restrictions/users",
+            users=[dict(login="Octocat", id=1)],
+            teams=[dict(slug="core", name="Core")],
+        ),
+    ),
+    required_linear_history=dict(enabled=False),
+)
+_CONFIG = dict(
+    required_status_checks=dict(strict=True, contexts=["lint", "build"]),
+    enforce_admins=True,
+    required_pull_request_reviews=dict(
+        required_approving_review_count=2,
+        require_code_owner_reviews=True,
+        dismissal_restrictions=dict(users=["octocat"], teams=["core"]),
+    ),
+    restrictions=None,
+)
+
+
+def test_normalize():
+    test = _normalize(_RESPONSE)
+
+    assert test == dict(
+        required_status_checks=dict(
+            strict=True,
+            contexts=["build", "lint"],
+            checks=[dict(context="build", app_id=None), dict(context="lint", app_id=None)],
+        ),
+        enforce_admins=True,
+        required_pull_request_reviews=dict(
+            dismiss_stale_reviews=False,
+            require_code_owner_reviews=True,
+            required_approving_review_count=2,
+            dismissal_restrictions=dict(users=["octocat"], teams=["core"]),
+        ),
+        restrictions=None,
+        required_linear_history=False,
+    )
+
+
+def test_matches_config():
+    current = _normalize(_RESPONSE)
+
+    assert all(_matches(value, current[section], section) for section, value in _CONFIG.items())
+
+
+@pytest.mark.parametrize(
+    "section, value",
+    (
+        pytest.param("enforce_admins", False, id="enforce admins"),
+        pytest.param(
+            "required_status_checks", dict(strict=True, contexts=["build"]), id="contexts"
+        ),
+        pytest.param("required_status_checks", None, id="status checks off"),
+        pytest.param(
+            "required_pull_request_reviews",
+            dict(dismissal_restrictions=dict(users=["hubot"], teams=["core"])),
+            id="dismissal users",
+        ),
+        pytest.param("restrictions", dict(users=[], teams=[], apps=[]), id="restrictions on"),
+        pytest.param("required_linear_history", True, id="linear history"),
+    ),
+)
+def test_matches_changed(section, value):
+    current = _normalize(_RESPONSE)
+
+    assert not _matches(value, current.get(section), section)
+
+
+def test_matches_empty_dismissal_restrictions():
+    assert _matches({}, None, "dismissal_restrictions")
+    assert _matches({}, dict(users=[], teams=[]), "dismissal_restrictions")
+    assert not _matches({}, dict(users=["octocat"], teams=[]), "dismissal_restrictions")
+
+
+@pytest.mark.parametrize(
+    "section, desired, current, expected",
+    (
+        pytest.param(
+            "enforce_admins", True, False, [("POST", ("enforce_admins",), None)], id="enable admins"
+        ),
+        pytest.param(
+            "enforce_admins",
+            None,
+            True,
+            [("DELETE", ("enforce_admins",), None)],
+            id="disable admins",
+        ),
+        pytest.param(
+            "required_status_checks",
+            dict(strict=False, contexts=[]),
+            dict(strict=True, contexts=[]),
+            [("PATCH", ("required_status_checks",), dict(strict=False, contexts=[]))],
+            id="edit checks",
+        ),
+        pytest.param(
+            "required_pull_request_reviews",
+            None,
+            dict(required_approving_review_count=1),
+            [("DELETE", ("required_pull_request_reviews",), None)],
+            id="remove reviews",
+        ),
+        pytest.param(
+            "restrictions",
+            dict(users=["a"], teams=["core"], apps=[]),
+            dict(users=["b"], teams=["core"], apps=[]),
+            [("PUT", ("restrictions", "users"), dict(users=["a"]))],
+            id="restriction users",
+        ),
+        pytest.param(
+            "restrictions", dict(users=[], teams=[], apps=[]), None, None, id="turn on section"
+        ),
+        pytest.param("required_linear_history", True, False, None, id="no endpoint"),
+    ),
+)
+def test_section_writes(section, desired, current, expected):
+    assert _section_writes(section, desired, current) == expected
@@ -0,0 +1,132 @@
+"""Unit test suite for ``repo_manager._groups.collaborators``."""
+from types import SimpleNamespace
+
+import pytest
+
+from repo_manager._groups.collaborators import (
+    _Change,
+    _collaborator_permission,
+    _Invitation,
+    _permissions_to_string,
+    _plan,
+    _role_to_permission,
+    _user_permission,
+    snapshot,
+)
+from repo_manager._util import HandlerRequest
+from repo_manager.exceptions import RepoAdminError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+def test_plan():
+    data = [
+        dict(username="same", permission="push"),
+        dict(username="changed", permission="admin"),
+        dict(username="added", permission="pull"),
+    ]
+    current = [("same", "push"), ("changed", "pull"), ("removed", "push"), ("owner", "admin")]
+
+    test = _plan(data, current, "owner")
+
+    assert test == [
+        _Change(action="add", username="changed", permission="admin"),
+        _Change(action="remove", username="removed"),
+        _Change(action="add", username="added", permission="pull"),
+    ]
+
+
+def test_plan_invitations():
+    data = [
+        dict(username="Invited", permission="push"),
+        dict(username="outdated", permission="maintain"),
+        dict(username="collaborator", permission="pull"),
+    ]
+    invitations = [
+        _Invitation(invitation_id=1, username="invited", permission="push"),
+        _Invitation(invitation_id=2, username="outdated", permission="pull"),
+        _Invitation(invitation_id=3, username="unknown", permission="pull"),
+        _Invitation(invitation_id=4, username="collaborator", permission="pull"),
+    ]
+
+    test = _plan(data, [("Collaborator", "pull")], "owner", invitations)
+
+    assert test == [
+        _Change(action="reinvite", username="outdated", permission="maintain", invitation_id=2),
+        _Change(action="uninvite", username="unknown", invitation_id=3),
+        _Change(action="uninvite", username="collaborator", invitation_id=4),
+    ]
+
+
+@pytest.mark.parametrize(
+    "role, expected",
+    (
+        pytest.param("read", "pull"),
+        pytest.param("write", "push"),
+        pytest.param("triage", "triage"),
+        pytest.param("maintain", "maintain"),
+        pytest.param("admin", "admin"),
+        pytest.param("custom", None),
+        pytest.param(None, None),
+    ),
+)
+def test_role_to_permission(role, expected):
+    assert _role_to_permission(role) == expected
+
+
+def test_collaborator_permission_custom_role():
+    assert _collaborator_permission("custom", dict(admin=False, push=True, pull=True)) == "push"
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        pytest.param(dict(admin=True, push=True, pull=True), "admin"),
+        pytest.param(dict(admin=False, push=True, pull=True), "push"),
+        pytest.param(dict(admin=False, push=False, pull=True), "pull"),
+    ),
+)
+def test_permissions_to_string(value, expected):
+    assert _permissions_to_string(value) == expected
+
+
+def test_permissions_to_string_unknown():
+    with pytest.raises(RepoAdminError) as excinfo:
+        _permissions_to_string(dict(admin=False, push=False, pull=False))
+
+    excinfo.match("Unknown permissions: *")
+
+
+def _user(login, role_name=None, **permissions):
+    values = dict(login=login, permissions=SimpleNamespace(admin=False, push=False, pull=True))
+    values["permissions"].__dict__.update(permissions)
+    if role_name is not None:
+        values["role_name"] = role_name
+    return SimpleNamespace(**values)
+
+
+def test_user_permission_without_role_name():
+    assert _user_permission(_user("old", push=True)) == "push"
+
+
+@pytest.mark.parametrize(
+    "before, after",
+    (
+        pytest.param(
+            _user("alice", "write", push=True), _user("alice", "maintain", push=True), id="maintain"
+        ),
+        pytest.param(_user("alice", "read"), _user("alice", "triage"), id="triage"),
+    ),
+)
+def test_snapshot_changes_with_role(mocker, before, after):
+    repository = mocker.Mock()
+    repository.get_pending_invitations.return_value = []
+    request = HandlerRequest(data=[], repository=repository)
+
+    repository.get_collaborators.return_value = [before]
+    first = snapshot(request)
+    repository.get_collaborators.return_value = [after]
+    second = snapshot(request)
+
+    assert first != second
+    assert second["collaborators"] == [["alice", _role_to_permission(after.role_name)]]
@@ -0,0 +1,182 @@
+"""Unit test suite for ``repo_manager._groups.labels``."""
+import pytest
+
+from repo_manager._groups.labels import _plan
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+def _summary(changes):
+    return [(change.action, change.name, change.values.get("name")) for change in changes]
+
+
+def _apply(current, changes):
+    """Apply planned changes to a list of current labels the way GitHub would."""
+    labels = {name.lower(): (name, color, description) for name, color, description in current}
+    for change in changes:
+        if change.action == "create":
+            assert change.name.lower() not in labels
+            labels[change.name.lower()] = (
+                change.name,
+                change.values["color"],
+                change.values.get("description"),
+            )
+        elif change.action == "edit":
+            name, color, description = labels.pop(change.name.lower())
+            new_name = change.values["name"]
+            assert new_name.lower() not in labels
+            labels[new_name.lower()] = (
+                new_name,
+                change.values.get("color", color),
+                change.values.get("description", description),
+            )
+        else:
+            del labels[change.name.lower()]
+    return sorted(labels.values())
+
+
+def test_plan():
+    data = [
+        dict(name="bug", color="#CC0000", description="bad"),
+        dict(name="feature", color="336699", description="new"),
+        dict(name="docs", color="000000", description="words", oldname="documentation"),
+        dict(name="new", color=111111, description="fresh"),
+    ]
+    current = [
+        ("bug", "CC0000", "bad"),
+        ("feature", "000000", "new"),
+        ("documentation", "000000", "words"),
+        ("stale", "ffffff", None),
+    ]
+
+    test = _plan(data, current)
+
+    assert _summary(test) == [
+        ("edit", "feature", "feature"),
+        ("delete", "stale", None),
+        ("edit", "documentation", "docs"),
+        ("create", "new", "new"),
+    ]
+    assert test[2].values == dict(name="docs", color="000000", description="words")
+    assert test[3].values["color"] == "111111"
+
+
+def test_plan_leaves_config_unchanged():
+    data = [dict(name="bug", color="#CC0000"), dict(name="docs", color=111111, oldname="words")]
+    expected = [dict(label) for label in data]
+
+    _plan(data, [("words", "000000", None)])
+
+    assert data == expected
+
+
+def test_plan_rename_keeps_color():
+    data = [dict(name="first-timers-only", oldname="Help Wanted")]
+    current = [("Help Wanted", "008672", "Extra attention")]
+
+    test = _plan(data, current)
+
+    assert _summary(test) == [("edit", "Help Wanted", "first-timers-only")]
+    assert test[0].values == dict(name="first-timers-only")
+    assert _plan(data, _apply(current, test)) == []
+
+
+def test_plan_already_renamed():
+    data = [dict(name="docs", color="000000", description="words", oldname="documentation")]
+
+    test = _plan(data, [("docs", "000000", "words")])
+
+    assert test == []
+
+
+def test_plan_already_renamed_deletes_old_label():
+    data = [dict(name="docs", color="000000", oldname="documentation")]
+    current = [("docs", "000000", None), ("documentation", "000000", None)]
+
+    test = _plan(data, current)
+
+    assert _summary(test) == [("delete", "documentation", None)]
+
+
+@pytest.mark.parametrize(
+    "label, current",
+    (
+        pytest.param(dict(name="bug", color="CC0000"), ("bug", "cc0000", None), id="color case"),
+        pytest.param(dict(name="bug", color="#cc0000"), ("bug", "cc0000", None), id="color hash"),
+        pytest.param(
+            dict(name="bug", color="cc0000", description=""),
+            ("bug", "cc0000", None),
+            id="empty description",
+        ),
+        pytest.param(
+            dict(name="bug", color="cc0000"), ("bug", "cc0000", "kept"), id="description not set"
+        ),
+        pytest.param(
+            dict(name="bug", color="cc0000", oldname="Bug"), ("bug", "cc0000", None), id="oldname"
+        ),
+    ),
+)
+def test_plan_no_writes_when_matching(label, current):
+    assert _plan([label], [current]) == []
+
+
+def test_plan_ignores_case():
+    data = [dict(name="Help Wanted", color="008672"), dict(name="bug", color="cc0000")]
+    current = [("help wanted", "008672", None), ("BUG", "cc0000", None)]
+
+    test = _plan(data, current)
+
+    assert _summary(test) == [
+        ("edit", "help wanted", "Help Wanted"),
+        ("edit", "BUG", "bug"),
+    ]
+
+
+def test_plan_rename_chain():
+    data = [
+        dict(name="b", color="000000", oldname="a"),
+        dict(name="c", color="111111", oldname="b"),
+    ]
+    current = [("a", "000000", None), ("b", "111111", None)]
+
+    test = _plan(data, current)
+
+    assert _summary(test) == [("edit", "b", "c"), ("edit", "a", "b")]
+    assert _apply(current, test) == [("b", "000000", None), ("c", "111111", None)]
+    assert _plan(data, _apply(current, test)) == []
+
+
+@pytest.mark.parametrize("size", (2, 3))
+def test_plan_rename_cycle(size):
+    names = [f"label-{index}" for index in range(size)]
+    data = [
+        dict(name=names[(index + 1) % size], color="000000", description=name, oldname=name)
+        for index, name in enumerate(names)
+    ]
+    current = [(name, "000000", None) for name in names] + [
+        ("repo-manager-rename-1", "ffffff", None)
+    ]
+
+    test = _plan(data, current)
+
+    # One temporary rename, then one rename for each label, and the unrelated label is deleted.
+    assert len(test) == size + 2
+    assert test[1].values == dict(name="repo-manager-rename-2")
+    applied = _apply(current, test)
+    assert applied == sorted(
+        (names[(index + 1) % size], "000000", name) for index, name in enumerate(names)
+    )
+    assert _plan(data, applied) == []
+
+
+def test_plan_rename_from_configured_label():
+    data = [
+        dict(name="bug", color="cc0000", oldname="defect"),
+        dict(name="defect", color="000000"),
+    ]
+    current = [("defect", "cc0000", None)]
+
+    test = _plan(data, current)
+
+    # "defect" is also configured under its own name, so it stays and "bug" is created.
+    assert _summary(test) == [("edit", "defect", "defect"), ("create", "bug", "bug")]
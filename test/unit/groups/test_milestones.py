@@ -0,0 +1,69 @@
+"""Unit test suite for ``repo_manager._groups.milestones``."""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from repo_manager._groups.milestones import _body, _due_on, _matches
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+_UTC = datetime(2020, 2, 2, 8, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        pytest.param(None, None, id="none"),
+        pytest.param("2020-02-02T08:00:00", _UTC, id="naive string"),
+        pytest.param("2020-02-02T00:00:00-08:00", _UTC, id="offset string"),
+        pytest.param(datetime(2020, 2, 2, 8), _UTC, id="naive datetime"),
+        pytest.param(
+            datetime(2020, 2, 2, 9, tzinfo=timezone(timedelta(hours=1))), _UTC, id="aware datetime"
+        ),
+        pytest.param(date(2020, 2, 2), _UTC.replace(hour=0), id="date"),
+    ),
+)
+def test_due_on(value, expected):
+    test = _due_on(value)
+
+    assert test == expected
+    if test is not None:
+        assert test.tzinfo is timezone.utc
+
+
+def _current(**values):
+    return dict(dict(number=1, title="v1", state="open", description="", due_on=_UTC), **values)
+
+
+@pytest.mark.parametrize(
+    "current, milestone",
+    (
+        pytest.param(_current(), dict(title="v1"), id="nothing configured"),
+        pytest.param(_current(description=None), dict(title="v1", description=""), id="empty"),
+        pytest.param(_current(), dict(title="v1", due_on=_due_on("2020-02-02")), id="same day"),
+        pytest.param(
+            _current(due_on=None), dict(title="v1", state="open", due_on=None), id="no due date"
+        ),
+    ),
+)
+def test_matches(current, milestone):
+    assert _matches(current, milestone)
+
+
+@pytest.mark.parametrize(
+    "current, milestone",
+    (
+        pytest.param(_current(state="closed"), dict(title="v1"), id="state defaults to open"),
+        pytest.param(_current(), dict(title="v1", description="new"), id="description"),
+        pytest.param(_current(), dict(title="v1", due_on=_due_on("2020-02-03")), id="due date"),
+        pytest.param(_current(due_on=None), dict(title="v1", due_on=_UTC), id="due date added"),
+    ),
+)
+def test_does_not_match(current, milestone):
+    assert not _matches(current, milestone)
+
+
+def test_body():
+    test = _body(dict(title="v1", due_on=_due_on("2020-02-02T00:00:00-08:00")))
+
+    assert test == dict(title="v1", due_on="2020-02-02T08:00:00Z")
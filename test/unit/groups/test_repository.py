@@ -0,0 +1,43 @@
+"""Unit test suite for ``repo_manager._groups.repository``."""
+import pytest
+
+from repo_manager._groups.repository import _matches, _topics
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        pytest.param("github, Probot", ["github", "probot"], id="string"),
+        pytest.param(["github", "probot", "GitHub"], ["github", "probot"], id="list"),
+        pytest.param("github,, ", ["github"], id="empty entries"),
+        pytest.param(None, [], id="none"),
+        pytest.param("", [], id="empty"),
+    ),
+)
+def test_topics(value, expected):
+    assert _topics(value) == expected
+
+
+@pytest.mark.parametrize(
+    "desired, current, expected",
+    (
+        pytest.param(True, True, True, id="same"),
+        pytest.param(False, True, False, id="different"),
+        pytest.param("", None, True, id="empty string"),
+        pytest.param(None, "", True, id="none"),
+        pytest.param("docs", None, False, id="set"),
+        pytest.param(
+            dict(secret_scanning=dict(status="enabled")),
+            dict(
+                secret_scanning=dict(status="enabled"), advanced_security=dict(status="disabled"),
+            ),
+            True,
+            id="nested",
+        ),
+        pytest.param(dict(secret_scanning=dict(status="enabled")), None, False, id="missing"),
+    ),
+)
+def test_matches(desired, current, expected):
+    assert _matches(desired, current) == expected
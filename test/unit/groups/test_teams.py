@@ -0,0 +1,34 @@
+"""Unit test suite for ``repo_manager._groups.teams``."""
+from types import SimpleNamespace
+
+import pytest
+
+from repo_manager._groups.teams import _find_team
+from repo_manager._team_directory import TeamDirectory
+from repo_manager._util import HandlerRequest
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+def _team(slug, name):
+    return SimpleNamespace(slug=slug, name=name)
+
+
+def test_find_team_by_slug(mocker):
+    team = _team("core", "Core Team")
+    organization = mocker.Mock(login="org")
+    organization.get_team_by_slug.return_value = team
+    request = HandlerRequest(data=[], repository=mocker.Mock(), organization=organization)
+
+    assert _find_team(request, TeamDirectory(), "core") is team
+    organization.get_teams.assert_not_called()
+
+
+def test_find_team_without_slug_lookup(mocker):
+    team = _team("core", "Core Team")
+    # PyGithub releases without ``get_team_by_slug`` can still list the teams.
+    organization = SimpleNamespace(login="org", get_teams=lambda: [team])
+    request = HandlerRequest(data=[], repository=mocker.Mock(), organization=organization)
+
+    assert _find_team(request, TeamDirectory(), "core") is team
+    assert _find_team(request, TeamDirectory(), "Core Team") is team
@@ -0,0 +1,28 @@
+"""Unit test suite for ``repo_manager._aio``."""
+import pytest
+
+from repo_manager._aio import AsyncGitHub, AsyncRepo, _next_link
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    (
+        pytest.param(None, None, id="no header"),
+        pytest.param('<https://a/b?page=1>; rel="prev"', None, id="no next"),
+        pytest.param(
+            '<https://a/b?page=1>; rel="prev", <https://a/b?page=3>; rel="next"',
+            "https://a/b?page=3",
+            id="next",
+        ),
+    ),
+)
+def test_next_link(header, expected):
+    assert _next_link(header) == expected
+
+
+def test_repo_path_escapes_parts():
+    repo = AsyncRepo(AsyncGitHub("token"), "owner", "repo")
+
+    assert repo.path("labels", "good first issue") == "repos/owner/repo/labels/good%20first%20issue"
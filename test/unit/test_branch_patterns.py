@@ -0,0 +1,38 @@
+"""Unit test suite for ``repo_manager._branch_patterns``."""
+import pytest
+
+from repo_manager._branch_patterns import compile_pattern, is_pattern
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    (
+        pytest.param("master", False),
+        pytest.param("release/1.0", False),
+        pytest.param("release/*", True),
+        pytest.param("v?", True),
+        pytest.param("[ab]", True),
+        pytest.param("/^release-[0-9]+$/", True),
+        pytest.param("//", False),
+    ),
+)
+def test_is_pattern(name, expected):
+    assert is_pattern(name) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern, name, expected",
+    (
+        pytest.param("release/*", "release/1.0", True, id="glob"),
+        pytest.param("release/*", "release/1.0/hotfix", True, id="glob crosses slashes"),
+        pytest.param("release/*", "Release/1.0", False, id="glob is case-sensitive"),
+        pytest.param("release/*", "old/release/1.0", False, id="glob matches whole name"),
+        pytest.param("/^release-[0-9]+$/", "release-12", True, id="regex"),
+        pytest.param("/^release-[0-9]+$/", "release-12a", False, id="regex anchored"),
+        pytest.param("/hotfix/", "release/hotfix-1", True, id="regex searches"),
+    ),
+)
+def test_compile_pattern(pattern, name, expected):
+    assert bool(compile_pattern(pattern)(name)) == expected
@@ -0,0 +1,174 @@
+"""Unit test suite for ``repo_manager._config``."""
+import datetime
+import os
+
+import pytest
+import yaml
+
+from repo_manager import _config
+from repo_manager._config import ConfigCache, load_yaml
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+_CONFIG = """
+labels:
+  - name: bug
+    color: d73a4a
+milestones:
+  - title: v1
+    due_on: 2030-01-01T00:00:00
+"""
+_EXPECTED = dict(
+    labels=[dict(name="bug", color="d73a4a")],
+    milestones=[dict(title="v1", due_on=datetime.datetime(2030, 1, 1))],
+)
+
+
+@pytest.fixture
+def config_file(tmpdir):
+    path = tmpdir.join("settings.yml")
+    path.write(_CONFIG)
+    return str(path)
+
+
+@pytest.fixture
+def parse_counter(mocker):
+    return mocker.patch.object(_config, "load_yaml", wraps=_config.load_yaml)
+
+
+def test_load_yaml():
+    assert load_yaml(_CONFIG) == yaml.safe_load(_CONFIG)
+
+
+def test_load_yaml_uses_libyaml():
+    if not yaml.__with_libyaml__:
+        pytest.skip("PyYAML was built without libyaml")
+
+    assert _config.LIBYAML
+    assert _config._SafeLoader is yaml.CSafeLoader
+
+
+def test_load_yaml_is_safe():
+    with pytest.raises(yaml.YAMLError):
+        load_yaml("!!python/object/apply:os.system ['true']")
+
+
+def test_config_cache_parses_once(config_file, parse_counter):
+    cache = ConfigCache()
+
+    first = cache.load(config_file)
+    second = cache.load(config_file)
+
+    assert first == second == _EXPECTED
+    assert parse_counter.call_count == 1
+
+
+def test_config_cache_returns_copies(config_file):
+    cache = ConfigCache()
+
+    first = cache.load(config_file)
+    first["labels"][0]["name"] = "changed"
+
+    assert cache.load(config_file) == _EXPECTED
+
+
+def test_config_cache_keyed_by_content(config_file, parse_counter):
+    cache = ConfigCache()
+    cache.load(config_file)
+
+    with open(config_file, "a") as raw:
+        raw.write("teams: []\n")
+
+    assert cache.load(config_file) == dict(_EXPECTED, teams=[])
+    assert parse_counter.call_count == 2
+
+
+def test_config_cache_empty_file(tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("")
+
+    assert ConfigCache().load(str(config_file)) == {}
+
+
+def test_config_cache_on_disk(config_file, parse_counter, tmpdir):
+    directory = str(tmpdir.join("cache"))
+
+    ConfigCache(directory).load(config_file)
+    test = ConfigCache(directory).load(config_file)
+
+    assert test == _EXPECTED
+    assert parse_counter.call_count == 1
+    assert [name for name in os.listdir(directory) if name.endswith(".json")]
+
+
+def test_config_cache_ignores_unreadable_entry(config_file, parse_counter, tmpdir):
+    directory = tmpdir.join("cache")
+    directory.mkdir()
+    with open(config_file, "rb") as raw:
+        key = ConfigCache.key(raw.read())
+    directory.join(f"{key}.json").write("not json")
+
+    test = ConfigCache(str(directory)).load(config_file)
+
+    assert test == _EXPECTED
+    assert parse_counter.call_count == 1
+    assert ConfigCache(str(directory)).load(config_file) == _EXPECTED
+    assert parse_counter.call_count == 1
+
+
+def test_config_cache_round_trips_yaml_types(tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(
+        """
+dates:
+  day: 2030-01-02
+  moment: 2030-01-02T03:04:05+01:00
+  2030-01-03: keyed by date
+numbers:
+  1: one
+  true: yes
+binary: !!binary aGVsbG8=
+names: !!set {a, b}
+$yaml: [datetime, "not a tag"]
+"""
+    )
+    directory = str(tmpdir.join("cache"))
+    expected = load_yaml(config_file.read())
+
+    ConfigCache(directory).load(str(config_file))
+    test = ConfigCache(directory).load(str(config_file))
+
+    assert test == expected
+    assert isinstance(test["dates"]["moment"], datetime.datetime)
+    assert type(test["dates"]["day"]) is datetime.date  # pylint: disable=unidiomatic-typecheck
+
+
+def test_config_cache_entries_are_data(config_file, tmpdir):
+    directory = tmpdir.join("cache")
+    directory.mkdir()
+    with open(config_file, "rb") as raw:
+        key = ConfigCache.key(raw.read())
+    directory.join(f"{key}.json").write('{"$yaml": ["object", "os.system"]}')
+
+    assert ConfigCache(str(directory)).load(config_file) == _EXPECTED
+
+
+def test_config_cache_validates_once(config_file, mocker):
+    validator = mocker.Mock()
+    cache = ConfigCache()
+
+    cache.load(config_file, validator=validator)
+    cache.load(config_file, validator=validator)
+
+    validator.assert_called_once_with(_EXPECTED)
+
+
+def test_config_cache_validation_fails(config_file, mocker):
+    validator = mocker.Mock(side_effect=ValueError("invalid"))
+    cache = ConfigCache()
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.load(config_file, validator=validator)
+
+    assert validator.call_count == 2
@@ -0,0 +1,115 @@
+"""Unit test suite for ``repo_manager._fleet``."""
+import json
+from types import SimpleNamespace
+
+import pytest
+from github.GithubException import UnknownObjectException
+
+import repo_manager._fleet
+from repo_manager._fleet import (
+    FleetResult,
+    load_manifest,
+    resolve_targets,
+    run_fleet,
+    write_report,
+)
+from repo_manager._util import RepoContext
+from repo_manager.exceptions import RepoAdminError, UserConfigError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+@pytest.mark.parametrize(
+    "contents",
+    (
+        pytest.param("repositories:\n  - a/b\n  - a/c-*\n", id="mapping"),
+        pytest.param("- a/b\n- a/c-*\n", id="list"),
+    ),
+)
+def test_load_manifest(contents, tmpdir):
+    manifest = tmpdir.join("fleet.yml")
+    manifest.write(contents)
+
+    assert load_manifest(str(manifest)) == ["a/b", "a/c-*"]
+
+
+def test_load_manifest_empty(tmpdir):
+    manifest = tmpdir.join("fleet.yml")
+    manifest.write("repositories: []\n")
+
+    with pytest.raises(UserConfigError) as excinfo:
+        load_manifest(str(manifest))
+
+    excinfo.match("does not list any repositories")
+
+
+def _repo(name, archived=False):
+    return SimpleNamespace(name=name, archived=archived)
+
+
+def test_resolve_targets(mocker):
+    inputs = mocker.Mock()
+    inputs.github.get_organization.return_value.get_repos.return_value = [
+        _repo("tool-a"),
+        _repo("tool-b"),
+        _repo("tool-old", archived=True),
+        _repo("other"),
+    ]
+
+    test = resolve_targets(inputs, ["org/tool-*", "org/tool-a", "org/other", "user/thing"])
+
+    assert test == [
+        RepoContext(owner="org", repo="tool-a"),
+        RepoContext(owner="org", repo="tool-b"),
+        RepoContext(owner="org", repo="other"),
+        RepoContext(owner="user", repo="thing"),
+    ]
+    inputs.github.get_organization.assert_called_once_with("org")
+
+
+def test_resolve_targets_personal_owner(mocker):
+    inputs = mocker.Mock()
+    inputs.github.get_organization.side_effect = UnknownObjectException(404, {}, {})
+    inputs.github.get_user.return_value.get_repos.return_value = [_repo("one"), _repo("two")]
+
+    test = resolve_targets(inputs, ["user/o*"])
+
+    assert test == [RepoContext(owner="user", repo="one")]
+
+
+def test_run_fleet_isolates_failures(mocker):
+    mocker.patch.object(repo_manager._fleet, "parse_config")
+    mocker.patch.object(
+        repo_manager._fleet, "apply_config", side_effect=[dict(labels=1.0), Exception("boom")]
+    )
+    inputs = mocker.Mock(fleet_workers=1, max_workers=2, verify_idempotent=False)
+
+    test = run_fleet(inputs, [RepoContext("a", "b"), RepoContext("a", "c")])
+
+    assert [(result.repository, result.success) for result in test] == [
+        ("a/b", True),
+        ("a/c", False),
+    ]
+    assert test[0].timings == dict(labels=1.0)
+    assert "boom" in test[1].error
+
+
+def test_write_report(tmpdir):
+    report = tmpdir.join("report.json")
+    results = [FleetResult(repository="a/b", success=True, duration=1.0)]
+
+    write_report(results, str(report))
+
+    assert json.loads(report.read())[0]["repository"] == "a/b"
+
+
+def test_write_report_failures():
+    results = [
+        FleetResult(repository="a/b", success=True, duration=1.0),
+        FleetResult(repository="a/c", success=False, duration=1.0, error="boom"),
+    ]
+
+    with pytest.raises(RepoAdminError) as excinfo:
+        write_report(results, None)
+
+    excinfo.match("Failed to apply config to repositories: a/c")
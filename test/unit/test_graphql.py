@@ -0,0 +1,164 @@
+"""Unit test suite for ``repo_manager._graphql``."""
+from datetime import datetime, timezone
+
+import pytest
+
+from repo_manager._graphql import PAGE_SIZE, RepositoryState, _build_query, fetch_state
+from repo_manager.exceptions import RepoAdminError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+def _page(items, cursor=None, key="nodes"):
+    return {key: items, "pageInfo": dict(hasNextPage=cursor is not None, endCursor=cursor)}
+
+
+def _graphql(mocker, *repositories):
+    agithub = mocker.MagicMock()
+    agithub.graphql.post.side_effect = [
+        (200, dict(data=dict(repository=repository))) for repository in repositories
+    ]
+    return agithub
+
+
+def test_build_query():
+    query, variables = _build_query(dict(labels=None, milestones="abc"), ["main"])
+
+    assert query.startswith(
+        "query($owner: String!, $name: String!, $labels: String, $milestones: String, "
+        "$branch0: String!) { repository(owner: $owner, name: $name) {"
+    )
+    assert f"labels(first: {PAGE_SIZE}, after: $labels)" in query
+    assert f"milestones(first: {PAGE_SIZE}, after: $milestones, states: [OPEN, CLOSED])" in query
+    assert "branch0: ref(qualifiedName: $branch0)" in query
+    assert variables == dict(labels=None, milestones="abc", branch0="refs/heads/main")
+
+
+def test_fetch_state(mocker):
+    agithub = _graphql(
+        mocker,
+        dict(
+            labels=_page([dict(name="bug", color="cc0000", description=None)]),
+            milestones=_page(
+                [
+                    dict(
+                        number=1,
+                        title="v1",
+                        state="OPEN",
+                        description="",
+                        dueOn="2020-01-01T08:00:00Z",
+                    )
+                ]
+            ),
+            collaborators=_page(
+                [dict(permission="MAINTAIN", node=dict(login="alice"))], key="edges"
+            ),
+            branch0=dict(name="main", branchProtectionRule=dict(pattern="main")),
+            branch1=None,
+        ),
+    )
+    config = dict(
+        labels=[], milestones=[], collaborators=[], branches=[dict(name="main"), dict(name="gone")]
+    )
+
+    state = fetch_state(agithub, "foo", "bar", config)
+
+    assert state == RepositoryState(
+        labels=[("bug", "cc0000", None)],
+        milestones=[
+            dict(
+                number=1,
+                title="v1",
+                state="open",
+                description="",
+                due_on=datetime(2020, 1, 1, 8, tzinfo=timezone.utc),
+            )
+        ],
+        collaborators=[("alice", "maintain")],
+        branches=dict(main=dict(pattern="main")),
+    )
+    assert state.queries == 1
+    variables = agithub.graphql.post.call_args.kwargs["body"]["variables"]
+    assert (variables["owner"], variables["name"]) == ("foo", "bar")
+
+
+def test_fetch_state_only_reads_configured_groups(mocker):
+    agithub = _graphql(mocker, dict(labels=_page([])))
+
+    state = fetch_state(agithub, "foo", "bar", dict(labels=[], teams=[]))
+
+    assert state == RepositoryState(labels=[])
+    query = agithub.graphql.post.call_args.kwargs["body"]["query"]
+    assert "milestones" not in query
+    assert "collaborators" not in query
+
+
+def test_fetch_state_paginates_each_connection(mocker):
+    agithub = _graphql(
+        mocker,
+        dict(
+            labels=_page([dict(name="a", color="000000", description=None)], cursor="l1"),
+            collaborators=_page([], key="edges"),
+        ),
+        dict(labels=_page([dict(name="b", color="000000", description=None)], cursor="l2")),
+        dict(labels=_page([dict(name="c", color="000000", description=None)])),
+    )
+
+    state = fetch_state(agithub, "foo", "bar", dict(labels=[], collaborators=[]))
+
+    assert [label[0] for label in state.labels] == ["a", "b", "c"]
+    assert state.collaborators == []
+    assert state.queries == 3
+    later = [call.kwargs["body"] for call in agithub.graphql.post.call_args_list[1:]]
+    assert [body["variables"]["labels"] for body in later] == ["l1", "l2"]
+    assert all("collaborators" not in body["query"] for body in later)
+
+
+def test_fetch_state_splits_branches(mocker):
+    mocker.patch("repo_manager._graphql._BRANCHES_PER_QUERY", 2)
+    agithub = _graphql(
+        mocker,
+        dict(branch0=None, branch1=None),
+        dict(branch0=dict(name="e", branchProtectionRule=None)),
+    )
+    config = dict(branches=[dict(name=name) for name in ("c", "d", "c", "e")])
+
+    state = fetch_state(agithub, "foo", "bar", config)
+
+    assert state.branches == dict(e=None)
+    assert state.queries == 2
+
+
+def test_fetch_state_skips_branch_patterns(mocker):
+    agithub = _graphql(mocker, dict(branch0=dict(name="main", branchProtectionRule=None)))
+    config = dict(branches=[dict(name="main"), dict(name="release/*"), dict(name="/^v[0-9]+$/")])
+
+    state = fetch_state(agithub, "foo", "bar", config)
+
+    assert state.branches == dict(main=None)
+    assert (
+        agithub.graphql.post.call_args.kwargs["body"]["variables"]["branch0"] == "refs/heads/main"
+    )
+    assert "branch1" not in agithub.graphql.post.call_args.kwargs["body"]["variables"]
+
+
+@pytest.mark.parametrize(
+    "response, match",
+    (
+        pytest.param((502, "bad gateway"), "STATUS 502", id="status"),
+        pytest.param(
+            (200, dict(errors=[dict(message="rate limited")])),
+            "GraphQL query failed: rate limited",
+            id="errors",
+        ),
+        pytest.param(
+            (200, dict(data=dict(repository=None))), "Repository 'foo/bar' not found", id="missing"
+        ),
+    ),
+)
+def test_fetch_state_errors(mocker, response, match):
+    agithub = mocker.MagicMock()
+    agithub.graphql.post.return_value = response
+
+    with pytest.raises(RepoAdminError, match=match):
+        fetch_state(agithub, "foo", "bar", dict(labels=[]))
@@ -1,7 +1,12 @@
 """Unit test suite for ``repo_manager._groups``."""
+import asyncio
+
 import pytest
 
 import repo_manager._groups
+from repo_manager._state import LocalStateStore
+from repo_manager._util import RepoContext
+from repo_manager.exceptions import UserConfigError
 
 pytestmark = [pytest.mark.local, pytest.mark.unit]
 
@@ -21,3 +26,178 @@ def test_apply_config(mocker):
 
     for each in init.values():
         each.assert_called_once_with()
+
+
+def test_apply_config_returns_timings(mocker):
+    init = dict(foo=mocker.Mock(), bar=mocker.Mock())
+
+    test = repo_manager._groups.apply_config(init)
+
+    assert set(test.keys()) == {"foo", "bar"}
+    assert all(value >= 0 for value in test.values())
+
+
+def test_apply_config_repository_first(mocker):
+    calls = []
+
+    def _record(name):
+        def _handler():
+            calls.append(name)
+
+        return _handler
+
+    init = dict(
+        labels=_record("labels"),
+        branches=_record("branches"),
+        repository=_record("repository"),
+        teams=_record("teams"),
+    )
+
+    repo_manager._groups.apply_config(init, max_workers=4)
+
+    assert calls[0] == "repository"
+    assert sorted(calls[1:]) == ["branches", "labels", "teams"]
+
+
+def test_apply_config_failure_stops_pending(mocker):
+    init = dict(repository=mocker.Mock(side_effect=Exception("boom")), labels=mocker.Mock())
+
+    with pytest.raises(Exception) as excinfo:
+        repo_manager._groups.apply_config(init)
+
+    excinfo.match("boom")
+    init["labels"].assert_not_called()
+
+
+def test_load_handler_async_native(mocker):
+    mocker.patch.object(repo_manager._groups, "importlib")
+
+    test = repo_manager._groups._load_handler("foo", use_async=True)
+
+    assert test is repo_manager._groups.importlib.import_module.return_value.apply_async
+
+
+def test_load_handler_async_adapter(mocker):
+    handler = mocker.Mock(spec=["apply"])
+    mocker.patch.object(repo_manager._groups.importlib, "import_module", return_value=handler)
+
+    test = repo_manager._groups._load_handler("foo", use_async=True)
+    asyncio.run(test("request"))
+
+    handler.apply.assert_called_once_with("request")
+
+
+def test_apply_config_async_repository_first():
+    calls = []
+
+    def _record(name):
+        async def _handler():
+            calls.append(name)
+
+        return _handler
+
+    init = dict(labels=_record("labels"), repository=_record("repository"), teams=_record("teams"))
+
+    test = asyncio.run(repo_manager._groups.apply_config_async(init))
+
+    assert calls[0] == "repository"
+    assert set(test.keys()) == {"labels", "repository", "teams"}
+
+
+def test_apply_config_async_failure_cancels(mocker):
+    async def _fail():
+        raise Exception("boom")
+
+    labels = mocker.AsyncMock()
+    init = dict(repository=_fail, labels=labels)
+
+    with pytest.raises(Exception) as excinfo:
+        asyncio.run(repo_manager._groups.apply_config_async(init))
+
+    excinfo.match("boom")
+    labels.assert_not_awaited()
+
+
+def _inputs(mocker, config, **kwargs):
+    values = dict(
+        config_file=str(config),
+        aiogithub=None,
+        state_store=None,
+        only=(),
+        skip=(),
+        previous_config_file=None,
+        previous_ref=None,
+        config_cache=None,
+    )
+    values.update(kwargs)
+    return mocker.Mock(**values)
+
+
+def test_parse_config_is_lazy(mocker, tmpdir):
+    config = tmpdir.join("settings.yml")
+    config.write("labels:\n  - name: bug\n    color: CC0000\n")
+    inputs = _inputs(mocker, config)
+
+    test = repo_manager._groups.parse_config(inputs, RepoContext(owner="foo", repo="bar"))
+
+    assert list(test.keys()) == ["labels"]
+    request = test["labels"].args[0]
+    inputs.github.get_repo.assert_not_called()
+    assert request.repository is inputs.github.get_repo.return_value
+    inputs.github.get_repo.assert_called_once_with(full_name_or_id="foo/bar")
+    inputs.github.get_organization.assert_not_called()
+    inputs.agithub.orgs.foo.get.assert_not_called()
+
+
+def test_parse_config_skips_unchanged_groups(mocker, tmpdir):
+    config = tmpdir.join("settings.yml")
+    config.write("labels:\n  - name: bug\n    color: CC0000\n")
+    store = LocalStateStore(str(tmpdir.join("state.json")))
+    inputs = _inputs(mocker, config, state_store=store)
+    snapshot = mocker.patch.object(
+        repo_manager._groups.labels, "snapshot", return_value=[["bug", "cc0000", None]]
+    )
+    apply = mocker.patch.object(repo_manager._groups.labels, "apply")
+    context = RepoContext(owner="foo", repo="bar")
+
+    repo_manager._groups.parse_config(inputs, context)["labels"]()
+
+    apply.assert_called_once()
+    assert set(store.load("foo/bar")) == {"labels"}
+
+    repo_manager._groups.parse_config(inputs, context)["labels"]()
+
+    apply.assert_called_once()
+    assert snapshot.call_count == 2
+
+    snapshot.return_value = [["bug", "000000", None]]
+    repo_manager._groups.parse_config(inputs, context)["labels"]()
+
+    assert apply.call_count == 2
+
+
+def test_parse_config_applies_changed_groups(mocker, tmpdir):
+    config = tmpdir.join("settings.yml")
+    config.write(
+        "labels:\n  - name: bug\n    color: CC0000\nteams:\n  - name: admins\n    permission: admin\n"
+    )
+    previous = tmpdir.join("previous.yml")
+    previous.write("labels:\n  - name: bug\n    color: CC0000\nteams: []\n")
+    inputs = _inputs(mocker, config, previous_config_file=str(previous))
+
+    test = repo_manager._groups.parse_config(inputs, RepoContext(owner="foo", repo="bar"))
+
+    assert list(test.keys()) == ["teams"]
+
+
+def test_parse_config_validates_before_api_calls(mocker, tmpdir):
+    config = tmpdir.join("settings.yml")
+    config.write("labels:\n  - name: bug\nteams:\n  - name: core\n    permission: write\n")
+    inputs = _inputs(mocker, config)
+
+    with pytest.raises(UserConfigError) as excinfo:
+        repo_manager._groups.parse_config(inputs, RepoContext(owner="foo", repo="bar"))
+
+    excinfo.match(r"\(2 errors\)")
+    assert inputs.github.mock_calls == []
+    assert inputs.agithub.mock_calls == []
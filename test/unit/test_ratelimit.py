@@ -0,0 +1,88 @@
+"""Unit test suite for ``repo_manager._ratelimit``."""
+import pytest
+
+from repo_manager._ratelimit import RateLimiter, is_content_creating
+from repo_manager.exceptions import RateLimitError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.mark.parametrize(
+    "method, url, expected",
+    (
+        pytest.param("POST", "https://api.github.com/repos/a/b/labels", True, id="create"),
+        pytest.param("PUT", "https://api.github.com/repos/a/b/collaborators/u", True, id="invite"),
+        pytest.param("PUT", "https://api.github.com/repos/a/b/branches/m/protection", False),
+        pytest.param("PATCH", "https://api.github.com/repos/a/b/labels/x", False, id="edit"),
+        pytest.param("GET", "https://api.github.com/repos/a/b/labels", False, id="read"),
+        pytest.param("POST", "https://api.github.com/graphql", False, id="graphql"),
+    ),
+)
+def test_is_content_creating(method, url, expected):
+    assert is_content_creating(method, url) is expected
+
+
+def test_content_creating_requests_are_paced():
+    limiter = RateLimiter(content_interval=1.0, clock=FakeClock())
+
+    delays = [limiter.delay_before("POST", "/repos/a/b/labels") for _ in range(3)]
+
+    assert delays == [0.0, 1.0, 2.0]
+    assert limiter.delay_before("GET", "/repos/a/b/labels") == 0.0
+
+
+def test_primary_limit_exhausted():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock)
+
+    test = limiter.retry_delay(
+        403, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "1010"}, b"", attempt=0
+    )
+
+    assert test == 11.0
+    assert limiter.delay_before("GET", "/user") == 11.0
+
+
+def test_retry_after():
+    limiter = RateLimiter(clock=FakeClock())
+
+    test = limiter.retry_delay(403, {"retry-after": "30", "x-ratelimit-remaining": "10"}, b"", 0)
+
+    assert test == 30.0
+
+
+def test_secondary_limit_backoff():
+    limiter = RateLimiter(clock=FakeClock())
+    body = b'{"message": "You have exceeded a secondary rate limit."}'
+
+    assert limiter.retry_delay(403, {"x-ratelimit-remaining": "10"}, body, 0) == 60.0
+    assert limiter.retry_delay(403, {"x-ratelimit-remaining": "10"}, body, 2) == 240.0
+
+
+def test_plain_forbidden_not_retried():
+    limiter = RateLimiter(clock=FakeClock())
+
+    assert limiter.retry_delay(403, {"x-ratelimit-remaining": "10"}, b"Forbidden", 0) is None
+
+
+def test_retries_exhausted():
+    limiter = RateLimiter(max_retries=2, clock=FakeClock())
+
+    assert limiter.retry_delay(429, {"retry-after": "1"}, b"", 2) is None
+
+
+def test_wait_too_long():
+    limiter = RateLimiter(max_wait=10, clock=FakeClock())
+
+    with pytest.raises(RateLimitError) as excinfo:
+        limiter.retry_delay(429, {"retry-after": "60"}, b"", 0)
+
+    excinfo.match("Rate limit requires waiting 60 seconds")
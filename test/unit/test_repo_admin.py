@@ -1,7 +1,13 @@
 """Unit test suite for ``repo_manager``."""
+import os
+import subprocess  # nosec
+import sys
+
 import pytest
 
 import repo_manager
+from repo_manager import _fleet, _groups, _tracing, _util
+from repo_manager.exceptions import UserConfigError
 
 pytestmark = [pytest.mark.local, pytest.mark.unit]
 
@@ -14,8 +20,8 @@ def setup_env(monkeypatch):
 
 @pytest.fixture
 def patch_actors(mocker, setup_env):
-    mocker.patch.object(repo_manager, "parse_config")
-    mocker.patch.object(repo_manager, "apply_config")
+    mocker.patch.object(_groups, "parse_config")
+    mocker.patch.object(_groups, "apply_config")
 
 
 @pytest.fixture
@@ -24,17 +30,118 @@ def patch_logging(mocker):
 
 
 def test_cli(patch_actors, mocker):
-    mocker.patch.object(repo_manager, "load_inputs")
-    mocker.patch.object(repo_manager, "load_context")
+    mocker.patch.object(_util, "load_inputs")
+    mocker.patch.object(_util, "load_context")
+    _util.load_inputs.return_value.aiogithub = None
+    _util.load_inputs.return_value.fleet_manifest = None
+    _util.load_inputs.return_value.trace_file = None
+    _util.load_inputs.return_value.verify_idempotent = False
+
+    repo_manager.cli([])
+
+    _util.load_inputs.assert_called_once_with()
+    _util.load_context.assert_called_once_with()
+    _groups.parse_config.assert_called_once_with(
+        _util.load_inputs.return_value, _util.load_context.return_value,
+    )
+    _groups.apply_config.assert_called_once_with(
+        _groups.parse_config.return_value, max_workers=_util.load_inputs.return_value.max_workers,
+    )
+
+
+def test_cli_group_selection(patch_actors, mocker):
+    mocker.patch.object(_util, "load_inputs")
+    mocker.patch.object(_util, "load_context")
+    inputs = _util.load_inputs.return_value
+    inputs.aiogithub = None
+    inputs.fleet_manifest = None
+    inputs.trace_file = None
+    inputs.verify_idempotent = False
+    inputs.skip = ("teams",)
+
+    repo_manager.cli(["--only", "labels", "--only", "milestones,branches"])
+
+    assert inputs.only == ("labels", "milestones", "branches")
+    assert inputs.skip == ("teams",)
+
+
+def test_cli_asyncio_engine(patch_actors, mocker):
+    mocker.patch.object(_util, "load_inputs")
+    mocker.patch.object(_util, "load_context")
+    mocker.patch.object(_groups, "apply_config_async", new=mocker.AsyncMock())
+    inputs = _util.load_inputs.return_value
+    inputs.fleet_manifest = None
+    inputs.trace_file = None
+    inputs.verify_idempotent = False
+    inputs.aiogithub = mocker.MagicMock()
+    inputs.aiogithub.__aenter__ = mocker.AsyncMock()
+    inputs.aiogithub.__aexit__ = mocker.AsyncMock(return_value=False)
 
     repo_manager.cli([])
 
-    repo_manager.load_inputs.assert_called_once_with()
-    repo_manager.load_context.assert_called_once_with()
-    repo_manager.parse_config.assert_called_once_with(
-        repo_manager.load_inputs.return_value, repo_manager.load_context.return_value,
+    _groups.parse_config.assert_called_once_with(inputs, _util.load_context.return_value)
+    _groups.apply_config_async.assert_awaited_once_with(
+        _groups.parse_config.return_value, max_workers=inputs.max_workers
     )
-    repo_manager.apply_config.assert_called_once_with(repo_manager.parse_config.return_value)
+    _groups.apply_config.assert_not_called()
+
+
+def test_cli_verify_idempotent(patch_actors, mocker):
+    mocker.patch.object(_util, "load_inputs")
+    mocker.patch.object(_util, "load_context")
+    inputs = _util.load_inputs.return_value
+    inputs.aiogithub = None
+    inputs.fleet_manifest = None
+    inputs.trace_file = None
+    inputs.verify_idempotent = False
+
+    try:
+        repo_manager.cli(["--verify-idempotent"])
+    finally:
+        _tracing.stop_tracing()
+
+    assert inputs.verify_idempotent is True
+    assert _groups.parse_config.call_count == 2
+    assert _groups.apply_config.call_count == 2
+    # The verification pass applies every group, so the state store is left out.
+    assert _groups.parse_config.call_args_list[1] == mocker.call(
+        inputs, _util.load_context.return_value, use_state_store=False
+    )
+
+
+def test_cli_fleet(patch_actors, mocker):
+    mocker.patch.object(_util, "load_inputs")
+    mocker.patch.object(_util, "load_context")
+    for name in ("load_manifest", "resolve_targets", "run_fleet", "write_report"):
+        mocker.patch.object(_fleet, name)
+    inputs = _util.load_inputs.return_value
+    inputs.aiogithub = None
+    inputs.trace_file = None
+
+    repo_manager.cli([])
+
+    _fleet.load_manifest.assert_called_once_with(inputs.fleet_manifest)
+    _fleet.resolve_targets.assert_called_once_with(inputs, _fleet.load_manifest.return_value)
+    _fleet.run_fleet.assert_called_once_with(inputs, _fleet.resolve_targets.return_value)
+    _fleet.write_report.assert_called_once_with(_fleet.run_fleet.return_value, inputs.fleet_report)
+    _util.load_context.assert_not_called()
+
+
+def test_cli_fleet_validates_first(patch_actors, mocker, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("labels:\n  - name: bug\n")
+    mocker.patch.object(_util, "load_inputs")
+    for name in ("load_manifest", "resolve_targets", "run_fleet", "write_report"):
+        mocker.patch.object(_fleet, name)
+    inputs = _util.load_inputs.return_value
+    inputs.config_file = str(config_file)
+    inputs.config_cache = None
+    inputs.trace_file = None
+
+    with pytest.raises(UserConfigError):
+        repo_manager.cli([])
+
+    _fleet.resolve_targets.assert_not_called()
 
 
 def test_no_debug(patch_actors, patch_logging):
@@ -69,3 +176,87 @@ def test_debug_from_environment_and_cli(patch_actors, patch_logging, monkeypatch
     repo_manager.logging.getLogger.return_value.setLevel.assert_called_once_with(
         repo_manager.logging.DEBUG
     )
+
+
+def test_cli_trace_file(patch_actors, mocker, tmpdir):
+    mocker.patch.object(_util, "load_inputs")
+    mocker.patch.object(_util, "load_context")
+    mocker.patch.object(_tracing, "start_tracing")
+    inputs = _util.load_inputs.return_value
+    inputs.aiogithub = None
+    inputs.fleet_manifest = None
+    inputs.trace_file = str(tmpdir.join("trace.json"))
+
+    repo_manager.cli([])
+
+    _tracing.start_tracing.assert_called_once_with()
+    _tracing.start_tracing.return_value.export.assert_called_once_with(inputs.trace_file)
+
+
+def test_cli_validate(mocker, monkeypatch, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("labels: []\nbranches: []\n")
+    monkeypatch.setenv("INPUT_CONFIG-FILE", str(config_file))
+    mocker.patch.object(repo_manager, "_setup_logger")
+    mocker.patch.object(_util, "load_inputs")
+
+    repo_manager.cli(["--validate"])
+
+    _util.load_inputs.assert_not_called()
+
+
+def test_cli_validate_fails(mocker, monkeypatch, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("lables: []\n")
+    monkeypatch.setenv("INPUT_CONFIG-FILE", str(config_file))
+    mocker.patch.object(repo_manager, "_setup_logger")
+
+    with pytest.raises(UserConfigError) as excinfo:
+        repo_manager.cli(["--validate"])
+
+    excinfo.match(
+        "Invalid config file '.*settings.yml' \\(1 error\\):\n  - Unknown config groups: lables"
+    )
+
+
+_HEAVY_MODULES = ("agithub", "aiohttp", "github", "urllib3")
+# Run a command in a fresh interpreter and report which top level modules it loaded.
+_LOADED_MODULES = """
+import sys
+import repo_manager
+try:
+    repo_manager.cli(sys.argv[1:])
+except SystemExit:
+    pass
+print("LOADED", " ".join(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+@pytest.mark.parametrize("args", (["--version"], ["--validate"]))
+def test_trivial_commands_do_not_load_clients(args, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("labels: []\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    env["INPUT_CONFIG-FILE"] = str(config_file)
+    env.pop("INPUT_GITHUB-TOKEN", None)
+
+    result = subprocess.run(  # nosec
+        [sys.executable, "-c", _LOADED_MODULES, *args], env=env, stdout=subprocess.PIPE, check=True,
+    )
+
+    lines = result.stdout.decode("utf-8").splitlines()
+    loaded = set(lines[-1].split()[1:])
+    assert lines[-1].startswith("LOADED")
+    assert not loaded & set(_HEAVY_MODULES)
+
+
+def test_import_does_not_load_dependencies():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    command = "import sys, repo_manager; print(' '.join(sys.modules))"
+
+    result = subprocess.run(  # nosec
+        [sys.executable, "-c", command], env=env, stdout=subprocess.PIPE, check=True
+    )
+
+    loaded = {name.split(".")[0] for name in result.stdout.decode("utf-8").split()}
+    assert not loaded & {"asyncio", "yaml", *_HEAVY_MODULES}
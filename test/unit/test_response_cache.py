@@ -0,0 +1,154 @@
+"""Unit test suite for ``repo_manager._response_cache``."""
+import os
+
+import pytest
+
+from repo_manager._response_cache import CachedEntry, CachePolicy, ResponseCache
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+_ORG = "https://api.github.com/orgs/octo"
+_HEADERS = {"authorization": "token a"}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+@pytest.fixture
+def cache(tmpdir, clock):
+    return ResponseCache(str(tmpdir.join("responses")), clock=clock)
+
+
+def test_hit_until_expired(cache, clock):
+    cache.store(_ORG, _HEADERS, CachedEntry(200, [("ETag", '"a"')], b'{"login": "octo"}'))
+
+    hit = cache.load(_ORG, _HEADERS)
+    clock.now += 86400
+    expired = cache.load(_ORG, _HEADERS)
+
+    assert hit == CachedEntry(200, [("ETag", '"a"')], b'{"login": "octo"}')
+    assert expired is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.stores) == (1, 1, 1)
+    assert os.listdir(cache.directory) == []
+
+
+def test_not_found_cached(cache):
+    url = "https://api.github.com/orgs/someone"
+    cache.store(url, _HEADERS, CachedEntry(404, [], b'{"message": "Not Found"}'))
+
+    test = cache.load(url, _HEADERS)
+
+    assert test.status == 404
+    assert cache.stats.not_found_hits == 1
+
+
+@pytest.mark.parametrize(
+    "url, status",
+    (
+        pytest.param("https://api.github.com/repos/octo/repo/labels", 200, id="route"),
+        pytest.param("https://api.github.com/repos/octo/repo", 200, id="repository"),
+        pytest.param("https://api.github.com/orgs/octo/teams", 404, id="not found"),
+        pytest.param(_ORG, 500, id="error"),
+    ),
+)
+def test_not_stored(cache, url, status):
+    cache.store(url, _HEADERS, CachedEntry(status, [], b"{}"))
+
+    assert cache.load(url, _HEADERS) is None
+    assert cache.stats.stores == 0
+
+
+def test_enterprise_routes(cache):
+    url = "https://github.example.com/api/v3/users/octocat"
+    cache.store(url, _HEADERS, CachedEntry(200, [], b"{}"))
+
+    assert cache.load(url, _HEADERS) is not None
+
+
+def test_keyed_by_credentials(cache):
+    cache.store(_ORG, _HEADERS, CachedEntry(200, [], b"{}"))
+
+    assert cache.load(_ORG, {"authorization": "token b"}) is None
+    assert all(
+        "token" not in open(os.path.join(cache.directory, name)).read()
+        for name in os.listdir(cache.directory)
+    )
+
+
+def test_write_invalidates_path_and_parents(tmpdir, clock):
+    cache = ResponseCache(
+        str(tmpdir.join("responses")),
+        policies={"/repos/{owner}/{repo}": CachePolicy(ttl=60), "/orgs/{org}": CachePolicy(ttl=60)},
+        clock=clock,
+    )
+    repo = "https://api.github.com/repos/octo/repo"
+    cache.store(repo, _HEADERS, CachedEntry(200, [], b'{"topics": []}'))
+    cache.store(_ORG, _HEADERS, CachedEntry(200, [], b"{}"))
+
+    cache.invalidate(f"{repo}/topics")
+    stale = cache.load(repo, _HEADERS)
+    cache.store(repo, _HEADERS, CachedEntry(200, [], b'{"topics": ["new"]}'))
+
+    assert stale is None
+    assert cache.load(repo, _HEADERS).body == b'{"topics": ["new"]}'
+    assert cache.load(_ORG, _HEADERS) is not None
+
+
+def test_least_recently_used_evicted(tmpdir, clock):
+    cache = ResponseCache(str(tmpdir.join("responses")), max_entries=2, clock=clock)
+    urls = [f"https://api.github.com/users/user-{index}" for index in range(3)]
+    cache.store(urls[0], _HEADERS, CachedEntry(200, [], b"0"))
+    cache.store(urls[1], _HEADERS, CachedEntry(200, [], b"1"))
+    # Make the first entry the most recently used.
+    for name in os.listdir(cache.directory):
+        os.utime(os.path.join(cache.directory, name), (1, 1))
+    cache.load(urls[0], _HEADERS)
+
+    cache.store(urls[2], _HEADERS, CachedEntry(200, [], b"2"))
+
+    assert cache.stats.evictions == 1
+    assert len(os.listdir(cache.directory)) == 2
+    assert cache.load(urls[1], _HEADERS) is None
+    assert cache.load(urls[0], _HEADERS).body == b"0"
+    assert cache.load(urls[2], _HEADERS).body == b"2"
+
+
+def test_shared_between_instances(tmpdir, clock):
+    directory = str(tmpdir.join("responses"))
+    ResponseCache(directory, clock=clock).store(_ORG, _HEADERS, CachedEntry(200, [], b"{}"))
+
+    other = ResponseCache(directory, clock=clock)
+
+    assert other.load(_ORG, _HEADERS) is not None
+    assert other.stats.hits == 1
+
+
+def test_unreadable_entry_ignored(cache):
+    cache.store(_ORG, _HEADERS, CachedEntry(200, [], b"{}"))
+    (name,) = os.listdir(cache.directory)
+    with open(os.path.join(cache.directory, name), "w") as raw:
+        raw.write("{")
+
+    assert cache.load(_ORG, _HEADERS) is None
+
+
+def test_custom_policies(tmpdir, clock):
+    cache = ResponseCache(
+        str(tmpdir.join("responses")), policies={"/user": CachePolicy(ttl=10)}, clock=clock,
+    )
+    url = "https://api.github.com/user"
+    cache.store(url, _HEADERS, CachedEntry(200, [], b"{}"))
+    cache.store(_ORG, _HEADERS, CachedEntry(200, [], b"{}"))
+
+    assert cache.load(url, _HEADERS) is not None
+    assert cache.load(_ORG, _HEADERS) is None
@@ -0,0 +1,153 @@
+"""Unit test suite for ``repo_manager._schema``."""
+import datetime
+
+import pytest
+
+from repo_manager._schema import GROUP_SCHEMAS, Schema, check
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+_PROTECTION = dict(
+    required_status_checks=dict(strict=True, contexts=["build"]),
+    enforce_admins=True,
+    required_pull_request_reviews=dict(
+        required_approving_review_count=1,
+        dismiss_stale_reviews=True,
+        dismissal_restrictions=dict(users=[], teams=[]),
+    ),
+    restrictions=None,
+)
+_VALID = dict(
+    labels=[
+        dict(name="bug", color="CC0000", description="An issue with the system"),
+        dict(name="feature", color="#336699"),
+        dict(name="first-timers-only", oldname="Help Wanted", color=336699),
+        dict(name="good first issue", oldname="easy"),
+    ],
+    milestones=[
+        dict(title="v1", state="open", description="First", due_on="2030-01-01T00:00:00"),
+        dict(title="v2", due_on=datetime.datetime(2030, 1, 1)),
+        dict(title="v3", state="closed", due_on=datetime.date(2030, 1, 1)),
+    ],
+    teams=[dict(name="core", permission="admin"), dict(name="docs", permission="push")],
+    collaborators=[dict(username="bkeepers", permission="push")],
+    branches=[dict(name="master", protection=_PROTECTION), dict(name="dev", protection=None)],
+    repository=dict(name="repo", has_wiki=False, topics="github, probot", allow_auto_merge=True),
+)
+
+
+@pytest.mark.parametrize("group", list(_VALID))
+def test_valid(group):
+    assert check(_VALID[group], GROUP_SCHEMAS[group], group) == []
+
+
+def test_all_groups_have_schemas():
+    assert set(GROUP_SCHEMAS) == set(_VALID)
+
+
+@pytest.mark.parametrize(
+    "group, data, errors",
+    (
+        pytest.param(
+            "labels",
+            [dict(name="bug")],
+            ["labels[0]: missing required key 'color'"],
+            id="missing key",
+        ),
+        pytest.param(
+            "labels",
+            [dict(name="bug", color=0)],
+            [
+                "labels[0].color: must be a six digit hex color, not '0'"
+                " (quote colors that YAML reads as numbers)"
+            ],
+            id="numeric color",
+        ),
+        pytest.param(
+            "labels",
+            [dict(name="bug", color="CC0000", colour="CC0000")],
+            ["labels[0]: unknown key 'colour'"],
+            id="unknown key",
+        ),
+        pytest.param(
+            "labels",
+            [dict(name="bug", color="CC0000"), dict(name="Bug", color="CC0000")],
+            ["labels[1]: duplicate name 'Bug' (also at labels[0])"],
+            id="duplicate",
+        ),
+        pytest.param(
+            "labels", dict(name="bug"), ["labels: must be a list, not dict"], id="not a list",
+        ),
+        pytest.param(
+            "milestones",
+            [dict(title="v1", state="done", due_on="next week")],
+            [
+                "milestones[0].state: must be one of open, closed, not 'done'",
+                "milestones[0].due_on: must be an ISO 8601 date and time, not 'next week'",
+            ],
+            id="milestone",
+        ),
+        pytest.param(
+            "teams",
+            [dict(name="core", permission="write")],
+            [
+                "teams[0].permission: must be one of pull, triage, push, maintain, admin, not 'write'"
+            ],
+            id="permission",
+        ),
+        pytest.param(
+            "branches",
+            [dict(name="master", protection=dict(_PROTECTION, enforce_admins="yes"))],
+            ["branches[0].protection.enforce_admins: must be a boolean, not str"],
+            id="nested",
+        ),
+        pytest.param(
+            "branches",
+            [
+                dict(
+                    name="master",
+                    protection=dict(
+                        required_status_checks=dict(strict=True),
+                        required_pull_request_reviews=dict(required_approving_review_count=True),
+                    ),
+                )
+            ],
+            [
+                "branches[0].protection.required_status_checks: missing required key 'contexts'",
+                "branches[0].protection: missing required key 'enforce_admins'",
+                "branches[0].protection.required_pull_request_reviews.required_approving_review_count:"
+                " must be an integer, not bool",
+                "branches[0].protection: missing required key 'restrictions'",
+            ],
+            id="collects all",
+        ),
+        pytest.param(
+            "branches",
+            [dict(name="/release-(/", protection=None)],
+            [
+                "branches[0].name: must be a valid pattern, not '/release-(/'"
+                " (missing ), unterminated subpattern at position 8)"
+            ],
+            id="branch pattern",
+        ),
+        pytest.param(
+            "repository",
+            dict(has_wiki="no"),
+            ["repository.has_wiki: must be a boolean, not str"],
+            id="repository",
+        ),
+    ),
+)
+def test_invalid(group, data, errors):
+    assert check(data, GROUP_SCHEMAS[group], group) == errors
+
+
+def test_case_sensitive_unique():
+    schema = Schema(types=(list,), unique="name")
+
+    assert check([dict(name="main"), dict(name="Main")], schema, "branches") == []
+
+
+def test_null():
+    assert check(None, Schema(types=(str,)), "value") == ["value: must not be null"]
+    assert check(None, Schema(types=(str,), nullable=True), "value") == []
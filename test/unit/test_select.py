@@ -0,0 +1,123 @@
+"""Unit test suite for ``repo_manager._select``."""
+import subprocess
+
+import pytest
+
+from repo_manager._select import load_previous_config, select_groups, split_groups
+from repo_manager.exceptions import UserConfigError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+_CONFIG = dict(repository=dict(private=True), labels=[dict(name="bug")], teams=[])
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    (
+        ("", ()),
+        ("labels", ("labels",)),
+        ("labels, teams", ("labels", "teams")),
+        ("a b,,c", ("a", "b", "c")),
+    ),
+)
+def test_split_groups(raw, expected):
+    assert split_groups(raw) == expected
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected",
+    (
+        (dict(), ["repository", "labels", "teams"]),
+        (dict(only=["labels"]), ["labels"]),
+        (dict(skip=["labels"]), ["repository", "teams"]),
+        (dict(only=["labels", "teams"], skip=["teams"]), ["labels"]),
+        (dict(previous=dict(_CONFIG, teams=[dict(name="admins")])), ["teams"]),
+        (dict(previous=dict(repository=dict(private=True))), ["labels", "teams"]),
+        (dict(previous=_CONFIG), []),
+    ),
+)
+def test_select_groups(kwargs, expected):
+    assert list(select_groups(_CONFIG, **kwargs)) == expected
+
+
+def test_select_groups_unknown_group():
+    with pytest.raises(UserConfigError) as excinfo:
+        select_groups(_CONFIG, only=["milestones", "labels", "branches"])
+
+    excinfo.match("Unknown config groups in only: branches, milestones")
+
+
+def test_load_previous_config_none(tmpdir):
+    assert load_previous_config(str(tmpdir.join("settings.yml"))) is None
+
+
+def test_load_previous_config_file(tmpdir):
+    previous = tmpdir.join("previous.yml")
+    previous.write("labels: []\n")
+
+    assert load_previous_config("settings.yml", previous_config_file=str(previous)) == dict(
+        labels=[]
+    )
+
+
+def test_load_previous_config_both_set():
+    with pytest.raises(UserConfigError) as excinfo:
+        load_previous_config("settings.yml", previous_config_file="a.yml", previous_ref="HEAD~1")
+
+    excinfo.match("Only one of previous config file or previous ref can be set")
+
+
+def _git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=str(cwd),
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+
+
+def test_load_previous_config_git(tmpdir):
+    _git(tmpdir, "init", "-q")
+    config = tmpdir.mkdir(".github").join("settings.yml")
+    config.write("labels: []\n")
+    _git(tmpdir, "add", ".")
+    _git(tmpdir, "commit", "-q", "-m", "first")
+    config.write("labels: []\nteams: []\n")
+
+    assert load_previous_config(str(config), previous_ref="HEAD") == dict(labels=[])
+    assert load_previous_config(str(config), previous_ref="does-not-exist") is None
+
+
+def test_load_previous_config_option_ref():
+    with pytest.raises(UserConfigError) as excinfo:
+        load_previous_config("settings.yml", previous_ref="--output=/tmp/x")
+
+    excinfo.match("Previous ref must not start with '-'")
+
+
+@pytest.mark.parametrize(
+    "workspace, expected",
+    (
+        pytest.param(None, ["git", "show", "HEAD~1:./settings.yml"], id="local"),
+        pytest.param(
+            "/github/workspace",
+            ["git", "-c", "safe.directory=/github/workspace", "show", "HEAD~1:./settings.yml"],
+            id="action",
+        ),
+    ),
+)
+def test_load_previous_config_git_trusts_only_workspace(monkeypatch, workspace, expected):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 0, stdout=b"labels: []\n", stderr=b"")
+
+    if workspace is None:
+        monkeypatch.delenv("GITHUB_WORKSPACE", raising=False)
+    else:
+        monkeypatch.setenv("GITHUB_WORKSPACE", workspace)
+    monkeypatch.setattr(subprocess, "run", run)
+
+    assert load_previous_config("settings.yml", previous_ref="HEAD~1") == dict(labels=[])
+    assert commands == [expected]
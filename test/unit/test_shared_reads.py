@@ -0,0 +1,35 @@
+"""Unit test suite for ``repo_manager._shared_reads``."""
+import pytest
+
+from repo_manager._shared_reads import current_reads, share_reads
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+def test_share_reads_scope():
+    assert current_reads() is None
+
+    with share_reads() as reads:
+        assert current_reads() is reads
+
+    assert current_reads() is None
+
+
+def test_write_forgets_responses():
+    with share_reads() as reads:
+        reads.store("labels", "first", reads.generation)
+        loaded = reads.load("labels")
+        reads.write()
+
+    assert loaded == "first"
+    assert reads.load("labels") is None
+    assert reads.wrote
+
+
+def test_response_read_during_write_not_kept():
+    with share_reads() as reads:
+        generation = reads.generation
+        reads.write()
+        reads.store("labels", "stale", generation)
+
+    assert reads.load("labels") is None
@@ -0,0 +1,97 @@
+"""Unit test suite for ``repo_manager._state``."""
+import json
+
+import pytest
+
+from repo_manager._state import (
+    CustomPropertyStateStore,
+    LocalStateStore,
+    Records,
+    digest,
+    fingerprint,
+    load_state_store,
+)
+from repo_manager.exceptions import UserConfigError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+def test_digest_ignores_key_order():
+    assert digest(dict(a=1, b=[1, 2])) == digest(dict(b=[1, 2], a=1))
+    assert digest(dict(a=1, b=[1, 2])) != digest(dict(a=1, b=[2, 1]))
+
+
+def test_fingerprint_covers_config_and_state():
+    base = fingerprint([{"name": "bug"}], [["bug", "cc0000"]])
+
+    assert len(base) == 32
+    assert base != fingerprint([{"name": "bug"}], [["bug", "000000"]])
+    assert base != fingerprint([{"name": "fix"}], [["bug", "cc0000"]])
+
+
+def test_local_state_store_round_trip(tmpdir):
+    path = tmpdir.join("nested", "state.json")
+    store = LocalStateStore(str(path))
+
+    assert store.load("foo/bar") == {}
+
+    store.update("foo/bar", "labels", "abc")
+    store.update("foo/bar", "teams", "def")
+    store.update("foo/baz", "labels", "ghi")
+
+    assert store.load("foo/bar") == dict(labels="abc", teams="def")
+    assert json.loads(path.read())["foo/baz"] == dict(labels="ghi")
+
+
+def test_local_state_store_ignores_corrupt_file(tmpdir):
+    path = tmpdir.join("state.json")
+    path.write("{not json")
+
+    assert LocalStateStore(str(path)).load("foo/bar") == {}
+
+
+def test_custom_property_state_store(mocker):
+    agithub = mocker.MagicMock()
+    values = agithub.repos["foo"]["bar"].properties.values
+    values.get.return_value = (
+        200,
+        [dict(property_name="repo-manager-state", value='{"labels":"abc"}')],
+    )
+    values.patch.return_value = (204, None)
+    store = CustomPropertyStateStore(agithub, "repo-manager-state")
+
+    assert store.load("foo/bar") == dict(labels="abc")
+
+    store.update("foo/bar", "teams", "def")
+
+    values.patch.assert_called_once_with(
+        body=dict(
+            properties=[
+                dict(property_name="repo-manager-state", value='{"labels":"abc","teams":"def"}')
+            ]
+        )
+    )
+
+
+def test_load_state_store(tmpdir):
+    assert load_state_store(None, "", "") is None
+    assert isinstance(load_state_store(None, str(tmpdir.join("s.json")), ""), LocalStateStore)
+    assert isinstance(load_state_store(None, "", "prop"), CustomPropertyStateStore)
+
+    with pytest.raises(UserConfigError) as excinfo:
+        load_state_store(None, "state.json", "prop")
+
+    excinfo.match("Only one of state file or state property can be set")
+
+
+def test_records_load_once(mocker):
+    store = mocker.Mock()
+    store.load.return_value = dict(labels="abc")
+    records = Records(store, "foo/bar")
+
+    assert records.get("labels") == "abc"
+    records.update("branches:release/*", "def")
+    assert records.get("branches:release/*") == "def"
+    assert records.get("missing") is None
+    store.load.assert_called_once_with("foo/bar")
+    store.update.assert_called_once_with("foo/bar", "branches:release/*", "def")
@@ -0,0 +1,76 @@
+"""Unit test suite for ``repo_manager._team_directory``."""
+import threading
+import time
+
+import pytest
+
+from repo_manager._team_directory import TeamDirectory
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _organization(mocker, *teams, login="Org", delay=0.0):
+    organization = mocker.Mock(login=login)
+
+    def _team(slug, name):
+        team = mocker.Mock(slug=slug)
+        # ``name`` names the mock itself when passed to the constructor.
+        team.name = name
+        return team
+
+    def _get_teams():
+        time.sleep(delay)
+        return [_team(slug, name) for slug, name in teams]
+
+    organization.get_teams.side_effect = _get_teams
+    return organization
+
+
+def test_teams_by_slug_and_name(mocker):
+    organization = _organization(mocker, ("core", "Core Team"), ("docs", "core"))
+
+    test = TeamDirectory().teams(organization)
+
+    assert test["core team"].slug == "core"
+    assert test["docs"].slug == "docs"
+    # A name never hides another team's slug.
+    assert test["core"].slug == "core"
+
+
+def test_teams_cached_until_ttl(mocker):
+    clock = _Clock()
+    organization = _organization(mocker, ("core", "Core"))
+    directory = TeamDirectory(ttl=60, clock=clock)
+
+    assert directory.cached(organization) is None
+    first = directory.teams(organization)
+    clock.now = 59
+    assert directory.teams(mocker.Mock(login="org")) is first
+    assert directory.cached(organization) is first
+    assert organization.get_teams.call_count == 1
+
+    clock.now = 60
+    assert directory.cached(organization) is None
+    directory.teams(organization)
+    assert organization.get_teams.call_count == 2
+
+
+def test_teams_listed_once_across_threads(mocker):
+    organization = _organization(mocker, ("core", "Core"), delay=0.05)
+    directory = TeamDirectory()
+
+    threads = [threading.Thread(target=directory.teams, args=(organization,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert organization.get_teams.call_count == 1
@@ -0,0 +1,135 @@
+"""Unit test suite for ``repo_manager._tracing``."""
+import asyncio
+import json
+
+import pytest
+
+import repo_manager._groups
+from repo_manager._tracing import (
+    collect_spans,
+    current_span,
+    ensure_tracing,
+    route_template,
+    span,
+    start_tracing,
+    stop_tracing,
+)
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+@pytest.fixture
+def tracer():
+    yield start_tracing()
+    stop_tracing()
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    (
+        ("https://api.github.com/repos/foo/bar", "/repos/{owner}/{repo}"),
+        ("https://api.github.com/repos/foo/bar/labels?page=2", "/repos/{owner}/{repo}/labels"),
+        ("https://api.github.com/repos/foo/bar/labels/bug", "/repos/{owner}/{repo}/labels/{name}"),
+        (
+            "http://localhost:8080/repos/foo/bar/branches/master/protection",
+            "/repos/{owner}/{repo}/branches/{branch}/protection",
+        ),
+        ("https://api.github.com/teams/42/repos/foo/bar", "/teams/{team}/repos/{owner}/{repo}"),
+        ("https://api.github.com/orgs/foo", "/orgs/{org}"),
+    ),
+)
+def test_route_template(url, expected):
+    assert route_template(url) == expected
+
+
+def test_span_is_a_no_op_without_tracer():
+    with span("run", "run") as test:
+        test.set(status=200)
+        assert current_span() is test
+
+
+def test_spans_nest_across_group_threads(tracer):
+    def _handler():
+        with span("GET /repos/{owner}/{repo}", "http"):
+            pass
+
+    with span("run", "run"):
+        repo_manager._groups.apply_config(dict(repository=_handler, labels=_handler))
+
+    spans = {(item.category, item.name): item for item in tracer.spans}
+    run = spans[("run", "run")]
+    assert spans[("group", "labels")].parent_id == run.span_id
+    assert spans[("group", "repository")].parent_id == run.span_id
+    parents = {item.parent_id for item in tracer.spans if item.category == "http"}
+    assert parents == {spans[("group", "labels")].span_id, spans[("group", "repository")].span_id}
+
+
+def test_spans_nest_across_async_groups(tracer):
+    async def _handler():
+        with span("GET /repos/{owner}/{repo}", "http"):
+            await asyncio.sleep(0)
+
+    async def _run():
+        with span("run", "run"):
+            await repo_manager._groups.apply_config_async(dict(labels=_handler))
+
+    asyncio.run(_run())
+
+    run, group, request = sorted(tracer.spans, key=lambda item: item.span_id)
+    assert group.parent_id == run.span_id
+    assert request.parent_id == group.span_id
+
+
+def test_failed_span_records_error(tracer):
+    with pytest.raises(ValueError):
+        with span("run", "run"):
+            raise ValueError("boom")
+
+    assert tracer.spans[0].attributes["error"] == "ValueError('boom')"
+
+
+def test_collect_spans_across_group_threads(tracer):
+    def _handler():
+        with span("GET /repos/{owner}/{repo}", "http"):
+            pass
+
+    with span("before", "run"):
+        pass
+    with collect_spans() as collected:
+        repo_manager._groups.apply_config(dict(labels=_handler))
+    with span("after", "run"):
+        pass
+
+    assert sorted(item.name for item in collected) == ["GET /repos/{owner}/{repo}", "labels"]
+    assert len(tracer.spans) == 4
+
+
+def test_collect_spans_without_recording():
+    tracer = ensure_tracing(record=False)
+    try:
+        with collect_spans() as collected:
+            with span("run", "run"):
+                pass
+    finally:
+        stop_tracing()
+
+    assert [item.name for item in collected] == ["run"]
+    assert tracer.spans == []
+
+
+def test_export_chrome_trace(tracer, tmpdir):
+    with span("run", "run"):
+        with span("GET /orgs/{org}", "http", method="GET") as request:
+            request.set(status=200)
+
+    path = str(tmpdir.join("trace.json"))
+    tracer.export(path)
+
+    with open(path) as raw:
+        events = json.load(raw)["traceEvents"]
+    complete = [event for event in events if event["ph"] == "X"]
+    assert [event["name"] for event in complete] == ["run", "GET /orgs/{org}"]
+    assert complete[1]["args"]["status"] == 200
+    assert complete[1]["args"]["parent_id"] == complete[0]["args"]["span_id"]
+    assert complete[0]["dur"] >= complete[1]["dur"]
+    assert any(event["ph"] == "M" for event in events)
@@ -0,0 +1,183 @@
+"""Unit test suite for ``repo_manager._transport``."""
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from agithub.GitHub import GitHub
+from github import Github
+from github.Requester import Requester
+
+from repo_manager._etag_cache import ETagCache
+from repo_manager._response_cache import ResponseCache
+from repo_manager._shared_reads import share_reads
+from repo_manager._transport import Transport
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    limited = 0
+
+    def do_GET(self):  # noqa: N802
+        if self.path == "/limited" and _Handler.limited > 0:
+            _Handler.limited -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "7")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"abc"':
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.etag = '"abc"'
+        else:
+            self.etag = None
+
+        if self.path.startswith("/repos/"):
+            _owner, name = self.path.split("/")[2:4]
+            payload = dict(name=name, full_name=f"{_owner}/{name}")
+        else:
+            payload = dict(path=self.path)
+        body = json.dumps(payload).encode("utf-8")
+        encoding = None
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            encoding = "gzip"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def reset_pygithub():
+    yield
+    Requester.resetConnectionClasses()
+
+
+def test_request_reuses_connection_and_decodes_gzip(server):
+    transport = Transport()
+
+    first = transport.request("GET", f"http://{server}/a")
+    second = transport.request("GET", f"http://{server}/b")
+
+    assert json.loads(first.body) == dict(path="/a")
+    assert json.loads(second.body) == dict(path="/b")
+    assert first.getheader("content-encoding") is None
+    assert transport.stats.requests == 2
+    assert transport.stats.connections_opened == 1
+    assert transport.stats.connections_reused == 1
+
+
+def test_clients_share_transport(server, reset_pygithub):
+    transport = Transport()
+    transport.install_pygithub()
+    api = GitHub(token="token", paginate=True, api_url=server)
+    api.client.prop.secure_http = False
+    transport.attach_agithub(api)
+    github = Github("token", base_url=f"http://{server}")
+
+    status, data = api.orgs.foo.get()
+    repo = github.get_repo("foo/bar")
+
+    assert status == 200
+    assert data == dict(path="/orgs/foo")
+    assert repo.name == "bar"
+    assert transport.stats.requests == 2
+    assert transport.stats.connections_opened == 1
+
+
+def test_etag_cache_serves_not_modified(server, tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    first_run = Transport(etag_cache=ETagCache(cache_dir))
+    first = first_run.request("GET", f"http://{server}/etag", headers={"Authorization": "token a"})
+
+    second_run = Transport(etag_cache=ETagCache(cache_dir))
+    second = second_run.request(
+        "GET", f"http://{server}/etag", headers={"Authorization": "token a"}
+    )
+
+    assert first.status == second.status == 200
+    assert json.loads(second.body) == dict(path="/etag")
+    assert first_run.stats.not_modified == 0
+    assert second_run.stats.not_modified == 1
+
+
+def test_etag_cache_keyed_by_credentials(server, tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    Transport(etag_cache=ETagCache(cache_dir)).request(
+        "GET", f"http://{server}/etag", headers={"Authorization": "token a"}
+    )
+
+    other = Transport(etag_cache=ETagCache(cache_dir))
+    other.request("GET", f"http://{server}/etag", headers={"Authorization": "token b"})
+
+    assert other.stats.not_modified == 0
+    assert all("token" not in path.read() for path in tmpdir.join("cache").listdir())
+
+
+def test_rate_limited_request_is_retried(server):
+    _Handler.limited = 1
+    sleeps = []
+    transport = Transport(sleep=sleeps.append)
+
+    test = transport.request("GET", f"http://{server}/limited")
+
+    assert test.status == 200
+    assert sleeps == [pytest.approx(7.0, abs=0.5)]
+    assert transport.stats.requests == 2
+
+
+def test_response_cache_skips_request(server, tmpdir):
+    cache_dir = str(tmpdir.join("responses"))
+    first_run = Transport(response_cache=ResponseCache(cache_dir))
+    first_run.request("GET", f"http://{server}/orgs/foo", headers={"Authorization": "token a"})
+
+    second_run = Transport(response_cache=ResponseCache(cache_dir))
+    test = second_run.request(
+        "GET", f"http://{server}/orgs/foo", headers={"Authorization": "token a"}
+    )
+    uncached = second_run.request("GET", f"http://{server}/etag")
+
+    assert json.loads(test.body) == dict(path="/orgs/foo")
+    assert uncached.status == 200
+    assert second_run.stats.requests == 1
+    assert second_run.response_cache.stats.hits == 1
+
+
+def test_shared_reads_skip_repeated_request(server):
+    transport = Transport()
+
+    with share_reads() as reads:
+        first = transport.request("GET", f"http://{server}/orgs/foo")
+        second = transport.request("GET", f"http://{server}/orgs/foo")
+    outside = transport.request("GET", f"http://{server}/orgs/foo")
+
+    assert first.body == second.body == outside.body
+    assert transport.stats.requests == 2
+    assert not reads.wrote
@@ -1,12 +1,19 @@
 """Unit test suite for ``repo_manager._util``."""
+import os
 from dataclasses import dataclass
 from typing import Dict, Sequence
 
 import pytest
+from github.GithubException import UnknownObjectException
 
 import repo_manager._util
 from repo_manager._util import (
+    HandlerRequest,
+    RepoContext,
+    RepoResources,
     _load_from_environment,
+    arepo_request,
+    github_client,
     load_context,
     load_inputs,
     permission_to_string,
@@ -20,6 +27,7 @@ pytestmark = [pytest.mark.local, pytest.mark.unit]
 def mock_github(mocker):
     mocker.patch.object(repo_manager._util, "Github")
     mocker.patch.object(repo_manager._util, "GitHub")
+    mocker.patch.object(repo_manager._util, "Transport")
 
 
 def apply_environment_variables(patcher, variables: Dict[str, str]):
@@ -82,14 +90,69 @@ def test_load_inputs(
 
     test = load_inputs()
 
-    repo_manager._util.Github.assert_called_once_with(environment_variables["INPUT_GITHUB-TOKEN"])
+    repo_manager._util.Github.assert_called_once_with(
+        environment_variables["INPUT_GITHUB-TOKEN"], per_page=100
+    )
     repo_manager._util.GitHub.assert_called_once_with(
         token=environment_variables["INPUT_GITHUB-TOKEN"], paginate=True
     )
     assert test.github is repo_manager._util.Github.return_value
     assert test.agithub is repo_manager._util.GitHub.return_value
+    repo_manager._util.Transport.assert_called_once_with(etag_cache=None, response_cache=None)
+    transport = repo_manager._util.Transport.return_value
+    assert test.transport is transport
+    transport.install_pygithub.assert_called_once_with()
+    transport.attach_agithub.assert_called_once_with(test.agithub)
     assert test.config_file == config_file
     assert test.debug is debug
+    assert test.max_workers == 4
+    assert test.write_workers == 4
+
+
+@pytest.mark.parametrize(
+    "max_workers, expected",
+    (
+        pytest.param("", 4, id="empty uses default"),
+        pytest.param("1", 1, id="serial"),
+        pytest.param("16", 16, id="wide"),
+    ),
+)
+def test_load_inputs_max_workers(max_workers: str, expected: int, mock_github, monkeypatch):
+    apply_environment_variables(
+        monkeypatch, dict(**_BASELINE, **{"INPUT_MAX-WORKERS": max_workers})
+    )
+
+    test = load_inputs()
+
+    assert test.max_workers == expected
+
+
+def test_load_inputs_write_workers(mock_github, monkeypatch):
+    apply_environment_variables(monkeypatch, dict(**_BASELINE, **{"INPUT_WRITE-WORKERS": "1"}))
+
+    test = load_inputs()
+
+    assert test.write_workers == 1
+
+
+@pytest.mark.parametrize(
+    "max_workers, expected_error_message",
+    (
+        pytest.param("many", "Invalid max workers value *", id="not a number"),
+        pytest.param("0", "Max workers must be at least 1*", id="zero"),
+    ),
+)
+def test_load_inputs_max_workers_fail(
+    max_workers: str, expected_error_message: str, mock_github, monkeypatch
+):
+    apply_environment_variables(
+        monkeypatch, dict(**_BASELINE, **{"INPUT_MAX-WORKERS": max_workers})
+    )
+
+    with pytest.raises(UserConfigError) as excinfo:
+        load_inputs()
+
+    excinfo.match(expected_error_message)
 
 
 @pytest.mark.parametrize(
@@ -249,3 +312,165 @@ def test_load_from_environment_fails(
         _load_from_environment(*names, kind="Test")
 
     excinfo.match("Test not set")
+
+
+def test_repo_resources_memoized(mocker):
+    inputs = mocker.Mock()
+    resources = RepoResources(inputs, RepoContext(owner="foo", repo="bar"))
+
+    first = resources.repository
+    second = resources.repository
+
+    assert first is second is inputs.github.get_repo.return_value
+    inputs.github.get_repo.assert_called_once_with(full_name_or_id="foo/bar")
+    inputs.github.get_organization.assert_not_called()
+
+
+def test_repo_resources_personal_owner(mocker):
+    inputs = mocker.Mock()
+    inputs.github.get_organization.side_effect = UnknownObjectException(404, {}, {})
+    inputs.agithub.orgs.foo.get.return_value = (404, {})
+    resources = RepoResources(inputs, RepoContext(owner="foo", repo="bar"))
+
+    assert resources.organization is None
+    assert resources.organization is None
+    assert resources.aorg is None
+    assert resources.aorg is None
+    inputs.github.get_organization.assert_called_once_with("foo")
+    inputs.agithub.orgs.foo.get.assert_called_once_with()
+
+
+def test_handler_request_resolves_declared(mocker):
+    resources = mocker.Mock()
+    request = HandlerRequest(data=[], resources=resources, requires=("repository",))
+
+    assert request.repository is resources.repository
+
+
+def test_handler_request_rejects_undeclared(mocker):
+    request = HandlerRequest(data=[], resources=mocker.Mock(), requires=("repository",))
+
+    with pytest.raises(RepoAdminError) as excinfo:
+        request.organization
+
+    excinfo.match("Handler did not declare that it requires 'organization'")
+
+
+def test_handler_request_explicit_values(mocker):
+    repository = mocker.Mock()
+
+    request = HandlerRequest(data=[], repository=repository)
+
+    assert request.repository is repository
+    assert request.organization is None
+
+
+def test_handler_request_requires_source():
+    with pytest.raises(ValueError):
+        HandlerRequest(data=[])
+
+
+def test_load_inputs_cache_dir(mock_github, monkeypatch, tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    apply_environment_variables(monkeypatch, dict(**_BASELINE, **{"INPUT_CACHE-DIR": cache_dir}))
+
+    load_inputs()
+
+    _args, kwargs = repo_manager._util.Transport.call_args
+    assert kwargs["etag_cache"].directory == cache_dir
+    assert kwargs["response_cache"].directory == os.path.join(cache_dir, "responses")
+
+
+def test_load_inputs_state_file(mock_github, monkeypatch, tmpdir):
+    state_file = str(tmpdir.join("state.json"))
+    apply_environment_variables(monkeypatch, dict(**_BASELINE, **{"INPUT_STATE-FILE": state_file}))
+
+    test = load_inputs()
+
+    assert test.state_store.path == state_file
+
+
+def test_load_inputs_graphql_reads(mock_github, monkeypatch):
+    apply_environment_variables(monkeypatch, dict(**_BASELINE, **{"INPUT_GRAPHQL-READS": "true"}))
+
+    assert load_inputs().graphql_reads is True
+
+
+def test_repo_resources_state(mocker):
+    fetch_state = mocker.patch.object(repo_manager._util, "fetch_state", autospec=True)
+    inputs = mocker.Mock(graphql_reads=True)
+    config = dict(labels=[], teams=[], repository={})
+    resources = RepoResources(inputs, RepoContext(owner="foo", repo="bar"), config)
+
+    assert resources.state is resources.state is fetch_state.return_value
+    fetch_state.assert_called_once_with(inputs.agithub, "foo", "bar", dict(labels=[]))
+
+
+@pytest.mark.parametrize(
+    "graphql_reads, config",
+    (
+        pytest.param(False, dict(labels=[]), id="off"),
+        pytest.param(True, dict(teams=[]), id="no-graphql-groups"),
+    ),
+)
+def test_repo_resources_state_not_read(mocker, graphql_reads, config):
+    fetch_state = mocker.patch.object(repo_manager._util, "fetch_state", autospec=True)
+    inputs = mocker.Mock(graphql_reads=graphql_reads)
+    resources = RepoResources(inputs, RepoContext(owner="foo", repo="bar"), config)
+
+    assert resources.state is None
+    fetch_state.assert_not_called()
+
+
+def test_arepo_request(mocker):
+    arepo = mocker.Mock(url="/repos/foo/bar")
+    arepo.client.patch.return_value = (200, dict(name="needs review"))
+
+    response = arepo_request(
+        arepo, "PATCH", "labels", "help wanted/triage", body=dict(color="000000")
+    )
+
+    assert response == dict(name="needs review")
+    arepo.client.patch.assert_called_once_with(
+        "/repos/foo/bar/labels/help%20wanted%2Ftriage", body=dict(color="000000"), headers=None
+    )
+    assert arepo.url == "/repos/foo/bar"
+
+
+def test_arepo_request_fails(mocker):
+    arepo = mocker.Mock(url="/repos/foo/bar")
+    arepo.client.delete.return_value = (404, dict(message="Not Found"))
+
+    with pytest.raises(RepoAdminError) as excinfo:
+        arepo_request(arepo, "DELETE", "milestones", 3)
+
+    excinfo.match("STATUS 404")
+    arepo.client.delete.assert_called_once_with("/repos/foo/bar/milestones/3", headers=None)
+
+
+def test_load_inputs_group_selection(mock_github, monkeypatch):
+    apply_environment_variables(
+        monkeypatch,
+        dict(**_BASELINE, **{"INPUT_ONLY": "labels, teams", "INPUT_PREVIOUS-REF": "HEAD~1"}),
+    )
+
+    test = load_inputs()
+
+    assert test.only == ("labels", "teams")
+    assert test.skip == ()
+    assert test.previous_ref == "HEAD~1"
+    assert test.previous_config_file is None
+
+
+def test_github_client_disables_client_pacing(mocker):
+    mocker.patch.object(repo_manager._util, "Github", autospec=True)
+
+    github_client("token", base_url="http://localhost")
+
+    repo_manager._util.Github.assert_called_once_with(
+        "token",
+        per_page=100,
+        base_url="http://localhost",
+        seconds_between_requests=None,
+        seconds_between_writes=None,
+    )
@@ -0,0 +1,100 @@
+"""Unit test suite for ``repo_manager._validate``."""
+import os
+
+import pytest
+
+from repo_manager._validate import (
+    config_errors,
+    known_groups,
+    validate_config,
+    validate_config_file,
+)
+from repo_manager.exceptions import UserConfigError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+_VECTORS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vectors")
+
+
+def test_known_groups():
+    assert known_groups() == (
+        "branches",
+        "collaborators",
+        "labels",
+        "milestones",
+        "repository",
+        "teams",
+    )
+
+
+def test_validate_config_file(tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("labels:\n  - name: bug\n    color: CC0000\nrepository:\n  has_wiki: false\n")
+
+    config = validate_config_file(str(config_file))
+
+    assert config == dict(
+        labels=[dict(name="bug", color="CC0000")], repository=dict(has_wiki=False)
+    )
+
+
+def test_validate_config_file_vector():
+    config = validate_config_file(os.path.join(_VECTORS, "settings.yml"))
+
+    assert known_groups() == tuple(sorted(config))
+
+
+def test_validate_config_file_empty(tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write("")
+
+    assert validate_config_file(str(config_file)) == {}
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    (
+        pytest.param("labels: [\n", "is not valid YAML", id="yaml"),
+        pytest.param("- labels\n", "must map group names to settings", id="not mapping"),
+        pytest.param(
+            "lables: []\nteems: []\n", "Unknown config groups: lables, teems", id="unknown"
+        ),
+    ),
+)
+def test_validate_config_file_fails(content, message, tmpdir):
+    config_file = tmpdir.join("settings.yml")
+    config_file.write(content)
+
+    with pytest.raises(UserConfigError) as excinfo:
+        validate_config_file(str(config_file))
+
+    excinfo.match(message)
+
+
+def test_validate_config_file_missing(tmpdir):
+    with pytest.raises(UserConfigError) as excinfo:
+        validate_config_file(str(tmpdir.join("missing.yml")))
+
+    excinfo.match("Unable to read config file")
+
+
+def test_config_errors_collects_all_groups():
+    config = dict(
+        labels=[dict(name="bug")], teams=[dict(name="core", permission="write")], lables=[],
+    )
+
+    assert config_errors(config) == [
+        "Unknown config groups: lables",
+        "labels[0]: missing required key 'color'",
+        "teams[0].permission: must be one of pull, triage, push, maintain, admin, not 'write'",
+    ]
+
+
+def test_validate_config_reports_count():
+    with pytest.raises(UserConfigError) as excinfo:
+        validate_config(dict(labels=[dict(name="bug"), dict(color="CC0000")]), "test config")
+
+    assert str(excinfo.value) == (
+        "Invalid test config (2 errors):\n"
+        "  - labels[0]: missing required key 'color'\n"
+        "  - labels[1]: missing required key 'name'"
+    )
@@ -0,0 +1,75 @@
+"""Unit test suite for ``repo_manager._verify``."""
+import pytest
+
+from repo_manager._tracing import ensure_tracing, span, start_tracing, stop_tracing
+from repo_manager._verify import is_write, no_writes
+from repo_manager.exceptions import IdempotencyError
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+@pytest.fixture(autouse=True)
+def _stop_tracing():
+    yield
+    stop_tracing()
+
+
+def _request(method, route, path="", status=200):
+    with span(f"{method} {route}", "http", method=method, route=route, path=path) as request:
+        request.set(status=status)
+
+
+@pytest.mark.parametrize(
+    "method, route, expected",
+    (
+        ("GET", "/repos/{owner}/{repo}/labels", False),
+        ("HEAD", "/repos/{owner}/{repo}", False),
+        ("POST", "/graphql", False),
+        ("POST", "/repos/{owner}/{repo}/labels", True),
+        ("patch", "/repos/{owner}/{repo}", True),
+        ("DELETE", "/repos/{owner}/{repo}/invitations/{invitation_id}", True),
+    ),
+)
+def test_is_write(method, route, expected):
+    assert is_write(method, route) is expected
+
+
+def test_no_writes_passes_reads():
+    with no_writes("'foo/bar'"):
+        with span("labels", "group"):
+            _request("GET", "/repos/{owner}/{repo}/labels")
+            _request("POST", "/graphql")
+
+
+def test_no_writes_lists_writes():
+    tracer = start_tracing()
+    # Writes outside the checked block are not counted.
+    _request("PATCH", "/repos/{owner}/{repo}", "/repos/foo/bar")
+
+    with pytest.raises(IdempotencyError) as excinfo:
+        with no_writes("'foo/bar'"):
+            with span("branches", "group"):
+                _request("GET", "/repos/{owner}/{repo}/branches/{branch}/protection")
+                _request(
+                    "PUT",
+                    "/repos/{owner}/{repo}/branches/{branch}/protection",
+                    "/repos/foo/bar/branches/main/protection",
+                )
+            _request(
+                "DELETE", "/repos/{owner}/{repo}/labels/{name}", "/repos/foo/bar/labels/x", 404
+            )
+
+    assert str(excinfo.value) == (
+        "Applying the config to 'foo/bar' a second time sent 2 writes:\n"
+        "  - PUT /repos/foo/bar/branches/main/protection (STATUS 200)\n"
+        "  - DELETE /repos/foo/bar/labels/x (STATUS 404)"
+    )
+    assert ensure_tracing() is tracer
+
+
+def test_no_writes_does_not_keep_spans():
+    with no_writes("'foo/bar'"):
+        _request("GET", "/repos/{owner}/{repo}/labels")
+
+    # Tracing was started for the check only, so nothing is kept for export.
+    assert ensure_tracing().spans == []
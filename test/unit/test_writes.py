@@ -0,0 +1,132 @@
+"""Unit test suite for ``repo_manager._writes``."""
+import asyncio
+import threading
+import time
+from functools import partial
+
+import pytest
+
+from repo_manager._writes import Write, _dependencies, run_writes, run_writes_async
+
+pytestmark = [pytest.mark.local, pytest.mark.unit]
+
+
+class _Recorder:
+    """Record when each write starts and finishes, and how many run at once."""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.events = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _start(self, name: str):
+        with self._lock:
+            self.events.append(("start", name))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _finish(self, name: str):
+        with self._lock:
+            self.active -= 1
+            self.events.append(("finish", name))
+
+    def send(self, name: str, fail: bool = False):
+        self._start(name)
+        time.sleep(self.delay)
+        self._finish(name)
+        if fail:
+            raise ValueError(name)
+
+    async def send_async(self, name: str, fail: bool = False):
+        self._start(name)
+        await asyncio.sleep(self.delay)
+        self._finish(name)
+        if fail:
+            raise ValueError(name)
+
+    def before(self, first: str, second: str) -> bool:
+        return self.events.index(("finish", first)) < self.events.index(("start", second))
+
+    def started(self):
+        return {name for event, name in self.events if event == "start"}
+
+
+def _writes(send, *specs):
+    return [
+        Write(keys=frozenset(keys), send=partial(send, name, **kwargs))
+        for name, keys, kwargs in specs
+    ]
+
+
+_SPECS = (
+    ("rename", {"help wanted", "first-timers-only"}, {}),
+    ("delete", {"stale"}, {}),
+    ("edit", {"first-timers-only"}, {}),
+    ("create", {"help wanted"}, {}),
+    ("other", {"bug"}, {}),
+)
+
+
+def test_dependencies():
+    writes = _writes(lambda name: None, *_SPECS)
+
+    assert _dependencies(writes) == [set(), set(), {0}, {0}, set()]
+
+
+def _run(recorder, specs, use_async, max_workers):
+    if use_async:
+        asyncio.run(run_writes_async(_writes(recorder.send_async, *specs), max_workers=max_workers))
+    else:
+        run_writes(_writes(recorder.send, *specs), max_workers=max_workers)
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_run_writes_keeps_order_of_shared_keys(use_async):
+    recorder = _Recorder()
+
+    _run(recorder, _SPECS, use_async, max_workers=2)
+
+    assert recorder.started() == {"rename", "delete", "edit", "create", "other"}
+    assert recorder.before("rename", "edit")
+    assert recorder.before("rename", "create")
+    assert recorder.peak == 2
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_run_writes_bounded(use_async):
+    recorder = _Recorder()
+    specs = [(f"label-{index}", {f"label-{index}"}, {}) for index in range(12)]
+
+    _run(recorder, specs, use_async, max_workers=3)
+
+    assert len(recorder.started()) == 12
+    assert recorder.peak == 3
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_run_writes_one_worker_is_sequential(use_async):
+    recorder = _Recorder(delay=0)
+
+    _run(recorder, _SPECS, use_async, max_workers=1)
+
+    assert [name for event, name in recorder.events if event == "start"] == [
+        name for name, _keys, _kwargs in _SPECS
+    ]
+    assert recorder.peak == 1
+
+
+@pytest.mark.parametrize("use_async", (False, True))
+def test_run_writes_stops_after_failure(use_async):
+    recorder = _Recorder()
+    specs = [("fails", {"a"}, dict(fail=True)), ("blocked", {"a"}, {})] + [
+        (f"later-{index}", {f"later-{index}"}, {}) for index in range(10)
+    ]
+
+    with pytest.raises(ValueError) as excinfo:
+        _run(recorder, specs, use_async, max_workers=2)
+
+    excinfo.match("fails")
+    assert "blocked" not in recorder.started()
+    assert len(recorder.started()) < len(specs)